@@ -0,0 +1,217 @@
+"""
+Control de admisión por ruta: límite de peticiones en curso y cola acotada.
+
+Cuando la base de datos se ralentiza, las peticiones que siguen entrando
+solo esperan (al pool, a MySQL) y alargan la latencia de todas. Con
+AdmissionMiddleware cada ruta (método + plantilla, p. ej. "GET /bolso/{bolso_id}")
+atiende como mucho `limite` peticiones a la vez; las siguientes esperan en
+una cola de hasta `cola` peticiones durante `espera` segundos como máximo.
+Si la cola está llena o se agota la espera, se responde al momento con 503
+y Retry-After, sin tocar la base de datos.
+
+- El límite por defecto sale del tamaño del pool (ver app.main): más
+  peticiones a la vez que conexiones solo alargan la cola del pool
+- `limites` ajusta rutas concretas ({"POST /bolso/batch": 2}; 0 = sin límite)
+- `excluir` son rutas que nunca se limitan (métricas, health checks, SSE)
+"""
+import asyncio
+from collections import deque
+from typing import Any, Deque, Dict, Iterable
+
+from starlette.routing import Match
+
+from app.metrics import Counter, Gauge, REGISTRY
+
+admission_rejected_total = REGISTRY.register(Counter(
+    "bolsos_admission_rejected_total",
+    "Peticiones rechazadas con 503 por ruta y motivo (queue_full, timeout).",
+    ("route", "reason"),
+))
+admission_waiting = REGISTRY.register(Gauge(
+    "bolsos_admission_waiting",
+    "Peticiones esperando turno por ruta.",
+    ("route",),
+))
+
+
+class RouteLimiter:
+    """Semáforo con cola FIFO acotada y espera máxima para una ruta."""
+
+    def __init__(self, nombre: str, limite: int, cola: int, espera: float):
+        self.nombre = nombre
+        self.limite = limite
+        self.cola = cola
+        self.espera = espera
+        self.en_curso = 0
+        self._esperando: Deque[asyncio.Future] = deque()
+
+        # Contadores
+        self.admitted = 0
+        self.queued = 0
+        self.rejected = 0
+
+    async def entrar(self) -> str | None:
+        """Toma un turno; devuelve el motivo del rechazo (o None si entra)."""
+        if self.en_curso < self.limite and not self._esperando:
+            self.en_curso += 1
+            self.admitted += 1
+            return None
+        if len(self._esperando) >= self.cola:
+            self.rejected += 1
+            return "queue_full"
+
+        loop = asyncio.get_running_loop()
+        turno = loop.create_future()
+        self._esperando.append(turno)
+        self.queued += 1
+        admission_waiting.inc(self.nombre)
+        caduca = loop.call_later(self.espera, self._caducar, turno)
+        try:
+            admitida = await turno
+        except asyncio.CancelledError:
+            # Cliente desconectado: si ya tenía turno, se pasa al siguiente
+            if turno.done() and not turno.cancelled() and turno.result():
+                self.salir()
+            else:
+                self._quitar(turno)
+            raise
+        finally:
+            caduca.cancel()
+            admission_waiting.dec(self.nombre)
+        if not admitida:
+            self.rejected += 1
+            return "timeout"
+        self.admitted += 1
+        return None
+
+    def salir(self) -> None:
+        """Libera el turno: pasa directamente al primero de la cola."""
+        while self._esperando:
+            turno = self._esperando.popleft()
+            if not turno.done():
+                turno.set_result(True)
+                return
+        self.en_curso -= 1
+
+    def _caducar(self, turno: asyncio.Future) -> None:
+        if not turno.done():
+            turno.set_result(False)
+            self._quitar(turno)
+
+    def _quitar(self, turno: asyncio.Future) -> None:
+        try:
+            self._esperando.remove(turno)
+        except ValueError:
+            pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limit": self.limite,
+            "in_flight": self.en_curso,
+            "waiting": len(self._esperando),
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rejected": self.rejected,
+        }
+
+
+class AdmissionControl:
+    """
+    Configuración y limitadores por ruta (se crean al ver la ruta por primera vez).
+    """
+
+    def __init__(
+        self,
+        limite: int = 20,
+        cola: int = 50,
+        espera: float = 2.0,
+        retry_after: float = 1.0,
+        limites: Dict[str, int] | None = None,
+        excluir: Iterable[str] = (),
+    ):
+        self.limite = limite
+        self.cola = cola
+        self.espera = espera
+        self.retry_after = retry_after
+        self.limites = dict(limites or {})
+        self.excluir = set(excluir)
+        self._limitadores: Dict[str, RouteLimiter | None] = {}
+
+    def limitador(self, metodo: str, ruta: str) -> RouteLimiter | None:
+        """RouteLimiter de la ruta (método + plantilla); None si no se limita."""
+        nombre = f"{metodo} {ruta}"
+        if nombre not in self._limitadores:
+            limite = self.limites.get(nombre, self.limite)
+            if ruta in self.excluir or limite <= 0:
+                self._limitadores[nombre] = None
+            else:
+                self._limitadores[nombre] = RouteLimiter(nombre, limite, self.cola, self.espera)
+        return self._limitadores[nombre]
+
+    def stats(self) -> Dict[str, Any]:
+        return {nombre: limitador.stats() for nombre, limitador in self._limitadores.items() if limitador}
+
+
+def parse_limites(valor: str) -> Dict[str, int]:
+    """"GET /bolso=50,POST /bolso/batch=2" -> {"GET /bolso": 50, "POST /bolso/batch": 2}."""
+    limites: Dict[str, int] = {}
+    for parte in valor.split(","):
+        if parte.strip():
+            ruta, _, limite = parte.rpartition("=")
+            limites[" ".join(ruta.split())] = int(limite)
+    return limites
+
+
+class AdmissionMiddleware:
+    """
+    Middleware ASGI puro: localiza la ruta de la petición entre las de la
+    aplicación (la misma plantilla que usan las métricas) y la hace pasar
+    por su RouteLimiter. Las rutas desconocidas (404) no se limitan.
+    """
+
+    def __init__(self, app, control: AdmissionControl):
+        self.app = app
+        self.control = control
+
+    def _limitador(self, scope) -> RouteLimiter | None:
+        aplicacion = scope.get("app")
+        if aplicacion is None:
+            return None
+        for ruta in aplicacion.router.routes:
+            coincide, _ = ruta.matches(scope)
+            if coincide == Match.FULL:
+                limitador = self.control.limitador(scope["method"], ruta.path)
+                if limitador is not None:
+                    # Para que las métricas y los logs de un 503 lleven la ruta
+                    scope.setdefault("route", ruta)
+                return limitador
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        limitador = self._limitador(scope)
+        if limitador is None:
+            await self.app(scope, receive, send)
+            return
+
+        motivo = await limitador.entrar()
+        if motivo is not None:
+            admission_rejected_total.inc(limitador.nombre, motivo)
+            cuerpo = b'{"detail":"Servidor saturado; reintentar m\\u00e1s tarde"}'
+            await send({
+                "type": "http.response.start",
+                "status": 503,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(cuerpo)).encode()),
+                    (b"retry-after", str(max(1, round(self.control.retry_after))).encode()),
+                ],
+            })
+            await send({"type": "http.response.body", "body": cuerpo})
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limitador.salir()
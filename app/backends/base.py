@@ -0,0 +1,242 @@
+import asyncio
+from typing import Any, AsyncIterator, Dict, Iterator, List, Sequence, Tuple
+
+
+class StorageBackend:
+    """
+    Almacenamiento de la tabla bolso (interfaz síncrona).
+
+    - connect() abre una unidad de trabajo: devuelve un objeto con
+      commit(), rollback() y close() que se pasa como `conn` a las demás
+      operaciones (ver app.database.transaction())
+    - Las filas se devuelven como dicts con las columnas de SQL_SELECT_BOLSOS,
+      o como tuplas en ese mismo orden con dictionary=False
+    - Los bolsos a escribir son dicts con nombre, descripcion, precio, stock,
+      categoria, codigo_sku y activo
+    """
+
+    name = ""
+
+    def connect(self) -> Any:
+        raise NotImplementedError
+
+    def es_transitorio(self, error: BaseException) -> bool:
+        """
+        True si `error` es un fallo de la base de datos (conexión, timeout...)
+        y no de la aplicación: lo cuenta el circuit breaker (ver app.circuit).
+        """
+        return isinstance(error, (TimeoutError, ConnectionError))
+
+    def stats(self) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """Libera los recursos del backend (al apagar la aplicación)."""
+
+    # ---- Lecturas ----
+
+    def fetch_all(self, conn: Any, dictionary: bool = True) -> List[Any]:
+        raise NotImplementedError(f"{self.name}: fetch_all")
+
+    def fetch_page(
+        self,
+        conn: Any,
+        categoria: str | None = None,
+        activo: bool | None = None,
+        precio_min: float | None = None,
+        precio_max: float | None = None,
+        con_stock: bool = False,
+        orden: str = "id_bolso",
+        after: Tuple[Any, ...] | None = None,
+        limit: int | None = None,
+        dictionary: bool = True,
+        columnas: Sequence[str] | None = None,
+    ) -> List[Any]:
+        """Misma semántica que app.database.build_select_bolsos."""
+        raise NotImplementedError(f"{self.name}: fetch_page")
+
+    def iter_all(self, chunk_size: int, dictionary: bool = True) -> Iterator[List[Any]]:
+        """Catálogo completo por id_bolso en bloques (usa su propia conexión)."""
+        raise NotImplementedError(f"{self.name}: iter_all")
+
+    def select_by_ids(self, conn: Any, ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        raise NotImplementedError(f"{self.name}: select_by_ids")
+
+    def select_by_skus(self, conn: Any, skus: List[str]) -> List[Dict[str, Any]]:
+        raise NotImplementedError(f"{self.name}: select_by_skus")
+
+    def skus_existentes(self, conn: Any, skus: List[str]) -> Dict[str, int]:
+        """{codigo_sku: id_bolso} de los que existen (sin distinguir mayúsculas)."""
+        raise NotImplementedError(f"{self.name}: skus_existentes")
+
+    def aggregate(self, conn: Any) -> List[Dict[str, Any]]:
+        """
+        Agregados por categoría (como SQL_AGGREGATE_BOLSOS): dicts con
+        categoria, bolsos, activos, stock, precio_sum, precio_min y precio_max.
+        """
+        raise NotImplementedError(f"{self.name}: aggregate")
+
+    def changes(self, conn: Any, since: int, limit: int) -> Tuple[List[Tuple[Any, ...]], List[Tuple[int, int]]]:
+        """
+        Cambios posteriores a la versión `since`, como SQL_SELECT_CAMBIOS y
+        SQL_SELECT_BORRADOS: (filas con la versión como última columna,
+        [(id_bolso, version)] de los borrados), cada lista en orden de versión
+        y de hasta `limit` elementos. Con since=0 no hay borrados que dar.
+        """
+        raise NotImplementedError(f"{self.name}: changes")
+
+    def current_version(self, conn: Any) -> int:
+        """
+        Versión del último cambio confirmado tal que todos los anteriores
+        también lo están (SQL_SELECT_VERSION; en MySQL, ver SQL_SELECT_REGISTRO_CAMBIOS).
+        """
+        raise NotImplementedError(f"{self.name}: current_version")
+
+    # ---- Escrituras ----
+
+    def insert(self, conn: Any, bolso: Dict[str, Any]) -> int:
+        raise NotImplementedError(f"{self.name}: insert")
+
+    def insert_many(self, conn: Any, bolsos: List[Dict[str, Any]]) -> None:
+        """Alta masiva; DuplicateSkuError si algún SKU ya existe."""
+        raise NotImplementedError(f"{self.name}: insert_many")
+
+    def upsert(self, conn: Any, campos: Tuple[str, ...], items: List[Dict[str, Any]]) -> None:
+        """Crea o actualiza por codigo_sku los `campos` de cada item."""
+        raise NotImplementedError(f"{self.name}: upsert")
+
+    def update_por_sku(self, conn: Any, items: List[Dict[str, Any]]) -> None:
+        """Actualización parcial de SKUs existentes (solo los campos de cada item)."""
+        raise NotImplementedError(f"{self.name}: update_por_sku")
+
+    def update(self, conn: Any, bolso_id: int, bolso: Dict[str, Any]) -> bool:
+        raise NotImplementedError(f"{self.name}: update")
+
+    def delete(self, conn: Any, bolso_id: int) -> bool:
+        raise NotImplementedError(f"{self.name}: delete")
+
+    def reservar(self, conn: Any, bolso_id: int, cantidad: int) -> bool:
+        """
+        Resta `cantidad` al stock con un UPDATE condicional (SQL_RESERVAR_STOCK).
+        False si no hay stock suficiente o el bolso no existe.
+        """
+        raise NotImplementedError(f"{self.name}: reservar")
+
+
+class _InlineConnection:
+    """Conexión de AsyncInlineBackend: libera el turno de transacción al cerrarse."""
+
+    def __init__(self, conn: Any, lock: asyncio.Lock):
+        self.raw = conn
+        self._lock = lock
+
+    async def commit(self) -> None:
+        self.raw.commit()
+
+    async def rollback(self) -> None:
+        self.raw.rollback()
+
+    async def close(self) -> None:
+        try:
+            self.raw.close()
+        finally:
+            self._lock.release()
+
+
+class AsyncInlineBackend:
+    """
+    Expone un StorageBackend en memoria (SQLite, memory) con la interfaz
+    asíncrona de app.database_async.
+
+    Las operaciones no hacen E/S de red, así que se ejecutan directamente en
+    el event loop. Las transacciones van de una en una (como un pool de una
+    conexión): un asyncio.Lock se toma en connect() y se suelta en close().
+    """
+
+    def __init__(self, backend: StorageBackend):
+        self.backend = backend
+        self.name = backend.name
+        self.es_transitorio = backend.es_transitorio
+        self._lock: asyncio.Lock | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self.waits = 0
+
+    async def connect(self) -> _InlineConnection:
+        loop = asyncio.get_running_loop()
+        if self._lock is None or self._loop is not loop:
+            # Un asyncio.Lock pertenece a un event loop (tests con varios loops)
+            self._lock, self._loop = asyncio.Lock(), loop
+        if self._lock.locked():
+            self.waits += 1
+        await self._lock.acquire()
+        try:
+            return _InlineConnection(self.backend.connect(), self._lock)
+        except BaseException:
+            self._lock.release()
+            raise
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.backend.stats(), "waits": self.waits}
+
+    async def close(self) -> None:
+        # El backend vive lo que el proceso (p. ej. una base :memory: compartida
+        # con app.database); no se cierra al apagar la aplicación
+        pass
+
+    async def fetch_all(self, conn: _InlineConnection, dictionary: bool = True) -> List[Any]:
+        return self.backend.fetch_all(conn.raw, dictionary)
+
+    async def fetch_page(self, conn: _InlineConnection, **filtros: Any) -> List[Any]:
+        return self.backend.fetch_page(conn.raw, **filtros)
+
+    async def iter_all(self, chunk_size: int, dictionary: bool = True) -> AsyncIterator[List[Any]]:
+        # Se lee todo dentro del turno y se entrega por bloques fuera de él,
+        # para no bloquear al resto de peticiones mientras el cliente descarga
+        conn = await self.connect()
+        try:
+            bloques = list(self.backend.iter_all(chunk_size, dictionary))
+        finally:
+            await conn.close()
+        for bloque in bloques:
+            yield bloque
+
+    async def select_by_ids(self, conn: _InlineConnection, ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        return self.backend.select_by_ids(conn.raw, ids)
+
+    async def select_by_skus(self, conn: _InlineConnection, skus: List[str]) -> List[Dict[str, Any]]:
+        return self.backend.select_by_skus(conn.raw, skus)
+
+    async def skus_existentes(self, conn: _InlineConnection, skus: List[str]) -> Dict[str, int]:
+        return self.backend.skus_existentes(conn.raw, skus)
+
+    async def aggregate(self, conn: _InlineConnection) -> List[Dict[str, Any]]:
+        return self.backend.aggregate(conn.raw)
+
+    async def changes(
+        self, conn: _InlineConnection, since: int, limit: int
+    ) -> Tuple[List[Tuple[Any, ...]], List[Tuple[int, int]]]:
+        return self.backend.changes(conn.raw, since, limit)
+
+    async def current_version(self, conn: _InlineConnection) -> int:
+        return self.backend.current_version(conn.raw)
+
+    async def insert(self, conn: _InlineConnection, bolso: Dict[str, Any]) -> int:
+        return self.backend.insert(conn.raw, bolso)
+
+    async def insert_many(self, conn: _InlineConnection, bolsos: List[Dict[str, Any]]) -> None:
+        self.backend.insert_many(conn.raw, bolsos)
+
+    async def upsert(self, conn: _InlineConnection, campos: Tuple[str, ...], items: List[Dict[str, Any]]) -> None:
+        self.backend.upsert(conn.raw, campos, items)
+
+    async def update_por_sku(self, conn: _InlineConnection, items: List[Dict[str, Any]]) -> None:
+        self.backend.update_por_sku(conn.raw, items)
+
+    async def update(self, conn: _InlineConnection, bolso_id: int, bolso: Dict[str, Any]) -> bool:
+        return self.backend.update(conn.raw, bolso_id, bolso)
+
+    async def delete(self, conn: _InlineConnection, bolso_id: int) -> bool:
+        return self.backend.delete(conn.raw, bolso_id)
+
+    async def reservar(self, conn: _InlineConnection, bolso_id: int, cantidad: int) -> bool:
+        return self.backend.reservar(conn.raw, bolso_id, cantidad)
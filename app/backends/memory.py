@@ -0,0 +1,367 @@
+"""
+Backend en memoria (DB_BACKEND=memory): la tabla bolso en estructuras de
+Python, sin SQL. Pensado para benchmarks y CI: mide el coste de la capa de
+la aplicación sin el de la base de datos.
+
+Índices (equivalentes a los de app/migrations/0002_indices_bolso.sql):
+- id_bolso -> fila, y la lista ordenada de IDs
+- codigo_sku -> id_bolso (único, sin distinguir mayúsculas)
+- categoria -> IDs (sin distinguir mayúsculas)
+- lista ordenada de (precio, id_bolso) para ordenar y paginar por precio
+- lista de (version, id_bolso) en orden de versión para GET /bolso/changes
+  (las entradas de versiones ya superadas se saltan y se compactan de vez
+  en cuando) y {id_bolso: version} de los borrados
+
+Los datos se pierden al terminar el proceso.
+"""
+import threading
+from bisect import bisect_left, bisect_right, insort
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Sequence, Set, Tuple
+
+from app.backends.base import StorageBackend
+from app.database import DuplicateSkuError, UPSERT_CAMPOS
+from app.pagination import ORDENES
+from app.serialization import COLUMNAS_BOLSO
+
+_CENTIMOS = Decimal("0.01")
+
+
+def _precio(valor: Any) -> Decimal:
+    """Como DECIMAL(10,2) en MySQL."""
+    return Decimal(str(valor)).quantize(_CENTIMOS)
+
+
+class _MemoryTransaction:
+    """Unidad de trabajo: registra cómo deshacer cada escritura (rollback)."""
+
+    def __init__(self, backend: "MemoryBackend"):
+        self._backend = backend
+        self.undo: List[Callable[[], None]] = []
+
+    def commit(self) -> None:
+        self.undo.clear()
+
+    def rollback(self) -> None:
+        with self._backend._lock:
+            while self.undo:
+                self.undo.pop()()
+        self._backend.rollbacks += 1
+
+    def close(self) -> None:
+        if self.undo:
+            self.rollback()
+        self._backend._tx_lock.release()
+
+
+class MemoryBackend(StorageBackend):
+    """Tabla bolso en memoria con índices; transacciones de una en una."""
+
+    name = "memory"
+
+    def __init__(self):
+        self._filas: Dict[int, Dict[str, Any]] = {}
+        self._ids: List[int] = []
+        self._por_sku: Dict[str, int] = {}
+        self._por_categoria: Dict[str, Set[int]] = {}
+        self._por_precio: List[Tuple[Decimal, int]] = []
+        self._siguiente_id = 1
+        self._version = 0
+        self._cambios: List[Tuple[int, int]] = []
+        self._borrados: Dict[int, int] = {}
+        self._lock = threading.RLock()
+        self._tx_lock = threading.Lock()
+        self.transactions = 0
+        self.rollbacks = 0
+
+    def connect(self) -> _MemoryTransaction:
+        self._tx_lock.acquire()
+        self.transactions += 1
+        return _MemoryTransaction(self)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": self.name, "rows": len(self._filas),
+                "transactions": self.transactions, "rollbacks": self.rollbacks}
+
+    # ---- Índices ----
+
+    def _indexar(self, fila: Dict[str, Any]) -> None:
+        bolso_id = fila["id_bolso"]
+        self._filas[bolso_id] = fila
+        insort(self._ids, bolso_id)
+        self._por_sku[fila["codigo_sku"].upper()] = bolso_id
+        self._por_categoria.setdefault(fila["categoria"].lower(), set()).add(bolso_id)
+        insort(self._por_precio, (fila["precio"], bolso_id))
+
+    def _desindexar(self, bolso_id: int) -> Dict[str, Any]:
+        fila = self._filas.pop(bolso_id)
+        del self._ids[bisect_left(self._ids, bolso_id)]
+        del self._por_sku[fila["codigo_sku"].upper()]
+        self._por_categoria[fila["categoria"].lower()].discard(bolso_id)
+        del self._por_precio[bisect_left(self._por_precio, (fila["precio"], bolso_id))]
+        return fila
+
+    def _nueva_version(self, bolso_id: int | None = None) -> int:
+        """
+        Siguiente número de la secuencia (como los triggers de la migración
+        0003); con `bolso_id`, la fila que lo va a llevar.
+        """
+        if len(self._cambios) > 2 * len(self._filas) + 1000:
+            self._cambios = sorted((fila["version"], i) for i, fila in self._filas.items())
+        self._version += 1
+        if bolso_id is not None:
+            self._cambios.append((self._version, bolso_id))
+        return self._version
+
+    def _reponer(self, fila: Dict[str, Any]) -> None:
+        """Vuelve a indexar una fila al deshacer (su entrada de versión pudo compactarse)."""
+        self._indexar(fila)
+        entrada = (fila["version"], fila["id_bolso"])
+        i = bisect_left(self._cambios, entrada)
+        if i == len(self._cambios) or self._cambios[i] != entrada:
+            self._cambios.insert(i, entrada)
+
+    def _reemplazar(self, conn: _MemoryTransaction, bolso_id: int, cambios: Dict[str, Any]) -> None:
+        anterior = self._desindexar(bolso_id)
+        self._indexar({**anterior, **cambios, "version": self._nueva_version(bolso_id)})
+
+        def deshacer() -> None:
+            self._desindexar(bolso_id)
+            self._reponer(anterior)
+        conn.undo.append(deshacer)
+
+    def _crear(self, conn: _MemoryTransaction, bolso: Dict[str, Any]) -> int:
+        if bolso["codigo_sku"].upper() in self._por_sku:
+            raise DuplicateSkuError(f"Duplicate entry '{bolso['codigo_sku']}' for key 'codigo_sku'")
+        bolso_id = self._siguiente_id
+        self._siguiente_id += 1
+        self._indexar({
+            "id_bolso": bolso_id,
+            "nombre": bolso["nombre"],
+            "descripcion": bolso.get("descripcion"),
+            "precio": _precio(bolso["precio"]),
+            "stock": int(bolso["stock"]),
+            "categoria": bolso["categoria"],
+            "codigo_sku": bolso["codigo_sku"],
+            "activo": int(bool(bolso.get("activo", True))),
+            "version": self._nueva_version(bolso_id),
+        })
+        conn.undo.append(lambda: self._desindexar(bolso_id))
+        return bolso_id
+
+    @staticmethod
+    def _normalizar(cambios: Dict[str, Any]) -> Dict[str, Any]:
+        """Tipos de columna: precio Decimal(10,2), stock int, activo 0/1."""
+        cambios = dict(cambios)
+        if "precio" in cambios:
+            cambios["precio"] = _precio(cambios["precio"])
+        if "stock" in cambios:
+            cambios["stock"] = int(cambios["stock"])
+        if "activo" in cambios:
+            cambios["activo"] = int(bool(cambios["activo"]))
+        return cambios
+
+    @staticmethod
+    def _salida(
+        filas: Iterable[Dict[str, Any]],
+        dictionary: bool,
+        columnas: Sequence[str] | None = None,
+    ) -> List[Any]:
+        columnas = columnas or COLUMNAS_BOLSO
+        if dictionary:
+            return [{c: fila[c] for c in columnas} for fila in filas]
+        return [tuple(fila[c] for c in columnas) for fila in filas]
+
+    # ---- Lecturas ----
+
+    def fetch_all(self, conn, dictionary: bool = True) -> List[Any]:
+        with self._lock:
+            return self._salida((self._filas[i] for i in self._ids), dictionary)
+
+    def fetch_page(
+        self,
+        conn,
+        categoria: str | None = None,
+        activo: bool | None = None,
+        precio_min: float | None = None,
+        precio_max: float | None = None,
+        con_stock: bool = False,
+        orden: str = "id_bolso",
+        after: Tuple[Any, ...] | None = None,
+        limit: int | None = None,
+        dictionary: bool = True,
+        columnas: Sequence[str] | None = None,
+    ) -> List[Any]:
+        por_precio = ORDENES[orden][0] == "precio"
+        descendente = orden.startswith("-")
+
+        def cumple(fila: Dict[str, Any]) -> bool:
+            return (
+                (activo is None or bool(fila["activo"]) == activo)
+                and (precio_min is None or fila["precio"] >= precio_min)
+                and (precio_max is None or fila["precio"] <= precio_max)
+                and (not con_stock or fila["stock"] > 0)
+            )
+
+        with self._lock:
+            # Claves en el orden pedido: índice completo o solo la categoría
+            claves: List[Any]
+            if categoria is not None:
+                ids = self._por_categoria.get(categoria.lower(), set())
+                claves = sorted((self._filas[i]["precio"], i) for i in ids) if por_precio else sorted(ids)
+            else:
+                claves = self._por_precio if por_precio else self._ids
+
+            # Keyset: empezar justo después de la clave `after`
+            if after is None:
+                rango = range(len(claves) - 1, -1, -1) if descendente else range(len(claves))
+            else:
+                clave = (Decimal(str(after[0])), after[1]) if por_precio else after[0]
+                if descendente:
+                    rango = range(bisect_left(claves, clave) - 1, -1, -1)
+                else:
+                    rango = range(bisect_right(claves, clave), len(claves))
+
+            resultado: List[Dict[str, Any]] = []
+            for i in rango:
+                fila = self._filas[claves[i][1] if por_precio else claves[i]]
+                if cumple(fila):
+                    resultado.append(fila)
+                    if limit is not None and len(resultado) >= limit:
+                        break
+            return self._salida(resultado, dictionary, columnas)
+
+    def iter_all(self, chunk_size: int, dictionary: bool = True) -> Iterator[List[Any]]:
+        with self._lock:
+            ids = list(self._ids)
+        for i in range(0, len(ids), chunk_size):
+            with self._lock:
+                filas = [self._filas[j] for j in ids[i:i + chunk_size] if j in self._filas]
+            yield self._salida(filas, dictionary)
+
+    def select_by_ids(self, conn, ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        with self._lock:
+            return {i: {c: self._filas[i][c] for c in COLUMNAS_BOLSO} for i in ids if i in self._filas}
+
+    def select_by_skus(self, conn, skus: List[str]) -> List[Dict[str, Any]]:
+        with self._lock:
+            ids = [self._por_sku.get(sku.upper()) for sku in skus]
+            return self._salida((self._filas[i] for i in dict.fromkeys(ids) if i is not None), True)
+
+    def skus_existentes(self, conn, skus: List[str]) -> Dict[str, int]:
+        with self._lock:
+            existentes: Dict[str, int] = {}
+            for sku in skus:
+                bolso_id = self._por_sku.get(sku.upper())
+                if bolso_id is not None:
+                    existentes[self._filas[bolso_id]["codigo_sku"]] = bolso_id
+            return existentes
+
+    def aggregate(self, conn) -> List[Dict[str, Any]]:
+        with self._lock:
+            grupos: Dict[str, Dict[str, Any]] = {}
+            for fila in self._filas.values():
+                g = grupos.get(fila["categoria"].lower())
+                if g is None:
+                    g = grupos[fila["categoria"].lower()] = {
+                        "categoria": fila["categoria"], "bolsos": 0, "activos": 0, "stock": 0,
+                        "precio_sum": Decimal(0), "precio_min": fila["precio"], "precio_max": fila["precio"],
+                    }
+                g["bolsos"] += 1
+                g["activos"] += 1 if fila["activo"] else 0
+                g["stock"] += fila["stock"]
+                g["precio_sum"] += fila["precio"]
+                g["precio_min"] = min(g["precio_min"], fila["precio"])
+                g["precio_max"] = max(g["precio_max"], fila["precio"])
+            return list(grupos.values())
+
+    def changes(self, conn, since: int, limit: int) -> Tuple[List[Tuple[Any, ...]], List[Tuple[int, int]]]:
+        with self._lock:
+            filas: List[Dict[str, Any]] = []
+            for version, bolso_id in self._cambios[bisect_right(self._cambios, (since, float("inf"))):]:
+                fila = self._filas.get(bolso_id)
+                if fila is not None and fila["version"] == version:
+                    filas.append(fila)
+                    if len(filas) >= limit:
+                        break
+            borrados: List[Tuple[int, int]] = []
+            if since:
+                borrados = sorted(
+                    ((bolso_id, version) for bolso_id, version in self._borrados.items() if version > since),
+                    key=lambda b: b[1],
+                )[:limit]
+            return self._salida(filas, False, COLUMNAS_BOLSO + ("version",)), borrados
+
+    def current_version(self, conn) -> int:
+        return self._version
+
+    # ---- Escrituras ----
+
+    def insert(self, conn, bolso: Dict[str, Any]) -> int:
+        with self._lock:
+            return self._crear(conn, bolso)
+
+    def insert_many(self, conn, bolsos: List[Dict[str, Any]]) -> None:
+        with self._lock:
+            # Como un INSERT multi-fila: si un SKU está repetido no se inserta ninguno
+            nuevos: Set[str] = set()
+            for b in bolsos:
+                sku = b["codigo_sku"].upper()
+                if sku in self._por_sku or sku in nuevos:
+                    raise DuplicateSkuError(f"Duplicate entry '{b['codigo_sku']}' for key 'codigo_sku'")
+                nuevos.add(sku)
+            for b in bolsos:
+                self._crear(conn, b)
+
+    def upsert(self, conn, campos: Tuple[str, ...], items: List[Dict[str, Any]]) -> None:
+        with self._lock:
+            for item in items:
+                bolso_id = self._por_sku.get(item["codigo_sku"].upper())
+                if bolso_id is None:
+                    self._crear(conn, {"codigo_sku": item["codigo_sku"], **{c: item[c] for c in campos}})
+                else:
+                    self._reemplazar(conn, bolso_id, self._normalizar({c: item[c] for c in campos}))
+
+    def update_por_sku(self, conn, items: List[Dict[str, Any]]) -> None:
+        with self._lock:
+            for item in items:
+                bolso_id = self._por_sku.get(item["codigo_sku"].upper())
+                if bolso_id is not None:
+                    cambios = {c: item[c] for c in UPSERT_CAMPOS if c in item}
+                    self._reemplazar(conn, bolso_id, self._normalizar(cambios))
+
+    def update(self, conn, bolso_id: int, bolso: Dict[str, Any]) -> bool:
+        with self._lock:
+            if bolso_id not in self._filas:
+                return False
+            otro = self._por_sku.get(bolso["codigo_sku"].upper())
+            if otro is not None and otro != bolso_id:
+                raise DuplicateSkuError(f"Duplicate entry '{bolso['codigo_sku']}' for key 'codigo_sku'")
+            cambios = {c: bolso.get(c) for c in COLUMNAS_BOLSO if c != "id_bolso"}
+            self._reemplazar(conn, bolso_id, self._normalizar(cambios))
+            return True
+
+    def delete(self, conn, bolso_id: int) -> bool:
+        with self._lock:
+            if bolso_id not in self._filas:
+                return False
+            fila = self._desindexar(bolso_id)
+            anterior = self._borrados.get(bolso_id)
+            self._borrados[bolso_id] = self._nueva_version()
+
+            def deshacer() -> None:
+                self._reponer(fila)
+                if anterior is None:
+                    del self._borrados[bolso_id]
+                else:
+                    self._borrados[bolso_id] = anterior
+            conn.undo.append(deshacer)
+            return True
+
+    def reservar(self, conn, bolso_id: int, cantidad: int) -> bool:
+        with self._lock:
+            fila = self._filas.get(bolso_id)
+            if fila is None or fila["stock"] < cantidad:
+                return False
+            self._reemplazar(conn, bolso_id, {"stock": fila["stock"] - cantidad})
+            return True
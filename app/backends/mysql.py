@@ -0,0 +1,413 @@
+"""
+Backend MySQL (por defecto): el SQL de la tabla bolso sobre mysql.connector.
+
+- MySQLBackend (síncrono): pool de app.database; implementa las operaciones
+  de las funciones síncronas de app.database (scripts y tests)
+- AsyncMySQLBackend: mysql.connector.aio con un AsyncConnectionPool; lo usan
+  los endpoints a través de app.database_async
+"""
+from typing import Any, AsyncIterator, Dict, List, Tuple, cast
+
+import mysql.connector.aio
+from mysql.connector import errorcode, errors
+from mysql.connector.errors import IntegrityError
+
+from app.backends.base import StorageBackend
+from app.database import (
+    BATCH_INSERT_SIZE,
+    HUECO_GRACIA,
+    VENTANA_VERSION,
+    DuplicateSkuError,
+    SQL_AGGREGATE_BOLSOS,
+    SQL_DELETE_BOLSO,
+    SQL_INSERT_BOLSO,
+    SQL_RESERVAR_STOCK,
+    SQL_SELECT_BOLSOS,
+    SQL_COMPROBAR_HUECO,
+    SQL_SELECT_BORRADOS,
+    SQL_SELECT_CAMBIOS,
+    SQL_SELECT_REGISTRO_CAMBIOS,
+    SQL_SELECT_VERSION_ANTERIOR,
+    SQL_UPDATE_BOLSO,
+    build_select_bolsos,
+    build_select_by_ids,
+    build_update_por_sku,
+    build_upsert_bolsos,
+    connection_params,
+    get_pool,
+    params_insert_bolso,
+    params_update_bolso,
+    pool_params,
+    sql_in,
+)
+from app.pool import AsyncConnectionPool, AsyncPooledConnection, PoolTimeoutError
+
+# Fallos de conexión, de red y timeouts (ver app.circuit)
+_ERRORES_TRANSITORIOS = (
+    errors.OperationalError,
+    errors.InterfaceError,
+    errors.ConnectionTimeoutError,
+    errors.ReadTimeoutError,
+    errors.WriteTimeoutError,
+    PoolTimeoutError,
+    TimeoutError,
+    OSError,
+)
+
+
+def es_transitorio(error: BaseException) -> bool:
+    """
+    Fallo de MySQL (no de la aplicación): errores de conexión y timeouts.
+    Con la extensión C, "no se puede conectar" llega como DatabaseError con
+    un errno de cliente (CR_*, 2000-2999).
+    """
+    if isinstance(error, _ERRORES_TRANSITORIOS):
+        return True
+    return isinstance(error, errors.Error) and 2000 <= (error.errno or 0) < 3000
+
+
+async def _hueco_deshecho(cur, desde: int, hasta: int) -> bool:
+    """True si las versiones entre `desde` y `hasta` son de transacciones deshechas."""
+    try:
+        await cur.execute(SQL_COMPROBAR_HUECO, (desde, hasta))
+        return not await cur.fetchall()
+    except errors.DatabaseError as e:
+        if e.errno == errorcode.ER_LOCK_NOWAIT:
+            return False
+        raise
+
+
+async def _version_sin_huecos(cur, desde: int, n: int) -> Tuple[int, bool]:
+    """
+    Recorre hasta `n` versiones de bolso_cambio posteriores a `desde` y
+    devuelve (la última sin huecos pendientes delante, si se ha parado:
+    hueco pendiente o fin del registro).
+    """
+    await cur.execute(SQL_SELECT_REGISTRO_CAMBIOS, (desde, n))
+    filas = await cur.fetchall()
+    hasta = desde
+    for version, edad in filas:
+        if version > hasta + 1 and (
+            edad < HUECO_GRACIA * 1_000_000 or not await _hueco_deshecho(cur, hasta, version)
+        ):
+            return hasta, True
+        hasta = version
+    return hasta, len(filas) < n
+
+
+class MySQLBackend(StorageBackend):
+    """
+    Backend síncrono sobre el ConnectionPool de app.database.
+    Solo implementa lo que usan las funciones síncronas (listar, buscar por
+    ID, alta, modificación y baja); el resto lo cubre AsyncMySQLBackend.
+    """
+
+    name = "mysql"
+
+    def es_transitorio(self, error: BaseException) -> bool:
+        return es_transitorio(error)
+
+    def connect(self):
+        return get_pool().acquire()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": self.name, **get_pool().stats()}
+
+    def close(self) -> None:
+        get_pool().dispose()
+
+    def fetch_all(self, conn, dictionary: bool = True) -> List[Any]:
+        cur = conn.cursor(dictionary=dictionary)
+        try:
+            cur.execute(SQL_SELECT_BOLSOS)
+            return cast(List[Any], cur.fetchall())
+        finally:
+            cur.close()
+
+    def select_by_ids(self, conn, ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        if not ids:
+            return {}
+        cur = conn.cursor(dictionary=True)
+        try:
+            cur.execute(*build_select_by_ids(ids))
+            return {row["id_bolso"]: dict(row) for row in cur.fetchall()}
+        finally:
+            cur.close()
+
+    def insert(self, conn, bolso: Dict[str, Any]) -> int:
+        cur = conn.cursor()
+        try:
+            cur.execute(SQL_INSERT_BOLSO, params_insert_bolso(bolso))
+            return cur.lastrowid or 0
+        finally:
+            cur.close()
+
+    def update(self, conn, bolso_id: int, bolso: Dict[str, Any]) -> bool:
+        cur = conn.cursor()
+        try:
+            cur.execute(SQL_UPDATE_BOLSO, params_update_bolso(bolso_id, bolso))
+            # Con FOUND_ROWS, rowcount cuenta la fila aunque no cambie ningún valor
+            return cur.rowcount > 0
+        finally:
+            cur.close()
+
+    def delete(self, conn, bolso_id: int) -> bool:
+        cur = conn.cursor()
+        try:
+            cur.execute(SQL_DELETE_BOLSO, (bolso_id,))
+            return cur.rowcount > 0
+        finally:
+            cur.close()
+
+
+async def create_connection(params: Dict[str, Any] | None = None):
+    """Crea una conexión asíncrona NUEVA a MySQL (la usa el pool)."""
+    return await mysql.connector.aio.connect(**(params or connection_params()))
+
+
+async def _validate_connection(conn) -> bool:
+    """Comprueba que una conexión ociosa sigue viva (ping al servidor)."""
+    return await conn.is_connected()
+
+
+class AsyncMySQLBackend:
+    """
+    Backend asíncrono sobre mysql.connector.aio: mientras una petición
+    espera a MySQL no ocupa ningún hilo del threadpool de Starlette.
+    Usa la misma configuración DB_POOL_* que el pool síncrono; con `params`
+    se conecta a otro servidor (réplicas de lectura, ver app.replicas).
+    """
+
+    name = "mysql"
+
+    def __init__(self, params: Dict[str, Any] | None = None):
+        self._params = params
+        self._pool: AsyncConnectionPool | None = None
+
+    def get_pool(self) -> AsyncConnectionPool:
+        if self._pool is None:
+            self._pool = AsyncConnectionPool(
+                creator=lambda: create_connection(self._params),
+                validator=_validate_connection,
+                **pool_params()
+            )
+        return self._pool
+
+    async def connect(self) -> AsyncPooledConnection:
+        return await self.get_pool().acquire()
+
+    def es_transitorio(self, error: BaseException) -> bool:
+        return es_transitorio(error)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": self.name, **self.get_pool().stats()}
+
+    async def close(self) -> None:
+        if self._pool is not None:
+            await self._pool.dispose()
+            self._pool = None
+
+    # ---- Lecturas ----
+
+    async def fetch_all(self, conn, dictionary: bool = True) -> List[Any]:
+        cur = await conn.cursor(dictionary=dictionary)
+        try:
+            await cur.execute(SQL_SELECT_BOLSOS)
+            return cast(List[Any], await cur.fetchall())
+        finally:
+            await cur.close()
+
+    async def fetch_page(self, conn, dictionary: bool = True, **filtros: Any) -> List[Any]:
+        sql, params = build_select_bolsos(**filtros)
+        cur = await conn.cursor(dictionary=dictionary)
+        try:
+            await cur.execute(sql, params)
+            return cast(List[Any], await cur.fetchall())
+        finally:
+            await cur.close()
+
+    async def iter_all(self, chunk_size: int, dictionary: bool = True) -> AsyncIterator[List[Any]]:
+        # Cursor sin buffer: las filas se leen del socket a medida que se
+        # piden con fetchmany. Si se abandona a medias, la conexión se
+        # descarta porque aún tiene filas pendientes de leer.
+        conn = await self.connect()
+        exhausted = False
+        try:
+            cur = await conn.cursor(dictionary=dictionary, buffered=False)
+            await cur.execute(SQL_SELECT_BOLSOS + " ORDER BY id_bolso")
+            while True:
+                rows = await cur.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield cast(List[Any], rows)
+            exhausted = True
+            await cur.close()
+        finally:
+            if exhausted:
+                await conn.close()
+            else:
+                await conn.invalidate()
+
+    async def select_by_ids(self, conn, ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        if not ids:
+            return {}
+        cur = await conn.cursor(dictionary=True)
+        try:
+            await cur.execute(*build_select_by_ids(ids))
+            return {row["id_bolso"]: dict(row) for row in await cur.fetchall()}
+        finally:
+            await cur.close()
+
+    async def select_by_skus(self, conn, skus: List[str]) -> List[Dict[str, Any]]:
+        if not skus:
+            return []
+        cur = await conn.cursor(dictionary=True)
+        try:
+            await cur.execute(
+                SQL_SELECT_BOLSOS + f" WHERE codigo_sku IN ({sql_in(len(skus))})",
+                list(skus)
+            )
+            return cast(List[Dict[str, Any]], await cur.fetchall())
+        finally:
+            await cur.close()
+
+    async def skus_existentes(self, conn, skus: List[str]) -> Dict[str, int]:
+        # Un SELECT ... IN por cada BATCH_INSERT_SIZE SKUs
+        existentes: Dict[str, int] = {}
+        if not skus:
+            return existentes
+        cur = await conn.cursor()
+        try:
+            for i in range(0, len(skus), BATCH_INSERT_SIZE):
+                lote = list(skus[i:i + BATCH_INSERT_SIZE])
+                await cur.execute(
+                    f"SELECT codigo_sku, id_bolso FROM bolso WHERE codigo_sku IN ({sql_in(len(lote))})",
+                    lote
+                )
+                existentes.update({sku: id_bolso for sku, id_bolso in await cur.fetchall()})
+            return existentes
+        finally:
+            await cur.close()
+
+    async def aggregate(self, conn) -> List[Dict[str, Any]]:
+        cur = await conn.cursor(dictionary=True)
+        try:
+            await cur.execute(SQL_AGGREGATE_BOLSOS)
+            return cast(List[Dict[str, Any]], await cur.fetchall())
+        finally:
+            await cur.close()
+
+    async def changes(self, conn, since: int, limit: int) -> Tuple[List[Tuple[Any, ...]], List[Tuple[int, int]]]:
+        # Todas las consultas en la misma transacción (REPEATABLE READ): las
+        # versiones sin huecos de bolso_cambio, las filas y los borrados
+        # salen de la misma instantánea. Se avanza por tramos de `limit`
+        # versiones (algunas ya sustituidas por otras posteriores) hasta
+        # tener `limit` cambios o llegar a un hueco pendiente
+        cur = await conn.cursor()
+        try:
+            rows: List[Tuple[Any, ...]] = []
+            borrados: List[Tuple[int, int]] = []
+            desde, parado = since, False
+            while not parado and len(rows) + len(borrados) < limit:
+                hasta, parado = await _version_sin_huecos(cur, desde, limit)
+                if hasta == desde:
+                    break
+                await cur.execute(SQL_SELECT_CAMBIOS, (desde, hasta, limit))
+                rows += cast(List[Tuple[Any, ...]], await cur.fetchall())
+                if since:
+                    await cur.execute(SQL_SELECT_BORRADOS, (desde, hasta, limit))
+                    borrados += cast(List[Tuple[int, int]], await cur.fetchall())
+                desde = hasta
+            return rows, borrados
+        finally:
+            await cur.close()
+
+    async def current_version(self, conn) -> int:
+        # Se buscan huecos desde VENTANA_VERSION cambios antes del último:
+        # una transacción sin confirmar más atrás ya no se espera
+        cur = await conn.cursor()
+        try:
+            await cur.execute(SQL_SELECT_VERSION_ANTERIOR, (VENTANA_VERSION,))
+            row = await cur.fetchone()
+            version, parado = (int(row[0]) if row else 0), False
+            while not parado:
+                version, parado = await _version_sin_huecos(cur, version, VENTANA_VERSION)
+            return version
+        finally:
+            await cur.close()
+
+    # ---- Escrituras ----
+
+    async def insert(self, conn, bolso: Dict[str, Any]) -> int:
+        cur = await conn.cursor()
+        try:
+            await cur.execute(SQL_INSERT_BOLSO, params_insert_bolso(bolso))
+            return cur.lastrowid or 0
+        finally:
+            await cur.close()
+
+    async def insert_many(self, conn, bolsos: List[Dict[str, Any]]) -> None:
+        # executemany() envía INSERTs multi-fila de BATCH_INSERT_SIZE filas
+        cur = await conn.cursor()
+        try:
+            for i in range(0, len(bolsos), BATCH_INSERT_SIZE):
+                lote = bolsos[i:i + BATCH_INSERT_SIZE]
+                await cur.executemany(SQL_INSERT_BOLSO, [params_insert_bolso(b) for b in lote])
+        except IntegrityError as e:
+            if e.errno == errorcode.ER_DUP_ENTRY:
+                raise DuplicateSkuError(str(e)) from e
+            raise
+        finally:
+            await cur.close()
+
+    async def upsert(self, conn, campos: Tuple[str, ...], items: List[Dict[str, Any]]) -> None:
+        # INSERT ... ON DUPLICATE KEY UPDATE en lotes multi-fila
+        sql = build_upsert_bolsos(campos)
+        cur = await conn.cursor()
+        try:
+            for i in range(0, len(items), BATCH_INSERT_SIZE):
+                await cur.executemany(
+                    sql,
+                    [
+                        (item["codigo_sku"],) + tuple(item[c] for c in campos)
+                        for item in items[i:i + BATCH_INSERT_SIZE]
+                    ]
+                )
+        finally:
+            await cur.close()
+
+    async def update_por_sku(self, conn, items: List[Dict[str, Any]]) -> None:
+        # UPDATE con CASE codigo_sku: una sentencia por lote
+        cur = await conn.cursor()
+        try:
+            for i in range(0, len(items), BATCH_INSERT_SIZE):
+                sql, params = build_update_por_sku(items[i:i + BATCH_INSERT_SIZE])
+                await cur.execute(sql, params)
+        finally:
+            await cur.close()
+
+    async def update(self, conn, bolso_id: int, bolso: Dict[str, Any]) -> bool:
+        cur = await conn.cursor()
+        try:
+            await cur.execute(SQL_UPDATE_BOLSO, params_update_bolso(bolso_id, bolso))
+            return cur.rowcount > 0
+        finally:
+            await cur.close()
+
+    async def delete(self, conn, bolso_id: int) -> bool:
+        cur = await conn.cursor()
+        try:
+            await cur.execute(SQL_DELETE_BOLSO, (bolso_id,))
+            return cur.rowcount > 0
+        finally:
+            await cur.close()
+
+    async def reservar(self, conn, bolso_id: int, cantidad: int) -> bool:
+        # Un único UPDATE condicional: el bloqueo de la fila dura lo que la
+        # sentencia (más el resto de la transacción) y nunca deja stock negativo
+        cur = await conn.cursor()
+        try:
+            await cur.execute(SQL_RESERVAR_STOCK, (cantidad, bolso_id, cantidad))
+            return cur.rowcount > 0
+        finally:
+            await cur.close()
@@ -0,0 +1,252 @@
+"""
+Backend SQLite (DB_BACKEND=sqlite): la tabla bolso en un fichero o en
+memoria (DB_SQLITE_PATH, por defecto ":memory:"), sin servidor.
+
+Reutiliza el SQL de app.database traduciendo los placeholders (%s -> ?) y
+el upsert (ON DUPLICATE KEY UPDATE -> ON CONFLICT). codigo_sku y categoria
+se declaran COLLATE NOCASE para comparar igual que la collation de MySQL.
+SCHEMA es el equivalente de las migraciones de app/migrations (solo MySQL).
+"""
+import sqlite3
+import threading
+from decimal import Decimal
+from typing import Any, Dict, Iterator, List, Sequence, Tuple
+
+from app.backends.base import StorageBackend
+from app.database import (
+    BATCH_INSERT_SIZE,
+    DuplicateSkuError,
+    SQL_AGGREGATE_BOLSOS,
+    SQL_DELETE_BOLSO,
+    SQL_INSERT_BOLSO,
+    SQL_RESERVAR_STOCK,
+    SQL_SELECT_BOLSOS,
+    SQL_SELECT_BORRADOS,
+    SQL_SELECT_CAMBIOS,
+    SQL_SELECT_VERSION,
+    SQL_UPDATE_BOLSO,
+    build_select_bolsos,
+    build_select_by_ids,
+    build_update_por_sku,
+    params_insert_bolso,
+    params_update_bolso,
+    sql_in,
+)
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS bolso (
+        id_bolso INTEGER PRIMARY KEY AUTOINCREMENT,
+        nombre TEXT NOT NULL,
+        descripcion TEXT,
+        precio NUMERIC NOT NULL,
+        stock INTEGER NOT NULL DEFAULT 0,
+        categoria TEXT NOT NULL COLLATE NOCASE,
+        codigo_sku TEXT NOT NULL COLLATE NOCASE UNIQUE,
+        activo INTEGER NOT NULL DEFAULT 1,
+        version INTEGER NOT NULL DEFAULT 0,
+        CHECK (stock >= 0)
+    );
+    CREATE INDEX IF NOT EXISTS idx_bolso_categoria_id ON bolso (categoria, id_bolso);
+    CREATE INDEX IF NOT EXISTS idx_bolso_categoria_precio_id ON bolso (categoria, precio, id_bolso);
+    CREATE INDEX IF NOT EXISTS idx_bolso_activo_id ON bolso (activo, id_bolso);
+    CREATE INDEX IF NOT EXISTS idx_bolso_precio_id ON bolso (precio, id_bolso);
+    CREATE INDEX IF NOT EXISTS idx_bolso_version ON bolso (version);
+
+    CREATE TABLE IF NOT EXISTS bolso_version (id INTEGER PRIMARY KEY, valor INTEGER NOT NULL);
+    INSERT OR IGNORE INTO bolso_version (id, valor) SELECT 1, COALESCE(MAX(version), 0) FROM bolso;
+    CREATE TABLE IF NOT EXISTS bolso_borrado (id_bolso INTEGER PRIMARY KEY, version INTEGER NOT NULL);
+    CREATE INDEX IF NOT EXISTS idx_bolso_borrado_version ON bolso_borrado (version);
+
+    -- SQLite no deja cambiar NEW en un BEFORE: se actualiza la fila después.
+    -- El trigger de UPDATE no incluye version, así no se dispara a sí mismo
+    CREATE TRIGGER IF NOT EXISTS trg_bolso_version_insert AFTER INSERT ON bolso
+    BEGIN
+        UPDATE bolso_version SET valor = valor + 1 WHERE id = 1;
+        UPDATE bolso SET version = (SELECT valor FROM bolso_version WHERE id = 1)
+        WHERE id_bolso = NEW.id_bolso;
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_bolso_version_update
+    AFTER UPDATE OF nombre, descripcion, precio, stock, categoria, codigo_sku, activo ON bolso
+    BEGIN
+        UPDATE bolso_version SET valor = valor + 1 WHERE id = 1;
+        UPDATE bolso SET version = (SELECT valor FROM bolso_version WHERE id = 1)
+        WHERE id_bolso = NEW.id_bolso;
+    END;
+    CREATE TRIGGER IF NOT EXISTS trg_bolso_borrado AFTER DELETE ON bolso
+    BEGIN
+        UPDATE bolso_version SET valor = valor + 1 WHERE id = 1;
+        INSERT OR REPLACE INTO bolso_borrado (id_bolso, version)
+        VALUES (OLD.id_bolso, (SELECT valor FROM bolso_version WHERE id = 1));
+    END;
+"""
+
+
+def _sql(sql: str) -> str:
+    """Placeholders de mysql.connector (%s) a los de sqlite3 (?)."""
+    return sql.replace("%s", "?")
+
+
+def _params(params: Sequence[Any]) -> List[Any]:
+    """sqlite3 no admite Decimal (cursores de paginación por precio)."""
+    return [float(p) if isinstance(p, Decimal) else p for p in params]
+
+
+class _SQLiteTransaction:
+    """Unidad de trabajo sobre la conexión compartida (una a la vez)."""
+
+    def __init__(self, backend: "SQLiteBackend"):
+        self._backend = backend
+        self.db = backend.db
+
+    def cursor(self):
+        return self.db.cursor()
+
+    def commit(self) -> None:
+        self.db.commit()
+
+    def rollback(self) -> None:
+        self.db.rollback()
+
+    def close(self) -> None:
+        if self.db.in_transaction:
+            self.db.rollback()
+        self._backend._tx_lock.release()
+
+
+class SQLiteBackend(StorageBackend):
+    """
+    Una sola conexión sqlite3 compartida (necesario con ":memory:") y las
+    transacciones de una en una, como un pool de tamaño 1.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str = ":memory:"):
+        self.path = path
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        columnas = [fila[1] for fila in self.db.execute("PRAGMA table_info(bolso)")]
+        if columnas and "version" not in columnas:
+            # Fichero creado antes de la columna version (migración 0003 en MySQL)
+            self.db.executescript(
+                "ALTER TABLE bolso ADD COLUMN version INTEGER NOT NULL DEFAULT 0;"
+                "UPDATE bolso SET version = id_bolso;"
+            )
+        self.db.executescript(SCHEMA)
+        self._tx_lock = threading.Lock()
+        self.transactions = 0
+
+    def es_transitorio(self, error: BaseException) -> bool:
+        # "database is locked", fichero inaccesible...
+        return isinstance(error, sqlite3.OperationalError) or super().es_transitorio(error)
+
+    def connect(self) -> _SQLiteTransaction:
+        self._tx_lock.acquire()
+        self.transactions += 1
+        return _SQLiteTransaction(self)
+
+    def stats(self) -> Dict[str, Any]:
+        filas = self.db.execute("SELECT COUNT(*) FROM bolso").fetchone()[0]
+        return {"backend": self.name, "path": self.path, "rows": filas,
+                "transactions": self.transactions}
+
+    def close(self) -> None:
+        self.db.close()
+
+    def _execute(self, sql: str, params: Sequence[Any] = ()) -> sqlite3.Cursor:
+        return self.db.execute(_sql(sql), _params(params))
+
+    @staticmethod
+    def _rows(cur: sqlite3.Cursor, dictionary: bool) -> List[Any]:
+        if not dictionary:
+            return cur.fetchall()
+        columnas = [d[0] for d in cur.description]
+        return [dict(zip(columnas, row)) for row in cur.fetchall()]
+
+    # ---- Lecturas ----
+
+    def fetch_all(self, conn, dictionary: bool = True) -> List[Any]:
+        return self._rows(self._execute(SQL_SELECT_BOLSOS), dictionary)
+
+    def fetch_page(self, conn, dictionary: bool = True, **filtros: Any) -> List[Any]:
+        sql, params = build_select_bolsos(**filtros)
+        return self._rows(self._execute(sql, params), dictionary)
+
+    def iter_all(self, chunk_size: int, dictionary: bool = True) -> Iterator[List[Any]]:
+        rows = self._rows(self._execute(SQL_SELECT_BOLSOS + " ORDER BY id_bolso"), dictionary)
+        for i in range(0, len(rows), chunk_size):
+            yield rows[i:i + chunk_size]
+
+    def select_by_ids(self, conn, ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        if not ids:
+            return {}
+        rows = self._rows(self._execute(*build_select_by_ids(ids)), True)
+        return {row["id_bolso"]: row for row in rows}
+
+    def select_by_skus(self, conn, skus: List[str]) -> List[Dict[str, Any]]:
+        filas: List[Dict[str, Any]] = []
+        for i in range(0, len(skus), BATCH_INSERT_SIZE):
+            lote = list(skus[i:i + BATCH_INSERT_SIZE])
+            filas.extend(self._rows(self._execute(
+                SQL_SELECT_BOLSOS + f" WHERE codigo_sku IN ({sql_in(len(lote))})", lote
+            ), True))
+        return filas
+
+    def skus_existentes(self, conn, skus: List[str]) -> Dict[str, int]:
+        existentes: Dict[str, int] = {}
+        for i in range(0, len(skus), BATCH_INSERT_SIZE):
+            lote = list(skus[i:i + BATCH_INSERT_SIZE])
+            cur = self._execute(
+                f"SELECT codigo_sku, id_bolso FROM bolso WHERE codigo_sku IN ({sql_in(len(lote))})", lote
+            )
+            existentes.update({sku: id_bolso for sku, id_bolso in cur.fetchall()})
+        return existentes
+
+    def aggregate(self, conn) -> List[Dict[str, Any]]:
+        return self._rows(self._execute(SQL_AGGREGATE_BOLSOS), True)
+
+    def changes(self, conn, since: int, limit: int) -> Tuple[List[Tuple[Any, ...]], List[Tuple[int, int]]]:
+        # Las escrituras se confirman de una en una: no hay huecos que esperar
+        hasta = self.current_version(conn)
+        rows = self._execute(SQL_SELECT_CAMBIOS, (since, hasta, limit)).fetchall()
+        borrados = self._execute(SQL_SELECT_BORRADOS, (since, hasta, limit)).fetchall() if since else []
+        return rows, borrados
+
+    def current_version(self, conn) -> int:
+        return self._execute(SQL_SELECT_VERSION).fetchone()[0]
+
+    # ---- Escrituras ----
+
+    def insert(self, conn, bolso: Dict[str, Any]) -> int:
+        return self._execute(SQL_INSERT_BOLSO, params_insert_bolso(bolso)).lastrowid or 0
+
+    def insert_many(self, conn, bolsos: List[Dict[str, Any]]) -> None:
+        try:
+            self.db.executemany(_sql(SQL_INSERT_BOLSO), [_params(params_insert_bolso(b)) for b in bolsos])
+        except sqlite3.IntegrityError as e:
+            raise DuplicateSkuError(str(e)) from e
+
+    def upsert(self, conn, campos: Tuple[str, ...], items: List[Dict[str, Any]]) -> None:
+        columnas = ("codigo_sku",) + campos
+        sql = (
+            f"INSERT INTO bolso ({', '.join(columnas)}) VALUES ({sql_in(len(columnas))}) "
+            "ON CONFLICT(codigo_sku) DO UPDATE SET "
+            + ", ".join(f"{campo} = excluded.{campo}" for campo in campos)
+        )
+        self.db.executemany(
+            _sql(sql),
+            [_params((item["codigo_sku"],) + tuple(item[c] for c in campos)) for item in items]
+        )
+
+    def update_por_sku(self, conn, items: List[Dict[str, Any]]) -> None:
+        for i in range(0, len(items), BATCH_INSERT_SIZE):
+            self._execute(*build_update_por_sku(items[i:i + BATCH_INSERT_SIZE]))
+
+    def update(self, conn, bolso_id: int, bolso: Dict[str, Any]) -> bool:
+        # Como con FOUND_ROWS en MySQL: rowcount cuenta las filas encontradas
+        return self._execute(SQL_UPDATE_BOLSO, params_update_bolso(bolso_id, bolso)).rowcount > 0
+
+    def delete(self, conn, bolso_id: int) -> bool:
+        return self._execute(SQL_DELETE_BOLSO, (bolso_id,)).rowcount > 0
+
+    def reservar(self, conn, bolso_id: int, cantidad: int) -> bool:
+        return self._execute(SQL_RESERVAR_STOCK, (cantidad, bolso_id, cantidad)).rowcount > 0
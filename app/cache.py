@@ -0,0 +1,109 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Tuple
+
+# Valor devuelto por TTLCache.get() cuando la clave no está (o ha caducado).
+# Se distingue de None, que es un resultado cacheado válido (caché negativa).
+MISS = object()
+
+
+class TTLCache:
+    """
+    Caché LRU en memoria con caducidad por entrada.
+
+    - maxsize: número máximo de entradas; al superarlo se expulsa la menos
+      usada recientemente (0 = caché desactivada)
+    - ttl: segundos de vida de un resultado encontrado
+    - negative_ttl: segundos de vida de un resultado None ("no existe"),
+      normalmente más corto para que un alta se vea enseguida
+
+    Cada invalidación incrementa `generation`; un lector que empezó su
+    consulta antes de una escritura no puede guardar su resultado (viejo)
+    después de ella: ver set(..., generation=...).
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 30.0, negative_ttl: float = 5.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.generation = 0
+        self._data: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Contadores
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable) -> Any:
+        """Devuelve el valor cacheado o MISS."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return MISS
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return MISS
+            self._data.move_to_end(key)
+            if value is None:
+                self.negative_hits += 1
+            else:
+                self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, generation: int | None = None) -> None:
+        """
+        Guarda un valor (None = resultado negativo, con negative_ttl).
+        Si se pasa `generation` y ha habido una invalidación desde entonces,
+        el valor se descarta porque puede ser anterior a esa escritura.
+        """
+        if self.maxsize <= 0:
+            return
+        ttl = self.negative_ttl if value is None else self.ttl
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        """Elimina una clave (tras una escritura sobre ese registro)."""
+        with self._lock:
+            self.generation += 1
+            self.invalidations += 1
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """Vacía la caché."""
+        with self._lock:
+            self.generation += 1
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores de aciertos, fallos y expulsiones."""
+        with self._lock:
+            lookups = self.hits + self.negative_hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "negative_ttl": self.negative_ttl,
+                "hits": self.hits,
+                "negative_hits": self.negative_hits,
+                "misses": self.misses,
+                "hit_ratio": round((self.hits + self.negative_hits) / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
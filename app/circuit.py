@@ -0,0 +1,131 @@
+"""
+Circuit breaker de la base de datos primaria (app.database y app.database_async).
+
+Cuando MySQL deja de responder, cada petición esperaría su conexión o su
+consulta hasta el timeout y las peticiones se amontonarían. Tras
+`failures` fallos seguidos de la base de datos (errores de conexión,
+timeouts de lectura o del pool: ver es_transitorio() en app.backends) el
+circuito se abre y, durante `reset` segundos, las operaciones fallan al
+momento con CircuitOpenError (503 con Retry-After en la API) sin tocar la
+base de datos. Pasado ese tiempo deja pasar una sola operación de prueba:
+si va bien se cierra y, si no, vuelve a abrirse.
+
+Los errores de la aplicación (SKU duplicado, sin stock, 404...) no cuentan:
+la base de datos ha respondido.
+"""
+import logging
+import threading
+import time
+from typing import Any, Dict
+
+from app.metrics import Counter, Gauge, REGISTRY
+
+logger = logging.getLogger("bolsos.db")
+
+CERRADO = "closed"
+ABIERTO = "open"
+SEMIABIERTO = "half_open"
+_VALOR_ESTADO = {CERRADO: 0, SEMIABIERTO: 1, ABIERTO: 2}
+
+db_circuit_state = REGISTRY.register(Gauge(
+    "bolsos_db_circuit_state",
+    "Circuit breaker de la base de datos: 0 cerrado, 1 semiabierto, 2 abierto.",
+))
+db_circuit_rejected_total = REGISTRY.register(Counter(
+    "bolsos_db_circuit_rejected_total",
+    "Operaciones rechazadas sin ir a la base de datos con el circuito abierto.",
+))
+
+
+class CircuitOpenError(Exception):
+    """El circuito está abierto: la base de datos no se usa hasta `retry_after` segundos."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Base de datos no disponible; reintentar en {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    - `failures`: fallos seguidos que abren el circuito (0 = desactivado)
+    - `reset`: segundos abierto antes de dejar pasar una operación de prueba
+
+    Lo usan hilos (app.database) y el event loop (app.database_async): el
+    estado se protege con un threading.Lock que solo se toma para
+    actualizar contadores.
+    """
+
+    def __init__(self, failures: int = 5, reset: float = 10.0):
+        self.failures = failures
+        self.reset = reset
+        self.estado = CERRADO
+        self._seguidos = 0
+        self._abierto_hasta = 0.0
+        self._prueba_desde: float | None = None
+        self._lock = threading.Lock()
+
+        # Contadores
+        self.trips = 0
+        self.rejected = 0
+
+    def antes(self) -> None:
+        """Llamar antes de usar la base de datos: CircuitOpenError si está abierto."""
+        if self.failures <= 0 or self.estado == CERRADO:
+            return
+        ahora = time.monotonic()
+        with self._lock:
+            if self.estado == ABIERTO and ahora >= self._abierto_hasta:
+                self._cambiar(SEMIABIERTO)
+            if self.estado == SEMIABIERTO:
+                # Una sola operación de prueba a la vez (otra si la anterior
+                # no ha terminado en `reset` segundos, p. ej. cancelada)
+                if self._prueba_desde is None or ahora - self._prueba_desde >= self.reset:
+                    self._prueba_desde = ahora
+                    return
+                retry_after = self.reset
+            elif self.estado == ABIERTO:
+                retry_after = self._abierto_hasta - ahora
+            else:
+                return
+            self.rejected += 1
+        db_circuit_rejected_total.inc()
+        raise CircuitOpenError(max(1.0, retry_after))
+
+    def exito(self) -> None:
+        """La base de datos ha respondido (aunque sea con un error de la aplicación)."""
+        if self._seguidos == 0 and self.estado == CERRADO:
+            return
+        with self._lock:
+            self._seguidos = 0
+            self._prueba_desde = None
+            if self.estado != CERRADO:
+                self._cambiar(CERRADO)
+
+    def fallo(self, error: BaseException) -> None:
+        """Fallo de la base de datos: abre el circuito tras `failures` seguidos."""
+        if self.failures <= 0:
+            return
+        with self._lock:
+            self._seguidos += 1
+            self._prueba_desde = None
+            if self.estado == SEMIABIERTO or (self.estado == CERRADO and self._seguidos >= self.failures):
+                self._abierto_hasta = time.monotonic() + self.reset
+                self.trips += 1
+                self._cambiar(ABIERTO)
+                logger.warning("Circuito de la base de datos abierto", extra={
+                    "fallos_seguidos": self._seguidos, "reset_s": self.reset, "error": str(error),
+                })
+
+    def _cambiar(self, estado: str) -> None:
+        if estado == CERRADO:
+            logger.info("Circuito de la base de datos cerrado")
+        self.estado = estado
+        db_circuit_state.set(value=_VALOR_ESTADO[estado])
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.estado,
+            "consecutive_failures": self._seguidos,
+            "trips": self.trips,
+            "rejected": self.rejected,
+        }
@@ -1,67 +1,517 @@
 from dotenv import load_dotenv, find_dotenv
+import logging
 import os
+import threading
+import time
+import unicodedata
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Dict, Any, Sequence, Tuple
 import mysql.connector
-from typing import List, Dict, Any, cast
-from mysql.connector.cursor import MySQLCursorDict
+from mysql.connector.constants import ClientFlag
+
+from app.backends import get_backend
+from app.circuit import CircuitBreaker
+from app.metrics import db_connection_acquire, medir_consulta, una_fila
+from app.pagination import ORDENES
+from app.serialization import COLUMNAS_BOLSO
+from app.pool import ConnectionPool
 
 # Carga .env desde la raíz
 load_dotenv(find_dotenv())
 
-def get_connection():
+# Logs de las escrituras (JSON por una cola; ver app.logs)
+logger = logging.getLogger("bolsos.db")
+
+# ========================
+# Consultas SQL (compartidas con app.database_async)
+# ========================
+
+SQL_SELECT_BOLSOS = """
+    SELECT
+        id_bolso,
+        nombre,
+        descripcion,
+        precio,
+        stock,
+        categoria,
+        codigo_sku,
+        activo
+    FROM bolso
+"""
+
+SQL_SELECT_BOLSO_BY_ID = SQL_SELECT_BOLSOS + " WHERE id_bolso = %s"
+
+SQL_INSERT_BOLSO = """
+    INSERT INTO bolso
+        (nombre, descripcion, precio, stock, categoria, codigo_sku, activo)
+    VALUES (%s, %s, %s, %s, %s, %s, %s)
+"""
+
+SQL_UPDATE_BOLSO = """
+    UPDATE bolso
+    SET
+        nombre = %s,
+        descripcion = %s,
+        precio = %s,
+        stock = %s,
+        categoria = %s,
+        codigo_sku = %s,
+        activo = %s
+    WHERE id_bolso = %s
+"""
+
+SQL_DELETE_BOLSO = "DELETE FROM bolso WHERE id_bolso = %s"
+
+# Reserva de stock: una sola sentencia condicional, sin leer antes la fila.
+# Si no hay stock suficiente (o el bolso no existe) no afecta a ninguna fila.
+# Parámetros: (cantidad, id_bolso, cantidad)
+SQL_RESERVAR_STOCK = """
+    UPDATE bolso
+    SET stock = stock - %s
+    WHERE id_bolso = %s AND stock >= %s
+"""
+
+# Cambios desde una versión (GET /bolso/changes). Cada escritura sobre bolso
+# toma un número nuevo del registro bolso_cambio (AUTO_INCREMENT, triggers de
+# la migración 0004): la fila guarda el de su último cambio y los borrados
+# quedan en bolso_borrado. Parámetros: (desde, hasta, limit); `hasta` es la
+# última versión sin huecos pendientes (ver SQL_SELECT_REGISTRO_CAMBIOS)
+SQL_SELECT_CAMBIOS = """
+    SELECT
+        id_bolso,
+        nombre,
+        descripcion,
+        precio,
+        stock,
+        categoria,
+        codigo_sku,
+        activo,
+        version
+    FROM bolso
+    WHERE version > %s AND version <= %s
+    ORDER BY version
+    LIMIT %s
+"""
+
+SQL_SELECT_BORRADOS = """
+    SELECT id_bolso, version
+    FROM bolso_borrado
+    WHERE version > %s AND version <= %s
+    ORDER BY version
+    LIMIT %s
+"""
+
+# Versión del último cambio confirmado en SQLite, donde las escrituras ya se
+# confirman de una en una y en orden de versión
+SQL_SELECT_VERSION = "SELECT valor FROM bolso_version WHERE id = 1"
+
+# MySQL: las versiones salen de un AUTO_INCREMENT, sin bloqueo común entre
+# escrituras, así que pueden confirmarse en otro orden: la 11 puede verse
+# antes que la 10. Para que un cliente nunca se salte un cambio, solo se
+# devuelve hasta la última versión sin huecos en bolso_cambio. Un hueco es
+# de una transacción en curso (esperar) o deshecha (saltarlo): ver
+# SQL_COMPROBAR_HUECO. Parámetros: (desde, limit); edad en microsegundos
+SQL_SELECT_REGISTRO_CAMBIOS = """
+    SELECT version, TIMESTAMPDIFF(MICROSECOND, creado, SYSDATE(6))
+    FROM bolso_cambio
+    WHERE version > %s
+    ORDER BY version
+    LIMIT %s
+"""
+
+# Versiones de un hueco (desde, hasta) exclusivo: si alguna está bloqueada
+# (transacción en curso) falla al momento con ER_LOCK_NOWAIT y, si aparece
+# alguna, se ha confirmado después de la instantánea de la consulta; sin
+# filas, el hueco es de transacciones deshechas
+SQL_COMPROBAR_HUECO = """
+    SELECT version
+    FROM bolso_cambio
+    WHERE version > %s AND version < %s
+    FOR SHARE NOWAIT
+"""
+
+# Punto de partida para la versión actual: N cambios antes del último
+SQL_SELECT_VERSION_ANTERIOR = "SELECT version FROM bolso_cambio ORDER BY version DESC LIMIT 1 OFFSET %s"
+
+# Un hueco cuya versión siguiente tiene menos de estos segundos puede ser de
+# una transacción que ha tomado su número pero aún no ha escrito la fila
+HUECO_GRACIA = 1.0
+# Cambios recientes en los que se buscan huecos para la versión actual
+# (GET /bolso/stream empieza desde ella)
+VENTANA_VERSION = 1000
+
+# Agregados por categoría (GET /bolso/stats los mantiene en memoria y los
+# contrasta periódicamente con esta consulta)
+SQL_AGGREGATE_BOLSOS = """
+    SELECT
+        categoria,
+        COUNT(*) AS bolsos,
+        SUM(activo <> 0) AS activos,
+        SUM(stock) AS stock,
+        SUM(precio) AS precio_sum,
+        MIN(precio) AS precio_min,
+        MAX(precio) AS precio_max
+    FROM bolso
+    GROUP BY categoria
+"""
+
+def sql_in(n: int) -> str:
+    """Placeholders para una cláusula IN con n valores: "%s, %s, ..."."""
+    return ", ".join(["%s"] * n)
+
+def clave_sku(sku: str) -> str:
     """
-    Crea una conexión a MySQL con configuración corregida.
-    
+    Clave con la que el índice único de codigo_sku compara los SKUs: la
+    collation utf8mb4_general_ci de MySQL no distingue mayúsculas ni
+    acentos e ignora los espacios finales ("bólso-1 " == "BOLSO-1").
+    """
+    sin_acentos = "".join(
+        c for c in unicodedata.normalize("NFKD", sku) if not unicodedata.combining(c)
+    )
+    return sin_acentos.rstrip(" ").upper()
+
+def params_insert_bolso(bolso: Dict[str, Any]) -> Tuple[Any, ...]:
+    """Parámetros de SQL_INSERT_BOLSO para un bolso (dict)."""
+    return (bolso["nombre"], bolso.get("descripcion"), bolso["precio"], bolso["stock"],
+            bolso["categoria"], bolso["codigo_sku"], bolso.get("activo", True))
+
+def params_update_bolso(bolso_id: int, bolso: Dict[str, Any]) -> Tuple[Any, ...]:
+    """Parámetros de SQL_UPDATE_BOLSO para un bolso (dict)."""
+    return (bolso["nombre"], bolso.get("descripcion"), bolso["precio"], bolso["stock"],
+            bolso["categoria"], bolso["codigo_sku"], bolso["activo"], bolso_id)
+
+def sql_select_columnas(columnas: Sequence[str] | None = None) -> str:
+    """
+    SELECT de solo esas `columnas` de bolso (None = SQL_SELECT_BOLSOS).
+    Los nombres se validan contra COLUMNAS_BOLSO porque van en el SQL.
+    """
+    if columnas is None:
+        return SQL_SELECT_BOLSOS
+    for columna in columnas:
+        if columna not in COLUMNAS_BOLSO:
+            raise ValueError(f"Columna no válida: {columna}")
+    return f"SELECT {', '.join(columnas)} FROM bolso"
+
+def build_select_by_ids(ids: List[int]) -> Tuple[str, List[int]]:
+    """SELECT de uno o varios bolsos por ID (WHERE id_bolso = / IN). Retorna (sql, params)."""
+    if len(ids) == 1:
+        return SQL_SELECT_BOLSO_BY_ID, list(ids)
+    return SQL_SELECT_BOLSOS + f" WHERE id_bolso IN ({sql_in(len(ids))})", list(ids)
+
+# Filas por sentencia INSERT multi-fila (y SKUs por SELECT ... IN) en las operaciones masivas
+BATCH_INSERT_SIZE = int(os.getenv("BATCH_INSERT_SIZE", "500"))
+
+# Campos actualizables por codigo_sku y los obligatorios para crear un bolso nuevo
+UPSERT_CAMPOS = ("nombre", "descripcion", "precio", "stock", "categoria", "activo")
+UPSERT_CAMPOS_ALTA = ("nombre", "precio", "stock", "categoria")
+
+def build_upsert_bolsos(campos: Tuple[str, ...]) -> str:
+    """
+    INSERT ... ON DUPLICATE KEY UPDATE por codigo_sku (índice único) para
+    los `campos` dados. Con executemany() el conector lo envía como un
+    único INSERT multi-fila: los SKU nuevos se crean y los existentes
+    actualizan solo esos campos.
+    """
+    for campo in campos:
+        if campo not in UPSERT_CAMPOS:
+            raise ValueError(f"Campo no actualizable: {campo}")
+    columnas = ("codigo_sku",) + campos
+    return (
+        f"INSERT INTO bolso ({', '.join(columnas)}) "
+        f"VALUES ({sql_in(len(columnas))}) "
+        "ON DUPLICATE KEY UPDATE "
+        + ", ".join(f"{campo} = VALUES({campo})" for campo in campos)
+    )
+
+def build_update_por_sku(items: List[Dict[str, Any]]) -> Tuple[str, List[Any]]:
+    """
+    Actualización parcial de varios bolsos en UNA sentencia:
+
+        UPDATE bolso SET
+            stock = CASE codigo_sku WHEN %s THEN %s ... ELSE stock END, ...
+        WHERE codigo_sku IN (...)
+
+    Cada item lleva codigo_sku y solo los campos a cambiar; un campo que
+    un item no trae conserva su valor (ELSE campo).
+    Retorna (sql, params).
+    """
+    sets: List[str] = []
+    params: List[Any] = []
+    for campo in UPSERT_CAMPOS:
+        casos = [item for item in items if campo in item]
+        if not casos:
+            continue
+        sets.append(
+            f"{campo} = CASE codigo_sku "
+            + " ".join("WHEN %s THEN %s" for _ in casos)
+            + f" ELSE {campo} END"
+        )
+        for item in casos:
+            params.extend([item["codigo_sku"], item[campo]])
+    if not sets:
+        raise ValueError("Ningún campo que actualizar")
+
+    skus = [item["codigo_sku"] for item in items]
+    sql = f"UPDATE bolso SET {', '.join(sets)} WHERE codigo_sku IN ({sql_in(len(skus))})"
+    return sql, params + skus
+
+class DuplicateSkuError(Exception):
+    """Se intentó insertar un codigo_sku que ya existe en la tabla bolso."""
+
+class StockInsuficienteError(Exception):
+    """
+    Alguna reserva no se pudo aplicar (stock insuficiente o el bolso no
+    existe). `ids` son los bolsos que fallaron; no se reservó ninguno.
+    """
+
+    def __init__(self, ids: List[int]):
+        super().__init__(f"Stock insuficiente para los bolsos {ids}")
+        self.ids = ids
+
+def build_select_bolsos(
+    categoria: str | None = None,
+    activo: bool | None = None,
+    precio_min: float | None = None,
+    precio_max: float | None = None,
+    con_stock: bool = False,
+    orden: str = "id_bolso",
+    after: Tuple[Any, ...] | None = None,
+    limit: int | None = None,
+    columnas: Sequence[str] | None = None,
+) -> Tuple[str, List[Any]]:
+    """
+    Construye el SELECT de listado con filtros, orden y paginación keyset.
+
+    - Todos los filtros van en el WHERE (nada se filtra en Python)
+    - `orden`: una clave de app.pagination.ORDENES ("-" = descendente)
+    - `after`: valores de la clave de la última fila de la página anterior;
+      se traduce a `WHERE (col, id_bolso) > (...)` expandido, que MySQL
+      resuelve con un range scan sobre el índice en vez de un OFFSET
+    - `limit`: número máximo de filas (None = sin límite)
+    - `columnas`: solo esas columnas, en ese orden (None = las de
+      SQL_SELECT_BOLSOS); deben ser de COLUMNAS_BOLSO
+
+    Retorna (sql, params).
+    """
+    clave = ORDENES[orden]
+    descendente = orden.startswith("-")
+    where: List[str] = []
+    params: List[Any] = []
+
+    if categoria is not None:
+        where.append("categoria = %s")
+        params.append(categoria)
+    if activo is not None:
+        where.append("activo = %s")
+        params.append(int(activo))
+    if precio_min is not None:
+        where.append("precio >= %s")
+        params.append(precio_min)
+    if precio_max is not None:
+        where.append("precio <= %s")
+        params.append(precio_max)
+    if con_stock:
+        where.append("stock > 0")
+
+    if after is not None:
+        op = "<" if descendente else ">"
+        if len(clave) == 1:
+            where.append(f"{clave[0]} {op} %s")
+            params.append(after[0])
+        else:
+            # El primer término (redundante) acota el rango del índice: sin él,
+            # SQLite no puede saltar al cursor con el OR y recorre el índice
+            where.append(
+                f"{clave[0]} {op}= %s AND "
+                f"({clave[0]} {op} %s OR ({clave[0]} = %s AND id_bolso {op} %s))"
+            )
+            params.extend([after[0], after[0], after[0], after[1]])
+
+    sql = sql_select_columnas(columnas)
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    direccion = "DESC" if descendente else "ASC"
+    sql += " ORDER BY " + ", ".join(f"{col} {direccion}" for col in clave)
+    if limit is not None:
+        sql += " LIMIT %s"
+        params.append(limit)
+    return sql, params
+
+_pool: ConnectionPool | None = None
+_pool_lock = threading.Lock()
+
+# Circuit breaker de la base de datos, compartido con app.database_async
+# - DB_BREAKER_FAILURES: fallos seguidos que lo abren (0 = desactivado)
+# - DB_BREAKER_RESET: segundos abierto antes de probar de nuevo
+circuito = CircuitBreaker(
+    failures=int(os.getenv("DB_BREAKER_FAILURES", "5")),
+    reset=float(os.getenv("DB_BREAKER_RESET", "10")),
+)
+
+# Conexión de la unidad de trabajo en curso (ver transaction())
+_current_conn: ContextVar[Any] = ContextVar("_current_conn", default=None)
+
+def connection_params() -> Dict[str, Any]:
+    """
+    Parámetros de conexión a MySQL leídos de las variables DB_*.
+    Los comparten el driver síncrono y el asíncrono (app.database_async).
+
     CAMBIOS IMPORTANTES:
     - charset='utf8mb4' (antes era 'utf8mb4_general_ci' que causaba error)
     - autocommit=False para asegurar control manual de transacciones
+    - FOUND_ROWS: rowcount de un UPDATE cuenta filas encontradas, no solo
+      las modificadas (un UPDATE con los mismos datos no es un "no encontrado")
+    - DB_CONNECT_TIMEOUT: segundos máximos para abrir una conexión (por defecto 5)
+    - DB_READ_TIMEOUT: segundos máximos esperando cada respuesta del servidor
+      (y cada envío), en enteros (por defecto 30; 0 = sin límite)
     """
-    return mysql.connector.connect(
+    params = dict(
         host=os.getenv("DB_HOST", "localhost"),
         user=os.getenv("DB_USER", "Yasbel"),
         password=os.getenv("DB_PASSWORD", "1234567"),
         database=os.getenv("DB_NAME", "bolsosapp"),
         port=int(os.getenv("DB_PORT", "3306")),
         charset="utf8mb4",  # ✅ CORREGIDO: era utf8mb4_general_ci (collation)
-        autocommit=False     # ✅ AÑADIDO: Asegura que necesitamos commit explícito
+        autocommit=False,    # ✅ AÑADIDO: Asegura que necesitamos commit explícito
+        client_flags=[ClientFlag.FOUND_ROWS],
+        connection_timeout=int(os.getenv("DB_CONNECT_TIMEOUT", "5")),
     )
+    read_timeout = int(os.getenv("DB_READ_TIMEOUT", "30"))
+    if read_timeout > 0:
+        params.update(read_timeout=read_timeout, write_timeout=read_timeout)
+    return params
 
-def fetch_all_bolsos() -> List[Dict[str, Any]]:
+def pool_params() -> Dict[str, Any]:
     """
-    Ejecuta SELECT * FROM bolso y devuelve una lista de dicts.
+    Configuración del pool leída de las variables DB_POOL_*:
+    - DB_POOL_SIZE: conexiones máximas abiertas (por defecto 5)
+    - DB_POOL_TIMEOUT: segundos de espera por una conexión libre (por defecto 10)
+    - DB_POOL_RECYCLE: segundos de vida máxima de una conexión (por defecto 3600)
+    - DB_POOL_VALIDATE_IDLE: segundos ociosa antes de hacer ping al reutilizarla (por defecto 30)
+    """
+    return dict(
+        size=int(os.getenv("DB_POOL_SIZE", "5")),
+        timeout=float(os.getenv("DB_POOL_TIMEOUT", "10")),
+        recycle=float(os.getenv("DB_POOL_RECYCLE", "3600")),
+        validate_idle=float(os.getenv("DB_POOL_VALIDATE_IDLE", "30")),
+    )
+
+def create_connection():
+    """
+    Crea una conexión NUEVA a MySQL (handshake TCP + autenticación).
+    La usa el pool para abrir conexiones; el resto del código debe usar get_connection().
+    """
+    return mysql.connector.connect(**connection_params())
+
+def _validate_connection(conn) -> bool:
+    """Comprueba que una conexión ociosa sigue viva (ping al servidor)."""
+    return conn.is_connected()
+
+def get_pool() -> ConnectionPool:
+    """
+    Devuelve el pool de conexiones, creándolo la primera vez.
+    Se configura con las variables DB_POOL_* (ver pool_params()).
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    creator=create_connection,
+                    validator=_validate_connection,
+                    **pool_params()
+                )
+    return _pool
+
+def get_connection() -> Any:
     """
-    conn = None
+    Obtiene una conexión del backend configurado (DB_BACKEND).
+    Con MySQL es una conexión del pool: se usa igual que una conexión normal
+    y close() la devuelve al pool en lugar de cerrar el socket (y deshace
+    cualquier transacción sin commit).
+    Con el circuito abierto lanza CircuitOpenError sin esperar (ver app.circuit).
+    """
+    circuito.antes()
+    backend = get_backend()
+    inicio = time.perf_counter()
     try:
-        conn = get_connection()
+        conn = backend.connect()
+    except Exception as e:
+        if backend.es_transitorio(e):
+            circuito.fallo(e)
+        raise
+    db_connection_acquire.observe(time.perf_counter() - inicio)
+    return conn
 
-        cur: MySQLCursorDict
-        cur = conn.cursor(dictionary=True)  # type: ignore[assignment]
+def get_pool_stats() -> Dict[str, Any]:
+    """
+    Estadísticas del backend. Con MySQL, las del pool: conexiones en uso
+    y ociosas, esperas, timeouts y latencia de checkout (ms).
+    """
+    return get_backend().stats()
 
-        try:
-            cur.execute(
-                """
-                SELECT
-                    id_bolso,
-                    nombre,
-                    descripcion,
-                    precio,
-                    stock,
-                    categoria,
-                    codigo_sku,
-                    activo
-                FROM bolso;
-                """
-            )
+@contextmanager
+def transaction() -> Iterator[Any]:
+    """
+    Unidad de trabajo: una conexión y una transacción compartidas por todas
+    las funciones de este módulo llamadas dentro del bloque `with`.
 
-            rows = cast(List[Dict[str, Any]], cur.fetchall())
-            return rows
+    - COMMIT al salir sin errores, ROLLBACK si se lanza una excepción
+    - Si ya hay una transacción en curso, se reutiliza (no se anida)
 
-        finally:
-            cur.close()
+    Ejemplo:
+        with transaction():
+            nuevo_id = insert_bolso(...)
+            bolso = fetch_bolso_by_id(nuevo_id)  # misma conexión y transacción
+    """
+    actual = _current_conn.get()
+    if actual is not None:
+        yield actual
+        return
 
+    conn = get_connection()
+    token = _current_conn.set(conn)
+    try:
+        yield conn
+        conn.commit()
+    except Exception as e:
+        registrar_resultado(e)
+        conn.rollback()
+        raise
     finally:
-        if conn:
-            conn.close()
+        _current_conn.reset(token)
+        conn.close()
+    circuito.exito()
+
+def registrar_resultado(error: BaseException | None) -> None:
+    """Cuenta en el circuit breaker el resultado de una operación en la base de datos."""
+    if error is not None and get_backend().es_transitorio(error):
+        circuito.fallo(error)
+    else:
+        circuito.exito()
+
+def _bolso(
+    nombre: str,
+    descripcion: str | None,
+    precio: float,
+    stock: int,
+    categoria: str,
+    codigo_sku: str,
+    activo: bool
+) -> Dict[str, Any]:
+    return dict(nombre=nombre, descripcion=descripcion, precio=precio, stock=stock,
+                categoria=categoria, codigo_sku=codigo_sku, activo=activo)
+
+@medir_consulta(filas=len)
+def fetch_all_bolsos() -> List[Dict[str, Any]]:
+    """
+    Ejecuta SELECT * FROM bolso y devuelve una lista de dicts.
+    """
+    with transaction() as conn:
+        return get_backend().fetch_all(conn)
 
+@medir_consulta()
 def insert_bolso(
     nombre: str,
     descripcion: str | None,
@@ -77,119 +527,52 @@ def insert_bolso(
     
     ⚠️ IMPORTANTE: Ahora incluye manejo de errores mejorado
     """
-    conn = None
-    try:
-        conn = get_connection()
-        cur = conn.cursor()
+    with transaction() as conn:
         try:
-            cur.execute(
-                """
-                INSERT INTO bolso
-                    (nombre, descripcion, precio, stock, categoria, codigo_sku, activo)
-                VALUES (%s, %s, %s, %s, %s, %s, %s)
-                """,
-                (
-                    nombre,
-                    descripcion,
-                    precio,
-                    stock,
-                    categoria,
-                    codigo_sku,
-                    activo
-                )
+            # ✅ El COMMIT (o ROLLBACK si hay error) lo hace la transacción
+            inserted_id = get_backend().insert(
+                conn,
+                _bolso(nombre, descripcion, precio, stock, categoria, codigo_sku, activo)
             )
-            # ✅ CRÍTICO: COMMIT para guardar cambios
-            conn.commit()
-            
-            inserted_id = cur.lastrowid or 0
             
             # Log para debug (puedes comentarlo después)
-            print(f"[DEBUG] INSERT exitoso - ID: {inserted_id}")
+            logger.debug("INSERT exitoso", extra={"bolso_id": inserted_id})
             
             return inserted_id
             
         except Exception as e:
-            # ✅ AÑADIDO: Rollback en caso de error
-            conn.rollback()
-            print(f"[ERROR] Error en insert_bolso: {e}")
+            logger.error("Error en insert_bolso", extra={"error": str(e)})
             raise  # Re-lanzar la excepción para que FastAPI la maneje
-        finally:
-            cur.close()
-    finally:
-        if conn:
-            conn.close()
 
+@medir_consulta()
 def delete_bolso(bolso_id: int) -> bool:
     """
     Elimina un bolso de la base de datos por su ID.
     Retorna True si se eliminó correctamente, False si no se encontró.
     """
-    conn = None
-    try:
-        conn = get_connection()
-        cur = conn.cursor()
+    with transaction() as conn:
         try:
-            cur.execute(
-                "DELETE FROM bolso WHERE id_bolso = %s",
-                (bolso_id,)
-            )
-            # ✅ CRÍTICO: COMMIT para guardar cambios
-            conn.commit()
-            
-            deleted = cur.rowcount > 0
+            deleted = get_backend().delete(conn, bolso_id)
             
             # Log para debug
-            print(f"[DEBUG] DELETE - ID: {bolso_id}, Eliminado: {deleted}")
+            logger.debug("DELETE", extra={"bolso_id": bolso_id, "deleted": deleted})
             
             return deleted
             
         except Exception as e:
-            conn.rollback()
-            print(f"[ERROR] Error en delete_bolso: {e}")
+            logger.error("Error en delete_bolso", extra={"error": str(e)})
             raise
-        finally:
-            cur.close()
-    finally:
-        if conn:
-            conn.close()
 
+@medir_consulta(filas=una_fila)
 def fetch_bolso_by_id(bolso_id: int) -> Dict[str, Any] | None:
     """
     Obtiene un bolso por su ID.
     Retorna un dict con los datos del bolso o None si no existe.
     """
-    conn = None
-    try:
-        conn = get_connection()
-
-        cur: MySQLCursorDict
-        cur = conn.cursor(dictionary=True)  # type: ignore[assignment]
-
-        try:
-            cur.execute(
-                """
-                SELECT
-                    id_bolso,
-                    nombre,
-                    descripcion,
-                    precio,
-                    stock,
-                    categoria,
-                    codigo_sku,
-                    activo
-                FROM bolso
-                WHERE id_bolso = %s
-                """,
-                (bolso_id,)
-            )
-            result = cur.fetchone()
-            return dict(result) if result else None
-        finally:
-            cur.close()
-    finally:
-        if conn:
-            conn.close()
+    with transaction() as conn:
+        return get_backend().select_by_ids(conn, [bolso_id]).get(bolso_id)
 
+@medir_consulta()
 def update_bolso(
     bolso_id: int,
     nombre: str,
@@ -204,51 +587,20 @@ def update_bolso(
     Actualiza los datos de un bolso existente.
     Retorna True si se actualizó correctamente, False si no se encontró.
     """
-    conn = None
-    try:
-        conn = get_connection()
-        cur = conn.cursor()
+    with transaction() as conn:
         try:
-            cur.execute(
-                """
-                UPDATE bolso
-                SET
-                    nombre = %s,
-                    descripcion = %s,
-                    precio = %s,
-                    stock = %s,
-                    categoria = %s,
-                    codigo_sku = %s,
-                    activo = %s
-                WHERE id_bolso = %s
-                """,
-                (
-                    nombre,
-                    descripcion,
-                    precio,
-                    stock,
-                    categoria,
-                    codigo_sku,
-                    activo,
-                    bolso_id
-                )
+            # Con FOUND_ROWS, rowcount cuenta la fila aunque no cambie ningún valor
+            updated = get_backend().update(
+                conn,
+                bolso_id,
+                _bolso(nombre, descripcion, precio, stock, categoria, codigo_sku, activo)
             )
-            # ✅ CRÍTICO: COMMIT para guardar cambios
-            conn.commit()
-            
-            updated = cur.rowcount > 0
             
             # Log para debug
-            print(f"[DEBUG] UPDATE - ID: {bolso_id}, Actualizado: {updated}")
+            logger.debug("UPDATE", extra={"bolso_id": bolso_id, "updated": updated})
             
             return updated
             
         except Exception as e:
-            conn.rollback()
-            print(f"[ERROR] Error en update_bolso: {e}")
+            logger.error("Error en update_bolso", extra={"error": str(e)})
             raise
-        finally:
-            cur.close()
-    finally:
-        if conn:
-            conn.close()
\ No newline at end of file
@@ -0,0 +1,716 @@
+"""
+Variante asíncrona (asyncio) de app.database para los endpoints de FastAPI.
+
+El almacenamiento lo hace el backend configurado en DB_BACKEND (ver
+app.backends): con MySQL, mysql.connector.aio con un AsyncConnectionPool,
+así que mientras una petición espera a MySQL no ocupa ningún hilo del
+threadpool de Starlette. Aquí quedan la unidad de trabajo, la caché, el
+agrupador de lecturas y las notificaciones de escritura.
+Las funciones síncronas de app.database se mantienen para scripts y tests.
+"""
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Awaitable, Callable, List, Dict, Any, Sequence, Tuple, TypeVar
+
+from app.database import (
+    UPSERT_CAMPOS, UPSERT_CAMPOS_ALTA, StockInsuficienteError, circuito, clave_sku, registrar_resultado,
+)
+from app.backends import get_async_backend
+from app.cache import MISS, TTLCache
+from app.loader import BatchLoader
+from app.metrics import db_connection_acquire, medir_consulta, una_fila
+from app.replicas import leer_del_primario, marcar_escritura_cliente, replicas_desde_env
+from app.reservas import ReservaBatcher, contar_reservas
+
+T = TypeVar("T")
+
+# Logs de las escrituras (JSON por una cola; ver app.logs)
+logger = logging.getLogger("bolsos.db")
+
+# Conexión de la unidad de trabajo en curso (ver transaction())
+_current_conn: ContextVar[Any] = ContextVar("_current_conn_async", default=None)
+# Acciones a ejecutar cuando la transacción en curso haga COMMIT
+_on_commit: ContextVar[List[Callable[[], None]] | None] = ContextVar(
+    "_on_commit_async", default=None
+)
+
+# Funciones llamadas tras el COMMIT de cada escritura: listener(accion, bolso_id)
+_write_listeners: List[Callable[[str, int], None]] = []
+
+# Caché de fetch_bolso_by_id (LRU + TTL, con caché negativa para los 404)
+# - CACHE_BOLSO_MAXSIZE: entradas máximas (0 = desactivada, por defecto 1024)
+# - CACHE_BOLSO_TTL: segundos de vida de un bolso cacheado (por defecto 30)
+# - CACHE_BOLSO_NEGATIVE_TTL: segundos de vida de un "no existe" (por defecto 5)
+bolso_cache = TTLCache(
+    maxsize=int(os.getenv("CACHE_BOLSO_MAXSIZE", "1024")),
+    ttl=float(os.getenv("CACHE_BOLSO_TTL", "30")),
+    negative_ttl=float(os.getenv("CACHE_BOLSO_NEGATIVE_TTL", "5")),
+)
+
+# Réplicas de lectura (DB_REPLICAS; None = todo al primario, ver app.replicas)
+replicas = replicas_desde_env(lambda: fetch_current_version())
+
+async def close_pool() -> None:
+    """Cierra las conexiones del backend (al apagar la aplicación)."""
+    await get_async_backend().close()
+    if replicas is not None:
+        await replicas.close()
+
+async def get_connection() -> Any:
+    """
+    Obtiene una conexión del backend; `await conn.close()` la devuelve.
+    Con el circuito abierto lanza CircuitOpenError sin esperar (ver app.circuit).
+    """
+    circuito.antes()
+    backend = get_async_backend()
+    inicio = time.perf_counter()
+    try:
+        conn = await backend.connect()
+    except Exception as e:
+        if backend.es_transitorio(e):
+            circuito.fallo(e)
+        raise
+    db_connection_acquire.observe(time.perf_counter() - inicio)
+    return conn
+
+def get_pool_stats() -> Dict[str, Any]:
+    """
+    Estadísticas del backend asíncrono (con MySQL, las del pool), del
+    circuit breaker y de las réplicas.
+    """
+    stats = {**get_async_backend().stats(), "circuit": circuito.stats()}
+    if replicas is not None:
+        stats = {**stats, "replicas": replicas.stats()}
+    return stats
+
+@asynccontextmanager
+async def transaction() -> AsyncIterator[Any]:
+    """
+    Unidad de trabajo asíncrona: una conexión y una transacción compartidas
+    por todas las funciones de este módulo llamadas dentro del `async with`.
+
+    - COMMIT al salir sin errores, ROLLBACK si se lanza una excepción
+    - Si ya hay una transacción en curso, se reutiliza (no se anida)
+    - Tras el COMMIT se ejecutan las acciones registradas con _after_commit()
+      (invalidación de cachés); si hay ROLLBACK se descartan
+    - El resultado cuenta para el circuit breaker (app.circuit)
+    """
+    actual = _current_conn.get()
+    if actual is not None:
+        yield actual
+        return
+
+    conn = await get_connection()
+    callbacks: List[Callable[[], None]] = []
+    token = _current_conn.set(conn)
+    token_callbacks = _on_commit.set(callbacks)
+    try:
+        yield conn
+        await conn.commit()
+    except BaseException as e:
+        if isinstance(e, Exception):
+            registrar_resultado(e)
+        await conn.rollback()
+        raise
+    finally:
+        _on_commit.reset(token_callbacks)
+        _current_conn.reset(token)
+        await conn.close()
+    circuito.exito()
+
+    for callback in callbacks:
+        callback()
+
+def _after_commit(callback: Callable[[], None]) -> None:
+    """
+    Registra una acción para cuando la transacción en curso haga COMMIT.
+    Fuera de una transacción se ejecuta inmediatamente.
+    """
+    callbacks = _on_commit.get()
+    if callbacks is None:
+        callback()
+    else:
+        callbacks.append(callback)
+
+def add_write_listener(listener: Callable[[str, int], None]) -> None:
+    """
+    Suscribe una función a las escrituras confirmadas sobre la tabla bolso.
+    Se llama como listener(accion, bolso_id) tras el COMMIT, con
+    accion = "insert" | "update" | "delete". Sirve para invalidar cachés
+    o vistas derivadas del catálogo.
+    """
+    _write_listeners.append(listener)
+
+def _notify_write(accion: str, bolso_id: int) -> None:
+    """Programa la notificación de una escritura para después del COMMIT."""
+    def notify() -> None:
+        # El cliente que escribe lee del primario durante un tiempo
+        # (app.replicas); con ROLLBACK no hay nada que leer del primario
+        marcar_escritura_cliente()
+        for listener in _write_listeners:
+            listener(accion, bolso_id)
+    _after_commit(notify)
+
+def _elegir_replica(replica: bool) -> Any:
+    """Réplica para una lectura fuera de transacción (None = primario)."""
+    if replicas is None:
+        return None
+    if replica and not leer_del_primario():
+        return replicas.elegir()
+    replicas.leer_en_primario()
+    return None
+
+async def _leer(op: Callable[[Any, Any], Awaitable[T]], replica: bool = True) -> T:
+    """
+    Ejecuta una lectura `op(backend, conn)`. Dentro de una transacción usa su
+    conexión; fuera, una réplica de DB_REPLICAS si las hay (salvo que el
+    cliente acabe de escribir o replica=False). Si la réplica falla, se
+    retira del reparto y la lectura se repite en el primario.
+    """
+    nodo = _elegir_replica(replica) if _current_conn.get() is None else None
+    if nodo is not None:
+        try:
+            conn = await nodo.backend.connect()
+            try:
+                resultado = await op(nodo.backend, conn)
+                await conn.commit()
+            finally:
+                await conn.close()
+            return resultado
+        except Exception as e:
+            replicas.retirar(nodo, e)
+
+    async with transaction() as conn:
+        return await op(get_async_backend(), conn)
+
+# Agrupa las lecturas por ID que no están en caché (DataLoader + singleflight)
+# - BOLSO_LOADER_WINDOW_MS: ventana para juntar lecturas (0 = misma vuelta del event loop)
+# - BOLSO_LOADER_MAX_BATCH: IDs máximos por SELECT ... IN
+bolso_loader: BatchLoader[int, Dict[str, Any]] = BatchLoader(
+    lambda ids: _cargar_bolsos(ids),
+    window=float(os.getenv("BOLSO_LOADER_WINDOW_MS", "0")) / 1000,
+    max_batch=int(os.getenv("BOLSO_LOADER_MAX_BATCH", "500")),
+    version=lambda: bolso_cache.generation,
+)
+
+# La caché por ID es la primera suscriptora
+add_write_listener(lambda accion, bolso_id: bolso_cache.invalidate(bolso_id))
+if replicas is not None:
+    # Los bolsos recién escritos se leen del primario (ver _select_bolsos_by_ids)
+    add_write_listener(lambda accion, bolso_id: replicas.marcar_escritura(bolso_id))
+
+# Agrupa las reservas concurrentes de stock (ver app.reservas)
+# - RESERVA_BATCH: "1" para agruparlas (por defecto "0": un UPDATE por reserva)
+# - RESERVA_BATCH_WINDOW_MS: ventana para juntarlas (0 = misma vuelta del event loop)
+# - RESERVA_BATCH_MAX: reservas máximas por lote
+reserva_batcher = ReservaBatcher(
+    lambda pedidos: reservar_stock_lote(pedidos),
+    enabled=os.getenv("RESERVA_BATCH", "0") == "1",
+    window=float(os.getenv("RESERVA_BATCH_WINDOW_MS", "0")) / 1000,
+    max_batch=int(os.getenv("RESERVA_BATCH_MAX", "100")),
+)
+
+def get_cache_stats() -> Dict[str, Any]:
+    """
+    Contadores de la caché de bolsos (aciertos, fallos, expulsiones...)
+    y del agrupador de lecturas por ID (lotes y lecturas compartidas).
+    """
+    return {**bolso_cache.stats(), "loader": bolso_loader.stats()}
+
+@medir_consulta(filas=len)
+async def fetch_all_bolsos(dictionary: bool = True, replica: bool = True) -> List[Dict[str, Any]]:
+    """
+    Ejecuta SELECT * FROM bolso y devuelve una lista de dicts.
+    Con dictionary=False devuelve tuplas en el orden de SQL_SELECT_BOLSOS
+    (más baratas de construir; ver app.serialization).
+    Con replica=False se lee del primario aunque haya réplicas.
+    """
+    return await _leer(lambda backend, conn: backend.fetch_all(conn, dictionary), replica)
+
+@medir_consulta(filas=len)
+async def fetch_bolsos_page(
+    categoria: str | None = None,
+    activo: bool | None = None,
+    precio_min: float | None = None,
+    precio_max: float | None = None,
+    con_stock: bool = False,
+    orden: str = "id_bolso",
+    after: Tuple[Any, ...] | None = None,
+    limit: int | None = None,
+    dictionary: bool = True,
+    columnas: Sequence[str] | None = None,
+) -> List[Dict[str, Any]]:
+    """
+    Devuelve una página de bolsos filtrada y ordenada en SQL
+    (ver app.database.build_select_bolsos). Con dictionary=False, tuplas.
+    Con `columnas`, el SELECT trae solo esas (en ese orden).
+    """
+    return await _leer(lambda backend, conn: backend.fetch_page(
+            conn,
+            categoria=categoria,
+            activo=activo,
+            precio_min=precio_min,
+            precio_max=precio_max,
+            con_stock=con_stock,
+            orden=orden,
+            after=after,
+            limit=limit,
+            dictionary=dictionary,
+            columnas=columnas,
+        ))
+
+@medir_consulta()
+async def iter_bolsos(
+    chunk_size: int = 1000,
+    dictionary: bool = True,
+    replica: bool = True,
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """
+    Recorre el catálogo completo en bloques de `chunk_size` filas.
+
+    Con MySQL usa un cursor sin buffer (las filas se leen del socket a
+    medida que se piden con fetchmany), así la memoria depende del tamaño
+    del bloque y no del tamaño de la tabla. Ocupa una conexión del pool
+    mientras dura el recorrido; si se abandona a medias, la conexión se
+    descarta porque aún tiene filas pendientes de leer. Con dictionary=False, tuplas.
+    Con réplicas, recorre una (replica=False: el primario); si falla antes
+    del primer bloque, se recorre el primario.
+    """
+    nodo = _elegir_replica(replica)
+    if nodo is not None:
+        leidos = False
+        try:
+            async for rows in nodo.backend.iter_all(chunk_size, dictionary):
+                leidos = True
+                yield rows
+            return
+        except Exception as e:
+            replicas.retirar(nodo, e)
+            if leidos:
+                raise
+    circuito.antes()
+    try:
+        async for rows in get_async_backend().iter_all(chunk_size, dictionary):
+            yield rows
+    except Exception as e:
+        registrar_resultado(e)
+        raise
+    circuito.exito()
+
+@medir_consulta(filas=una_fila)
+async def fetch_bolso_by_id(bolso_id: int) -> Dict[str, Any] | None:
+    """
+    Obtiene un bolso por su ID.
+    Retorna un dict con los datos del bolso o None si no existe.
+
+    Fuera de una transacción es una lectura a través de la caché (incluidos
+    los "no existe"); los fallos pasan por bolso_loader, que agrupa las
+    lecturas concurrentes en un único SELECT ... IN. Dentro de una transacción
+    va siempre a MySQL, para que un endpoint de escritura lea su propia
+    escritura y no cachee datos sin COMMIT.
+    """
+    if _current_conn.get() is not None:
+        rows = await _select_bolsos_by_ids([bolso_id])
+        return rows.get(bolso_id)
+
+    cached = bolso_cache.get(bolso_id)
+    if cached is not MISS:
+        return dict(cached) if cached else None
+
+    row = await bolso_loader.load(bolso_id)
+    return dict(row) if row else None
+
+@medir_consulta(filas=len)
+async def fetch_bolsos_by_ids(ids: List[int]) -> List[Dict[str, Any]]:
+    """
+    Obtiene varios bolsos por ID, en el orden pedido (los que no existen se omiten).
+    Los que no están en caché se leen con un único SELECT ... WHERE id_bolso IN (...).
+    """
+    ids = list(dict.fromkeys(ids))
+    if _current_conn.get() is not None:
+        rows = await _select_bolsos_by_ids(ids)
+        return [rows[i] for i in ids if i in rows]
+
+    encontrados: Dict[int, Dict[str, Any] | None] = {}
+    faltan: List[int] = []
+    for bolso_id in ids:
+        cached = bolso_cache.get(bolso_id)
+        if cached is MISS:
+            faltan.append(bolso_id)
+        else:
+            encontrados[bolso_id] = cached
+    if faltan:
+        encontrados.update(await bolso_loader.load_many(faltan))
+    return [dict(encontrados[i]) for i in ids if encontrados.get(i)]
+
+async def _cargar_bolsos(ids: List[int]) -> Dict[int, Dict[str, Any]]:
+    """
+    Función de lote de bolso_loader: un SELECT ... IN para todos los IDs
+    pendientes y guarda el resultado (también los "no existe") en la caché.
+    """
+    generation = bolso_cache.generation
+    rows = await _select_bolsos_by_ids(ids)
+    for bolso_id in ids:
+        bolso_cache.set(bolso_id, rows.get(bolso_id), generation=generation)
+    return rows
+
+@medir_consulta(filas=len)
+async def _select_bolsos_by_ids(ids: List[int]) -> Dict[int, Dict[str, Any]]:
+    """
+    SELECT de varios bolsos por ID, sin caché. Retorna {id_bolso: fila}.
+    Con réplicas, los escritos hace menos de REPLICA_STICKY_SECONDS se leen
+    del primario (una réplica atrasada devolvería la versión anterior).
+    """
+    if not ids:
+        return {}
+    if replicas is None or _current_conn.get() is not None:
+        return await _leer(lambda backend, conn: backend.select_by_ids(conn, ids))
+
+    recientes = [i for i in ids if replicas.reciente(i)]
+    resto = [i for i in ids if not replicas.reciente(i)] if recientes else ids
+    rows: Dict[int, Dict[str, Any]] = {}
+    if resto:
+        rows.update(await _leer(lambda backend, conn: backend.select_by_ids(conn, resto)))
+    if recientes:
+        rows.update(await _leer(lambda backend, conn: backend.select_by_ids(conn, recientes), replica=False))
+    return rows
+
+@medir_consulta()
+async def insert_bolso(
+    nombre: str,
+    descripcion: str | None,
+    precio: float,
+    stock: int,
+    categoria: str,
+    codigo_sku: str,
+    activo: bool = True
+) -> int:
+    """
+    Inserta un nuevo bolso en la base de datos.
+    Retorna el ID del bolso insertado.
+    """
+    async with transaction() as conn:
+        try:
+            inserted_id = await get_async_backend().insert(conn, dict(
+                nombre=nombre, descripcion=descripcion, precio=precio, stock=stock,
+                categoria=categoria, codigo_sku=codigo_sku, activo=activo
+            ))
+            # Invalida también un posible "no existe" cacheado para este ID
+            _notify_write("insert", inserted_id)
+
+            # Log para debug
+            logger.debug("INSERT exitoso", extra={"bolso_id": inserted_id})
+
+            return inserted_id
+
+        except Exception as e:
+            logger.error("Error en insert_bolso", extra={"error": str(e)})
+            raise
+
+@medir_consulta(filas=len)
+async def fetch_skus_existentes(skus: List[str]) -> Dict[str, int]:
+    """
+    Devuelve {codigo_sku: id_bolso} de los `skus` que ya existen
+    (un SELECT ... IN por cada BATCH_INSERT_SIZE SKUs).
+    """
+    if not skus:
+        return {}
+    async with transaction() as conn:
+        return await get_async_backend().skus_existentes(conn, skus)
+
+@medir_consulta(filas=len)
+async def fetch_catalog_aggregates() -> List[Dict[str, Any]]:
+    """
+    Agregados por categoría calculados en SQL (SQL_AGGREGATE_BOLSOS): número
+    de bolsos, activos, stock total y suma, mínimo y máximo del precio.
+    Recorre la tabla: se usa solo para contrastar los agregados en memoria.
+    """
+    async with transaction() as conn:
+        return await get_async_backend().aggregate(conn)
+
+async def _cambios_desde(
+    since: int, limit: int, replica: bool = False,
+) -> Tuple[List[Tuple[int, bool, Any]], bool]:
+    rows, borrados = await _leer(lambda backend, conn: backend.changes(conn, since, limit + 1), replica)
+
+    # Cada cambio tiene su propia versión: se mezclan las dos listas y se corta
+    # en `limit`, así la siguiente petición sigue justo donde acaba esta
+    cambios: List[Tuple[int, bool, Any]] = [(row[-1], False, row[:-1]) for row in rows]
+    cambios += [(version, True, bolso_id) for bolso_id, version in borrados]
+    cambios.sort(key=lambda c: c[0])
+    return cambios[:limit], len(cambios) > limit
+
+@medir_consulta(filas=lambda r: len(r["cambiados"]) + len(r["borrados"]))
+async def fetch_changes(since: int, limit: int) -> Dict[str, Any]:
+    """
+    Cambios del catálogo posteriores a la versión `since` (0 = todo el
+    catálogo), en orden de versión y hasta `limit` entre filas y borrados:
+    {"cambiados": filas (tuplas como SQL_SELECT_BOLSOS), "borrados": IDs,
+    "version": la del último cambio devuelto (o `since` si no hay ninguno),
+    "hay_mas": si quedan cambios después de "version"}.
+    Con réplicas se lee de una: el cliente vuelve a pedir desde "version",
+    así que un retraso solo aplaza los cambios a la siguiente petición.
+    """
+    cambios, hay_mas = await _cambios_desde(since, limit, replica=True)
+    return {
+        "cambiados": [valor for _, borrado, valor in cambios if not borrado],
+        "borrados": [valor for _, borrado, valor in cambios if borrado],
+        "version": cambios[-1][0] if cambios else since,
+        "hay_mas": hay_mas,
+    }
+
+@medir_consulta(filas=lambda r: len(r[0]))
+async def fetch_change_log(since: int, limit: int) -> Tuple[List[Tuple[int, bool, Any]], bool]:
+    """
+    Como fetch_changes, pero cada cambio con su versión, en orden:
+    ([(version, borrado, fila en tupla o id_bolso si borrado)], hay_mas).
+    """
+    return await _cambios_desde(since, limit)
+
+@medir_consulta()
+async def fetch_current_version() -> int:
+    """Versión del último cambio confirmado en el catálogo (0 si no hay ninguno)."""
+    async with transaction() as conn:
+        return await get_async_backend().current_version(conn)
+
+@medir_consulta(filas=len)
+async def fetch_bolsos_by_skus(skus: List[str]) -> List[Dict[str, Any]]:
+    """Obtiene los bolsos con esos `skus` con un único SELECT ... IN (...)."""
+    if not skus:
+        return []
+    async with transaction() as conn:
+        return await get_async_backend().select_by_skus(conn, skus)
+
+@medir_consulta()
+async def insert_bolsos(bolsos: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Alta masiva: inserta todos los bolsos en la transacción en curso.
+
+    - executemany() envía INSERTs multi-fila de BATCH_INSERT_SIZE filas
+    - Las filas creadas (con su id_bolso) se leen después con un único
+      SELECT ... WHERE codigo_sku IN (...), ya que codigo_sku es único
+    - Lanza DuplicateSkuError si algún SKU ya existía (nada se confirma
+      si se llama dentro de transaction())
+
+    Retorna las filas creadas en el mismo orden que `bolsos`.
+    """
+    if not bolsos:
+        return []
+    async with transaction() as conn:
+        await get_async_backend().insert_many(conn, bolsos)
+
+        skus = [b["codigo_sku"] for b in bolsos]
+        por_sku = {row["codigo_sku"]: row for row in await fetch_bolsos_by_skus(skus)}
+        creados = [por_sku[sku] for sku in skus if sku in por_sku]
+        for row in creados:
+            _notify_write("insert", row["id_bolso"])
+
+    # Log para debug
+    logger.debug("INSERT masivo", extra={"creados": len(creados)})
+
+    return creados
+
+@medir_consulta()
+async def upsert_bolsos(items: List[Dict[str, Any]]) -> Dict[str, List[str]]:
+    """
+    Sincronización masiva por codigo_sku (p. ej. stock y precios del ERP).
+
+    Cada item lleva `codigo_sku` y solo los campos que cambian. En la
+    transacción en curso:
+    - Items con todos los campos de alta (UPSERT_CAMPOS_ALTA): INSERT ...
+      ON DUPLICATE KEY UPDATE en lotes multi-fila (crea o actualiza)
+    - Items parciales de SKUs existentes (p. ej. solo stock): UPDATE con
+      CASE codigo_sku en lotes, una sentencia por lote
+    - Items parciales de SKUs que no existen: no se pueden crear
+
+    Retorna {"creados": [...], "actualizados": [...], "no_encontrados": [...]} (SKUs).
+    """
+    resultado: Dict[str, List[str]] = {"creados": [], "actualizados": [], "no_encontrados": []}
+    if not items:
+        return resultado
+
+    async with transaction() as conn:
+        existentes = await fetch_skus_existentes([item["codigo_sku"] for item in items])
+        # MySQL devuelve el SKU guardado: se compara como el índice único
+        # (sin mayúsculas, acentos ni espacios finales)
+        id_por_sku = {clave_sku(sku): id_bolso for sku, id_bolso in existentes.items()}
+
+        completos: Dict[Tuple[str, ...], List[Dict[str, Any]]] = {}
+        parciales: List[Dict[str, Any]] = []
+        for item in items:
+            sku = item["codigo_sku"]
+            existe = clave_sku(sku) in id_por_sku
+            if all(campo in item for campo in UPSERT_CAMPOS_ALTA):
+                # Agrupados por conjunto de columnas: un INSERT distinto por grupo
+                campos = tuple(c for c in UPSERT_CAMPOS if c in item)
+                completos.setdefault(campos, []).append(item)
+                resultado["actualizados" if existe else "creados"].append(sku)
+            elif existe:
+                parciales.append(item)
+                resultado["actualizados"].append(sku)
+            else:
+                resultado["no_encontrados"].append(sku)
+
+        backend = get_async_backend()
+        for campos, grupo in completos.items():
+            await backend.upsert(conn, campos, grupo)
+        if parciales:
+            await backend.update_por_sku(conn, parciales)
+
+        # IDs de las filas afectadas para invalidar cachés tras el COMMIT
+        creados = await fetch_skus_existentes(resultado["creados"])
+        for id_bolso in creados.values():
+            _notify_write("insert", id_bolso)
+        for sku in resultado["actualizados"]:
+            _notify_write("update", id_por_sku[clave_sku(sku)])
+
+    # Log para debug
+    logger.debug("UPSERT por SKU", extra={
+        "creados": len(resultado["creados"]),
+        "actualizados": len(resultado["actualizados"]),
+        "no_encontrados": len(resultado["no_encontrados"]),
+    })
+
+    return resultado
+
+@medir_consulta()
+async def update_bolso(
+    bolso_id: int,
+    nombre: str,
+    descripcion: str | None,
+    precio: float,
+    stock: int,
+    categoria: str,
+    codigo_sku: str,
+    activo: bool
+) -> bool:
+    """
+    Actualiza los datos de un bolso existente.
+    Retorna True si se actualizó correctamente, False si no se encontró.
+    """
+    async with transaction() as conn:
+        try:
+            updated = await get_async_backend().update(conn, bolso_id, dict(
+                nombre=nombre, descripcion=descripcion, precio=precio, stock=stock,
+                categoria=categoria, codigo_sku=codigo_sku, activo=activo
+            ))
+            if updated:
+                _notify_write("update", bolso_id)
+
+            # Log para debug
+            logger.debug("UPDATE", extra={"bolso_id": bolso_id, "updated": updated})
+
+            return updated
+
+        except Exception as e:
+            logger.error("Error en update_bolso", extra={"error": str(e)})
+            raise
+
+@medir_consulta()
+async def delete_bolso(bolso_id: int) -> bool:
+    """
+    Elimina un bolso de la base de datos por su ID.
+    Retorna True si se eliminó correctamente, False si no se encontró.
+    """
+    async with transaction() as conn:
+        try:
+            deleted = await get_async_backend().delete(conn, bolso_id)
+            if deleted:
+                _notify_write("delete", bolso_id)
+
+            # Log para debug
+            logger.debug("DELETE", extra={"bolso_id": bolso_id, "deleted": deleted})
+
+            return deleted
+
+        except Exception as e:
+            logger.error("Error en delete_bolso", extra={"error": str(e)})
+            raise
+
+@medir_consulta()
+async def reservar_stock(items: Dict[int, int]) -> None:
+    """
+    Reserva varios bolsos a la vez ({id_bolso: cantidad}), todo o nada.
+
+    Un UPDATE condicional por bolso (stock = stock - n WHERE stock >= n),
+    en orden de id_bolso para que dos reservas concurrentes tomen los
+    bloqueos en el mismo orden. Si alguno no tiene stock suficiente o no
+    existe, lanza StockInsuficienteError con sus IDs y no se reserva ninguno
+    (ROLLBACK de la transacción en curso).
+    """
+    fallidos: List[int] = []
+    async with transaction() as conn:
+        backend = get_async_backend()
+        for bolso_id in sorted(items):
+            if await backend.reservar(conn, bolso_id, items[bolso_id]):
+                _notify_write("update", bolso_id)
+            else:
+                fallidos.append(bolso_id)
+        if fallidos:
+            contar_reservas(0, len(items))
+            raise StockInsuficienteError(fallidos)
+    contar_reservas(len(items))
+
+    # Log para debug
+    logger.debug("Reserva de stock", extra={"bolsos": len(items)})
+
+async def reservar_bolso(bolso_id: int, cantidad: int) -> bool:
+    """
+    Reserva `cantidad` unidades de un bolso con un UPDATE condicional.
+    Retorna False si no hay stock suficiente o el bolso no existe.
+    Con RESERVA_BATCH=1 se agrupa con las reservas concurrentes (reserva_batcher).
+    """
+    concedida = await reserva_batcher.reservar(bolso_id, cantidad)
+    if concedida:
+        # El lote se aplica (y confirma) en otra tarea: la escritura se marca aquí
+        marcar_escritura_cliente()
+    return concedida
+
+@medir_consulta()
+async def reservar_stock_lote(pedidos: Dict[int, List[int]]) -> Dict[int, List[bool]]:
+    """
+    Aplica un lote de reservas independientes ({id_bolso: [cantidades]},
+    en orden de llegada) en una transacción, por orden de id_bolso:
+
+    - Primero un único UPDATE condicional con la suma: si hay stock para
+      todas, se conceden con una sola sentencia
+    - Si no, un UPDATE condicional por cantidad: se conceden las que
+      quepan, en orden de llegada
+
+    Retorna {id_bolso: [concedida por cada cantidad]}.
+    """
+    resultado: Dict[int, List[bool]] = {}
+    async with transaction() as conn:
+        backend = get_async_backend()
+        for bolso_id in sorted(pedidos):
+            cantidades = pedidos[bolso_id]
+            if await backend.reservar(conn, bolso_id, sum(cantidades)):
+                resultado[bolso_id] = [True] * len(cantidades)
+            elif len(cantidades) == 1:
+                resultado[bolso_id] = [False]
+            else:
+                concedidas: List[bool] = []
+                # El stock solo baja dentro del lote: si no caben c unidades,
+                # tampoco caben c o más (sin volver a ejecutar el UPDATE)
+                rechazada_desde: int | None = None
+                for cantidad in cantidades:
+                    if rechazada_desde is not None and cantidad >= rechazada_desde:
+                        concedidas.append(False)
+                    elif await backend.reservar(conn, bolso_id, cantidad):
+                        concedidas.append(True)
+                    else:
+                        concedidas.append(False)
+                        rechazada_desde = cantidad
+                resultado[bolso_id] = concedidas
+            if any(resultado[bolso_id]):
+                _notify_write("update", bolso_id)
+
+    # Log para debug
+    logger.debug("Lote de reservas", extra={
+        "bolsos": len(pedidos), "reservas": sum(len(c) for c in pedidos.values()),
+    })
+
+    return resultado
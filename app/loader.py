@@ -0,0 +1,113 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Generic, Hashable, List, Tuple, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class BatchLoader(Generic[K, V]):
+    """
+    Agrupa cargas concurrentes por clave (patrón DataLoader + singleflight).
+
+    - Las claves pedidas dentro de la misma ventana (`window` segundos;
+      0 = misma vuelta del event loop) se resuelven con UNA llamada a
+      `batch_fn(claves) -> {clave: valor}`, en lotes de hasta `max_batch`
+    - Peticiones concurrentes de la misma clave comparten la misma consulta
+    - `version()` (opcional) identifica el estado de los datos: una petición
+      no se une a una consulta en vuelo lanzada con una versión anterior
+      (p. ej. antes de una escritura), sino que espera a la siguiente
+    """
+
+    def __init__(
+        self,
+        batch_fn: Callable[[List[K]], Awaitable[Dict[K, V]]],
+        window: float = 0.0,
+        max_batch: int = 500,
+        version: Callable[[], Any] | None = None,
+    ):
+        self._batch_fn = batch_fn
+        self.window = window
+        self.max_batch = max_batch
+        self._version = version or (lambda: None)
+        self._pending: Dict[K, asyncio.Future] = {}
+        self._inflight: Dict[K, Tuple[Any, asyncio.Future]] = {}
+        self._handle: asyncio.Handle | None = None
+
+        # Contadores
+        self.loads = 0
+        self.shared = 0
+        self.batches = 0
+        self.batched_keys = 0
+
+    async def load(self, key: K) -> V | None:
+        """Devuelve el valor de `key` (None si batch_fn no lo devuelve)."""
+        self.loads += 1
+
+        inflight = self._inflight.get(key)
+        if inflight is not None and inflight[0] == self._version():
+            self.shared += 1
+            return await asyncio.shield(inflight[1])
+
+        future = self._pending.get(key)
+        if future is not None:
+            self.shared += 1
+        else:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self._pending[key] = future
+            if len(self._pending) >= self.max_batch:
+                self._dispatch()
+            elif self._handle is None:
+                if self.window > 0:
+                    self._handle = loop.call_later(self.window, self._dispatch)
+                else:
+                    self._handle = loop.call_soon(self._dispatch)
+        # shield: si un cliente cancela, la carga sigue para los demás
+        return await asyncio.shield(future)
+
+    async def load_many(self, keys: List[K]) -> Dict[K, V | None]:
+        """Carga varias claves a la vez (acaban en el mismo lote)."""
+        unicas = list(dict.fromkeys(keys))
+        valores = await asyncio.gather(*(self.load(key) for key in unicas))
+        return dict(zip(unicas, valores))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "loads": self.loads,
+            "shared": self.shared,
+            "batches": self.batches,
+            "avg_batch_size": round(self.batched_keys / self.batches, 2) if self.batches else 0.0,
+        }
+
+    def _dispatch(self) -> None:
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        batch, self._pending = self._pending, {}
+        if not batch:
+            return
+        version = self._version()
+        for key, future in batch.items():
+            self._inflight[key] = (version, future)
+        self.batches += 1
+        self.batched_keys += len(batch)
+        asyncio.get_running_loop().create_task(self._run(batch))
+
+    async def _run(self, batch: Dict[K, asyncio.Future]) -> None:
+        try:
+            result = await self._batch_fn(list(batch))
+        except BaseException as e:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+            if not isinstance(e, Exception):
+                raise
+        else:
+            for key, future in batch.items():
+                if not future.done():
+                    future.set_result(result.get(key))
+        finally:
+            for key, future in batch.items():
+                inflight = self._inflight.get(key)
+                if inflight is not None and inflight[1] is future:
+                    del self._inflight[key]
@@ -0,0 +1,260 @@
+"""
+Logs estructurados (una línea JSON por evento) que no bloquean las peticiones.
+
+Los módulos registran con logging como siempre (logging.getLogger("bolsos.db"));
+configure_logging() pone un QueueHandler en el logger "bolsos" y en los de
+uvicorn: registrar una línea solo la mete en una cola, y un hilo en segundo
+plano la convierte a JSON y la escribe en stdout, con una escritura por
+tanda de líneas pendientes. Si la cola se llena (ráfagas de escrituras), las
+líneas nuevas se descartan y se cuentan (bolsos_log_dropped_total) en vez de
+bloquear la petición.
+
+Cada línea lleva el request_id y los ms transcurridos desde el inicio de la
+petición (elapsed_ms), que fija RequestLogMiddleware. Variables de entorno:
+
+- LOG_LEVEL: nivel mínimo (DEBUG, INFO, WARNING, ERROR; por defecto INFO)
+- LOG_DEBUG_SAMPLE: fracción de líneas DEBUG que se escriben (0-1, por defecto 1)
+- LOG_ACCESS: "1" (por defecto) para una línea de acceso por petición, "0" para ninguna
+- LOG_ACCESS_SAMPLE: fracción de líneas de acceso de peticiones correctas que
+  se escriben (0-1, por defecto 1); las 5xx se escriben siempre
+- LOG_QUEUE_SIZE: líneas máximas pendientes de escribir (por defecto 10000)
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Dict
+
+from app.metrics import Counter, REGISTRY
+
+logger = logging.getLogger("bolsos")
+access_logger = logging.getLogger("bolsos.access")
+
+# Petición en curso: ID y momento de inicio (time.perf_counter())
+_request_id: ContextVar[str | None] = ContextVar("_request_id", default=None)
+_request_start: ContextVar[float | None] = ContextVar("_request_start", default=None)
+
+logs_dropped = REGISTRY.register(Counter(
+    "bolsos_log_dropped_total",
+    "Líneas de log descartadas porque la cola estaba llena.",
+))
+
+# Atributos propios de LogRecord: el resto son campos pasados con extra={...}
+_ATRIBUTOS_RECORD = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+_writer: "_LogWriter | None" = None
+
+
+def _fraccion(variable: str, defecto: str = "1") -> float:
+    return min(1.0, max(0.0, float(os.getenv(variable, defecto))))
+
+
+def get_request_id() -> str | None:
+    """ID de la petición en curso (None fuera de una petición)."""
+    return _request_id.get()
+
+
+# ========================
+# Hilo de la petición: contexto, muestreo y encolado
+# ========================
+
+class _ContextFilter(logging.Filter):
+    """Añade request_id y elapsed_ms, y aplica el muestreo de DEBUG y de acceso."""
+
+    def __init__(self, debug_sample: float, access_sample: float):
+        super().__init__()
+        self.debug_sample = debug_sample
+        self.access_sample = access_sample
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno == logging.DEBUG and self.debug_sample < 1.0:
+            if random.random() >= self.debug_sample:
+                return False
+        elif (record.name == access_logger.name and record.levelno == logging.INFO
+              and self.access_sample < 1.0):
+            if random.random() >= self.access_sample:
+                return False
+
+        record.request_id = _request_id.get()
+        inicio = _request_start.get()
+        if inicio is not None:
+            record.elapsed_ms = round((time.perf_counter() - inicio) * 1000, 3)
+        return True
+
+
+class _NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler que no bloquea ni formatea en el hilo de la petición."""
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            logs_dropped.inc()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Solo fija el mensaje; el JSON se construye en el hilo de escritura
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        return record
+
+
+# ========================
+# Hilo de escritura: JSON a stdout
+# ========================
+
+class JsonFormatter(logging.Formatter):
+    """Una línea JSON por registro, con los campos de extra={...}."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        linea: Dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for clave, valor in vars(record).items():
+            if clave not in _ATRIBUTOS_RECORD and valor is not None:
+                linea[clave] = valor
+        if record.exc_info:
+            linea["exc"] = self.formatException(record.exc_info)
+        return json.dumps(linea, ensure_ascii=False, default=str)
+
+
+class _LogWriter(threading.Thread):
+    """
+    Hilo de escritura: saca de la cola todas las líneas pendientes, las
+    formatea y las escribe en el sys.stdout actual con un solo write/flush.
+    """
+
+    MAX_TANDA = 1000
+
+    def __init__(self, cola: "queue.Queue[logging.LogRecord | None]"):
+        super().__init__(name="bolsos-log-writer", daemon=True)
+        self.cola = cola
+        self.formatter = JsonFormatter()
+
+    def run(self) -> None:
+        while True:
+            record = self.cola.get()
+            tanda = [record]
+            while record is not None and len(tanda) < self.MAX_TANDA:
+                try:
+                    record = self.cola.get_nowait()
+                except queue.Empty:
+                    break
+                tanda.append(record)
+
+            lineas = [self.formatter.format(r) for r in tanda if r is not None]
+            if lineas:
+                try:
+                    sys.stdout.write("\n".join(lineas) + "\n")
+                    sys.stdout.flush()
+                except Exception:
+                    pass
+            if tanda[-1] is None:
+                return
+
+    def stop(self) -> None:
+        """Escribe lo pendiente y termina (al salir del proceso)."""
+        self.cola.put(None)
+        self.join(timeout=5)
+
+
+def configure_logging() -> None:
+    """
+    Configura el logger "bolsos" y los de uvicorn según LOG_* (ver arriba)
+    y arranca el hilo de escritura. Solo tiene efecto la primera vez.
+    """
+    global _writer
+    if _writer is not None:
+        return
+
+    nivel = os.getenv("LOG_LEVEL", "INFO").strip().upper()
+
+    handler = _NonBlockingQueueHandler(queue.Queue(int(os.getenv("LOG_QUEUE_SIZE", "10000"))))
+    handler.addFilter(_ContextFilter(_fraccion("LOG_DEBUG_SAMPLE"), _fraccion("LOG_ACCESS_SAMPLE")))
+
+    logger.setLevel(nivel)
+    logger.handlers = [handler]
+    logger.propagate = False
+    access_logger.disabled = os.getenv("LOG_ACCESS", "1") == "0"
+
+    # uvicorn escribe también por la cola; su línea de acceso la sustituye la nuestra
+    for nombre in ("uvicorn", "uvicorn.error"):
+        logging.getLogger(nombre).handlers = [handler]
+        logging.getLogger(nombre).propagate = False
+    logging.getLogger("uvicorn.access").disabled = True
+
+    _writer = _LogWriter(handler.queue)
+    _writer.start()
+    atexit.register(_writer.stop)
+
+
+# ========================
+# Middleware: request ID y línea de acceso
+# ========================
+
+class RequestLogMiddleware:
+    """
+    Middleware ASGI: asigna un ID a cada petición (la cabecera X-Request-ID
+    del cliente si la trae, o uno nuevo), lo devuelve en la respuesta y
+    escribe una línea de acceso con método, ruta, estado y duración.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for nombre, valor in scope["headers"]:
+            if nombre == b"x-request-id":
+                request_id = valor.decode("latin-1")[:64]
+                break
+        if not request_id:
+            request_id = os.urandom(8).hex()
+
+        inicio = time.perf_counter()
+        token_id = _request_id.set(request_id)
+        token_inicio = _request_start.set(inicio)
+        estado = 500
+
+        async def send_con_id(mensaje):
+            nonlocal estado
+            if mensaje["type"] == "http.response.start":
+                estado = mensaje["status"]
+                mensaje["headers"] = list(mensaje.get("headers", [])) + [
+                    (b"x-request-id", request_id.encode("latin-1"))
+                ]
+            await send(mensaje)
+
+        try:
+            await self.app(scope, receive, send_con_id)
+        finally:
+            if not access_logger.disabled:
+                ruta = scope.get("route")
+                access_logger.log(
+                    logging.ERROR if estado >= 500 else logging.INFO,
+                    "%s %s %s", scope["method"], scope["path"], estado,
+                    extra={
+                        "method": scope["method"],
+                        "path": scope["path"],
+                        "route": getattr(ruta, "path", None),
+                        "status": estado,
+                        "duration_ms": round((time.perf_counter() - inicio) * 1000, 3),
+                    },
+                )
+            _request_start.reset(token_inicio)
+            _request_id.reset(token_id)
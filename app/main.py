@@ -1,18 +1,178 @@
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel, Field, field_validator
-from typing import List, Optional, Annotated
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import Body, FastAPI, Header, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, Field, ValidationError, field_validator
+from typing import Any, Dict, List, Literal, Optional, Tuple, Annotated
 from decimal import Decimal
+import logging
+import os
+
+from app.database_async import (
+    fetch_all_bolsos,
+    fetch_bolsos_page,
+    iter_bolsos,
+    fetch_bolso_by_id,
+    fetch_bolsos_by_ids,
+    fetch_catalog_aggregates,
+    fetch_changes,
+    fetch_change_log,
+    fetch_current_version,
+    insert_bolso,
+    insert_bolsos,
+    upsert_bolsos,
+    fetch_skus_existentes,
+    update_bolso,
+    delete_bolso,
+    reservar_bolso,
+    reservar_stock,
+    get_pool_stats,
+    get_cache_stats,
+    transaction,
+    close_pool,
+    add_write_listener,
+    replicas,
+)
+from app.database import DuplicateSkuError, StockInsuficienteError, clave_sku, pool_params
+from app.admission import AdmissionControl, AdmissionMiddleware, parse_limites
+from app.circuit import CircuitOpenError
+from app.pool import PoolTimeoutError
+from app.pagination import ORDENES, encode_cursor, decode_cursor, InvalidCursorError
+from app.search import CatalogSearch
+from app.snapshot import CatalogSnapshot
+from app.stats import CatalogStats
+from app.stream import CatalogFeed
+from app.logs import RequestLogMiddleware, configure_logging
+from app.metrics import MetricsMiddleware, CONTENT_TYPE as METRICS_CONTENT_TYPE, render as render_metrics
+from app.profiling import ProfileMiddleware, profiling_enabled
+from app.replicas import ReadYourWritesMiddleware
+from app.serialization import (
+    rows_to_json,
+    dict_rows_to_json,
+    row_to_json,
+    rows_to_ndjson,
+    cursor_row,
+    parse_fields,
+    columnas_select,
+    partial_rows_to_json,
+    partial_row_to_json,
+    partial_dict_rows_to_json,
+)
+
+logger = logging.getLogger("bolsos.api")
+
+# Tamaño de página por defecto (al paginar con cursor sin limit) y máximo
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# Parámetros de GET /bolso que filtran, ordenan o paginan (los demás se ignoran)
+PARAMS_LISTADO = ("categoria", "activo", "precio_min", "precio_max", "con_stock", "orden", "limit", "cursor")
+
+# Máximo de IDs en GET /bolso?ids=... y POST /bolso/lookup
+MAX_LOOKUP_IDS = 1000
+
+# Resultados por defecto y máximos de GET /bolso/search
+DEFAULT_SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+# Filas por bloque al construir el índice de búsqueda y los agregados
+SEARCH_INDEX_CHUNK = 1000
+
+# Segundos entre contrastes de los agregados de GET /bolso/stats con SQL (0 = nunca)
+STATS_RECONCILE_INTERVAL = float(os.getenv("STATS_RECONCILE_INTERVAL", "300"))
+
+# Cambios por defecto y máximos por respuesta de GET /bolso/changes
+DEFAULT_CHANGES_LIMIT = 1000
+MAX_CHANGES_LIMIT = 10000
+
+# Máximo de unidades por reserva de un bolso
+MAX_RESERVA_CANTIDAD = 1_000_000
+
+# Máximo de bolsos por petición en POST /bolso/batch
+MAX_BATCH_ITEMS = int(os.getenv("MAX_BATCH_ITEMS", "10000"))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Construye el índice de búsqueda y los agregados al arrancar (si la base
+    de datos no responde, se construyen en la primera petición), lanza el
+    contraste periódico de los agregados y la comprobación de las réplicas,
+    y cierra las conexiones del pool asíncrono al apagar la aplicación.
+    """
+    for vista in (catalogo_busqueda, catalogo_stats):
+        try:
+            await vista.ensure_ready()
+        except Exception as e:
+            logger.warning("No se pudo construir una vista del catálogo",
+                           extra={"vista": type(vista).__name__, "error": str(e)})
+    reconcile = None
+    if STATS_RECONCILE_INTERVAL > 0:
+        reconcile = asyncio.create_task(catalogo_stats.run_reconcile(STATS_RECONCILE_INTERVAL))
+    comprobar_replicas = None
+    if replicas is not None:
+        comprobar_replicas = asyncio.create_task(replicas.run_checks())
+    yield
+    if reconcile is not None:
+        reconcile.cancel()
+    if comprobar_replicas is not None:
+        comprobar_replicas.cancel()
+    await catalogo_feed.stop()
+    await close_pool()
 
-from app.database import fetch_all_bolsos, fetch_bolso_by_id, insert_bolso, update_bolso, delete_bolso
 
 app = FastAPI(
     title="BolsosApp API",
     version="1.0.0",
-    description="API REST desacoplada para gestiÃ³n de tienda de bolsos - Yasbel Olivares Soto 2DAW"
+    description="API REST desacoplada para gestiÃ³n de tienda de bolsos - Yasbel Olivares Soto 2DAW",
+    lifespan=lifespan
 )
 
+# Logs JSON por una cola con hilo de escritura (ver app.logs)
+configure_logging()
+
+# Control de admisión por ruta (ver app.admission): como mucho
+# ADMISSION_MAX_CONCURRENCY peticiones a la vez por ruta (por defecto 4 por
+# conexión del pool) y ADMISSION_QUEUE_SIZE esperando hasta
+# ADMISSION_QUEUE_TIMEOUT segundos; el resto, 503 con Retry-After al momento.
+# ADMISSION_LIMITS ajusta rutas concretas: "POST /bolso/batch=2,GET /bolso/export=4"
+admision = AdmissionControl(
+    limite=int(os.getenv("ADMISSION_MAX_CONCURRENCY", str(4 * pool_params()["size"]))),
+    cola=int(os.getenv("ADMISSION_QUEUE_SIZE", "50")),
+    espera=float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "2")),
+    retry_after=float(os.getenv("ADMISSION_RETRY_AFTER", "1")),
+    limites=parse_limites(os.getenv("ADMISSION_LIMITS", "")),
+    # Sin límite: health checks, métricas y el stream (tiene el suyo)
+    excluir=("/", "/ping", "/metrics", "/db/pool", "/bolso/stream"),
+)
+app.add_middleware(AdmissionMiddleware, control=admision)
+# Latencia y peticiones en curso por ruta (ver GET /metrics)
+app.add_middleware(MetricsMiddleware)
+# Perfilado con cProfile bajo demanda (PROFILE_TOKEN / PROFILE_ALL; ver app.profiling)
+if profiling_enabled():
+    app.add_middleware(ProfileMiddleware)
+# Con réplicas (DB_REPLICAS), el cliente que escribe lee del primario
+# durante REPLICA_STICKY_SECONDS (cookie bolsos_primario; ver app.replicas)
+if replicas is not None:
+    app.add_middleware(ReadYourWritesMiddleware, sticky=replicas.sticky)
+# Request ID y línea de acceso por petición
+app.add_middleware(RequestLogMiddleware)
+
+@app.exception_handler(CircuitOpenError)
+async def circuito_abierto(request: Request, exc: CircuitOpenError):
+    """La base de datos está fuera de servicio (circuit breaker): 503 sin esperar."""
+    return JSONResponse({"detail": "Base de datos no disponible; reintentar más tarde"}, status_code=503,
+                        headers={"Retry-After": str(max(1, round(exc.retry_after)))})
+
+
+@app.exception_handler(PoolTimeoutError)
+async def pool_agotado(request: Request, exc: PoolTimeoutError):
+    """Ninguna conexión libre en DB_POOL_TIMEOUT segundos: 503 en lugar de 500."""
+    return JSONResponse({"detail": "Base de datos saturada; reintentar más tarde"}, status_code=503,
+                        headers={"Retry-After": str(max(1, round(admision.retry_after)))})
+
+
 @app.get("/")
-def root():
+async def root():
     return {"message": "Bienvenido a BolsosApi - GestiÃ³n de Reservas"}
 
 
@@ -83,6 +243,93 @@ class Bolso(BolsoBase):
     id_bolso: int
 
 
+class BolsoUpsert(BolsoBase):
+    """
+    Modelo para sincronizar por SKU: solo codigo_sku es obligatorio.
+    Los campos que no se envían no se modifican; para crear un SKU nuevo
+    hacen falta nombre, precio, stock y categoria.
+    """
+    nombre: Optional[Annotated[str, Field(min_length=1, max_length=80)]] = None
+    precio: Optional[float] = Field(None, ge=0)
+    stock: Optional[int] = Field(None, ge=0)
+    categoria: Optional[Annotated[str, Field(min_length=1, max_length=50)]] = None
+    activo: Optional[bool] = None
+
+
+class BolsoUpsertError(BaseModel):
+    """Elemento rechazado en POST /bolso/upsert."""
+    indice: int
+    codigo_sku: Optional[str] = None
+    errores: List[str]
+
+
+class BolsoUpsertResultado(BaseModel):
+    """Respuesta de POST /bolso/upsert (solo recuentos y errores, sin filas)."""
+    creados: int
+    actualizados: int
+    fallidos: int
+    errores: List[BolsoUpsertError]
+
+
+class BolsoLookup(BaseModel):
+    """Cuerpo de POST /bolso/lookup."""
+    ids: List[int] = Field(min_length=1, max_length=MAX_LOOKUP_IDS)
+
+
+class BolsoStatsGrupo(BaseModel):
+    """Agregados de un conjunto de bolsos (precios null si está vacío)."""
+    bolsos: int
+    activos: int
+    stock: int
+    precio_min: Optional[float] = None
+    precio_avg: Optional[float] = None
+    precio_max: Optional[float] = None
+
+
+class BolsoStatsCategoria(BolsoStatsGrupo):
+    categoria: str
+
+
+class BolsoStats(BaseModel):
+    """Respuesta de GET /bolso/stats."""
+    total: BolsoStatsGrupo
+    categorias: List[BolsoStatsCategoria]
+
+
+class BolsoCambios(BaseModel):
+    """Respuesta de GET /bolso/changes."""
+    token: str
+    hay_mas: bool
+    cambiados: List[Bolso]
+    borrados: List[int]
+
+
+class BolsoReserva(BaseModel):
+    """Reserva de stock de un bolso (POST /bolso/reservar y su respuesta)."""
+    id_bolso: int
+    cantidad: int = Field(ge=1, le=MAX_RESERVA_CANTIDAD)
+
+
+class BolsoReservaLote(BaseModel):
+    """Cuerpo de POST /bolso/reservar."""
+    items: List[BolsoReserva] = Field(min_length=1, max_length=MAX_LOOKUP_IDS)
+
+
+class BolsoBatchItem(BaseModel):
+    """Resultado de un elemento de POST /bolso/batch."""
+    indice: int
+    codigo_sku: Optional[str] = None
+    bolso: Optional[Bolso] = None
+    errores: Optional[List[str]] = None
+
+
+class BolsoBatchResultado(BaseModel):
+    """Respuesta de POST /bolso/batch."""
+    creados: int
+    fallidos: int
+    resultados: List[BolsoBatchItem]
+
+
 # ========================
 # Funciones Helper
 # ========================
@@ -112,48 +359,407 @@ def map_rows_to_bolsos(rows: List[dict]) -> List[BolsoDB]:
     return bolsosapp_db
 
 
+def json_response(body: bytes, headers: Optional[Dict[str, str]] = None) -> Response:
+    """
+    Respuesta con un JSON ya serializado (app.serialization). FastAPI no
+    vuelve a validar contra response_model un Response devuelto tal cual.
+    """
+    return Response(body, media_type="application/json", headers=headers)
+
+
+async def serializar_catalogo() -> bytes:
+    """
+    Genera el JSON de GET /bolso completo con el mismo formato que
+    response_model=List[Bolso], directamente desde las tuplas del cursor.
+    Se lee del primario: se regenera justo después de cada escritura y una
+    réplica atrasada dejaría el snapshot sin ella hasta CATALOG_SNAPSHOT_MAX_AGE.
+    """
+    rows = await fetch_all_bolsos(dictionary=False, replica=False)
+    return rows_to_json(rows)
+
+
+# Snapshot del catálogo completo: se regenera tras cada escritura confirmada
+# o, como máximo, cada CATALOG_SNAPSHOT_MAX_AGE segundos (0 = solo tras escrituras)
+catalogo_snapshot = CatalogSnapshot(
+    serializar_catalogo,
+    max_age=float(os.getenv("CATALOG_SNAPSHOT_MAX_AGE", "60")),
+)
+add_write_listener(lambda accion, bolso_id: catalogo_snapshot.invalidate())
+
+# Índice invertido de GET /bolso/search: completo al arrancar y después solo
+# se releen los bolsos modificados (SEARCH_INDEX_MAX_AGE > 0 lo reconstruye
+# entero cada tantos segundos, para recoger cambios hechos fuera de la API)
+# (las vistas se leen del primario: después se les aplica cada escritura)
+catalogo_busqueda = CatalogSearch(
+    lambda: iter_bolsos(SEARCH_INDEX_CHUNK, replica=False),
+    fetch_bolsos_by_ids,
+    max_age=float(os.getenv("SEARCH_INDEX_MAX_AGE", "0")),
+)
+add_write_listener(catalogo_busqueda.on_write)
+
+# Agregados por categoría de GET /bolso/stats: se actualizan con un delta por
+# escritura y se contrastan con un GROUP BY cada STATS_RECONCILE_INTERVAL segundos
+catalogo_stats = CatalogStats(
+    lambda: iter_bolsos(SEARCH_INDEX_CHUNK, replica=False),
+    fetch_bolsos_by_ids,
+    fetch_catalog_aggregates,
+)
+add_write_listener(catalogo_stats.on_write)
+
+# Feed de cambios de GET /bolso/stream (SSE): una lectura por ráfaga de
+# escrituras (o cada STREAM_POLL_INTERVAL segundos) repartida a todos
+# - STREAM_MAX_SUBSCRIBERS: conexiones máximas (503 al superarlo)
+# - STREAM_QUEUE_SIZE: eventos pendientes por suscriptor antes de desconectarlo
+# - STREAM_BUFFER_SIZE: últimos eventos guardados para reanudar con Last-Event-ID
+# - STREAM_HEARTBEAT: segundos entre comentarios de keep-alive
+catalogo_feed = CatalogFeed(
+    fetch_change_log,
+    fetch_current_version,
+    max_subscribers=int(os.getenv("STREAM_MAX_SUBSCRIBERS", "10000")),
+    queue_size=int(os.getenv("STREAM_QUEUE_SIZE", "256")),
+    buffer_size=int(os.getenv("STREAM_BUFFER_SIZE", "1000")),
+    poll_interval=float(os.getenv("STREAM_POLL_INTERVAL", "1")),
+    heartbeat=float(os.getenv("STREAM_HEARTBEAT", "15")),
+)
+add_write_listener(catalogo_feed.on_write)
+
+
+def _campos(fields: Optional[str]) -> Optional[Tuple[str, ...]]:
+    """Campos pedidos con `fields=` (None = todos); 400 si alguno no existe."""
+    if fields is None:
+        return None
+    try:
+        return parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+async def _buscar_por_ids(ids: List[int], campos: Optional[Tuple[str, ...]] = None) -> Response:
+    """
+    Resuelve varios IDs con una sola consulta (los que no están en caché).
+    Devuelve los bolsos en el orden pedido; los IDs inexistentes se omiten.
+    """
+    if len(ids) > MAX_LOOKUP_IDS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Máximo {MAX_LOOKUP_IDS} IDs por petición"
+        )
+    rows = await fetch_bolsos_by_ids(ids)
+    if campos is not None:
+        return json_response(partial_dict_rows_to_json(rows, campos))
+    return json_response(dict_rows_to_json(rows))
+
+
 # ========================
 # Endpoints
 # ========================
 
 @app.get("/ping")
-def ping():
+async def ping():
     """Endpoint de prueba."""
     return {"message": "pong"}
 
 
-@app.get("/bolso", response_model=List[Bolso])
-def listar_bolsos():
+@app.get("/db/pool")
+async def estadisticas_pool():
     """
-    Devuelve la lista de todos los bolsos desde la base de datos.
+    Estadísticas del pool de conexiones a MySQL.
+
+    - in_use / idle: conexiones prestadas y ociosas
+    - waits / timeouts: peticiones que tuvieron que esperar una conexión libre
+    - checkout_ms_avg / checkout_ms_max: latencia de obtener una conexión
+    - circuit: estado del circuit breaker (closed, open, half_open)
+    - admission: peticiones en curso, en cola y rechazadas por ruta
+    """
+    return {**get_pool_stats(), "admission": admision.stats()}
+
+
+@app.get("/metrics")
+async def metricas():
+    """
+    Métricas en formato de texto de Prometheus: latencia de las peticiones
+    por ruta y código de estado, peticiones en curso, duración y filas de
+    las funciones de base de datos y tiempo en obtener una conexión.
+    """
+    return Response(content=render_metrics(), media_type=METRICS_CONTENT_TYPE)
+
+
+@app.get("/db/cache")
+async def estadisticas_cache():
+    """
+    Contadores de la caché de bolsos por ID (GET /bolso/{id}):
+    aciertos, aciertos negativos (404 cacheados), fallos, expulsiones y expiraciones.
+    """
+    return get_cache_stats()
+
+
+@app.get(
+    "/bolso",
+    response_model=List[Bolso],
+    responses={200: {"headers": {
+        "X-Next-Cursor": {"description": "Cursor de la página siguiente (solo si hay más resultados)"},
+        "Link": {"description": 'URL de la página siguiente con rel="next"'},
+    }}}
+)
+async def listar_bolsos(
+    request: Request,
+    categoria: Optional[str] = None,
+    activo: Optional[bool] = None,
+    precio_min: Optional[float] = Query(None, ge=0),
+    precio_max: Optional[float] = Query(None, ge=0),
+    con_stock: bool = Query(False, description="Solo bolsos con stock > 0"),
+    orden: Literal["id_bolso", "-id_bolso", "precio", "-precio"] = "id_bolso",
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="Valor de X-Next-Cursor de la página anterior"),
+    ids: Optional[str] = Query(None, description="IDs separados por comas (p. ej. 1,2,3): búsqueda por lote"),
+    fields: Optional[str] = Query(None, description="Campos a devolver separados por comas (p. ej. id_bolso,nombre,precio,stock)"),
+):
+    """
+    Devuelve la lista de bolsos desde la base de datos.
     
-    - Obtiene datos raw de MySQL
-    - Mapea a BolsoDB (convierte tipos incompatibles)
-    - Valida estructura con Pydantic
-    - Retorna lista de Bolsos
+    - Filtros opcionales (categoria, activo, rango de precio, con_stock) aplicados en SQL
+    - Paginación keyset: con `limit`, si hay más resultados la respuesta incluye
+      las cabeceras `X-Next-Cursor` y `Link` para pedir la página siguiente
+    - Sin filtros, orden, paginación, ids ni fields devuelve el catálogo
+      completo desde un snapshot precalculado (JSON y gzip) con ETag:
+      If-None-Match responde 304. Los parámetros desconocidos no cuentan
+    - `fields`: solo esos campos (p. ej. `id_bolso,nombre,precio,stock` para
+      un listado); el SELECT trae solo esas columnas y las de la clave del cursor
     """
-    # 1. Obtener datos desde MySQL
-    rows = fetch_all_bolsos()
+    # 0. Catálogo completo sin filtros: snapshot precalculado (un parámetro
+    #    desconocido, p. ej. ?_=<timestamp> contra cachés, no obliga a leer todo)
+    listado = [p for p in PARAMS_LISTADO if p in request.query_params]
+    if ids is None and fields is None and not listado:
+        return await catalogo_snapshot.respond(request)
+
+    campos = _campos(fields)
 
-    # 2. Mapear a BolsoDB (conversiÃ³n de tipos)
-    bolsosapp = map_rows_to_bolsos(rows)
+    # 0b. Búsqueda por lote de IDs (carritos, listas de deseos)
+    if ids is not None:
+        if listado:
+            raise HTTPException(
+                status_code=400,
+                detail="ids no se puede combinar con filtros, orden ni paginación"
+            )
+        try:
+            lista_ids = [int(i) for i in ids.split(",") if i.strip()]
+        except ValueError:
+            raise HTTPException(status_code=400, detail="ids debe ser una lista de enteros separados por comas")
+        return await _buscar_por_ids(lista_ids, campos)
 
-    # 3. Retornar como Bolso (con validaciÃ³n de Pydantic)
-    return bolsosapp
+    # 1. Decodificar el cursor de la página anterior
+    after = None
+    if cursor is not None:
+        try:
+            after = decode_cursor(cursor, orden)
+        except InvalidCursorError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if limit is None:
+            limit = DEFAULT_PAGE_SIZE
+
+    # 2. Obtener la página desde MySQL (una fila de más para saber si hay siguiente);
+    #    con fields, solo esas columnas y las de la clave del cursor
+    columnas = columnas_select(campos, ORDENES[orden]) if campos is not None else None
+    rows = await fetch_bolsos_page(
+        categoria=categoria,
+        activo=activo,
+        precio_min=precio_min,
+        precio_max=precio_max,
+        con_stock=con_stock,
+        orden=orden,
+        after=after,
+        limit=limit + 1 if limit is not None else None,
+        dictionary=False,
+        columnas=columnas,
+    )
+
+    # 3. Cabeceras de paginación
+    headers = {}
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(orden, cursor_row(rows[-1], columnas))
+        next_url = request.url.include_query_params(cursor=next_cursor, limit=limit)
+        headers["X-Next-Cursor"] = next_cursor
+        headers["Link"] = f'<{next_url}>; rel="next"'
+
+    # 4. Serializar las tuplas directamente a JSON (mismo formato que Bolso)
+    if columnas is not None:
+        return json_response(partial_rows_to_json(rows, columnas, campos), headers=headers)
+    return json_response(rows_to_json(rows), headers=headers)
+
+
+@app.post("/bolso/lookup", response_model=List[Bolso])
+async def buscar_bolsos_por_ids(consulta: BolsoLookup):
+    """
+    Búsqueda por lote de IDs (equivalente a GET /bolso?ids=...), para listas largas.
+
+    - Una sola consulta `WHERE id_bolso IN (...)` para los IDs no cacheados
+    - Respuesta en el orden pedido; los IDs inexistentes se omiten
+    """
+    return await _buscar_por_ids(consulta.ids)
+
+
+@app.get(
+    "/bolso/export",
+    response_class=StreamingResponse,
+    responses={200: {"content": {"application/x-ndjson": {}, "application/json": {}}}}
+)
+async def exportar_bolsos(
+    formato: Literal["ndjson", "json"] = Query("ndjson", alias="format"),
+    chunk_size: int = Query(1000, ge=1, le=10000),
+):
+    """
+    Exporta el catálogo completo en streaming (para trabajos de sincronización).
+
+    - Lee de MySQL con un cursor sin buffer en bloques de `chunk_size` filas
+    - Cada bloque se serializa y se envía según llega: la memoria no crece
+      con el número de filas
+    - `format=ndjson`: un bolso JSON por línea; `format=json`: un array JSON
+    """
+    async def generar():
+        if formato == "json":
+            yield b"["
+        primero = True
+        async for rows in iter_bolsos(chunk_size, dictionary=False):
+            if formato == "ndjson":
+                yield rows_to_ndjson(rows)
+            else:
+                # Array del bloque sin los corchetes
+                bloque = rows_to_json(rows)[1:-1]
+                yield bloque if primero else b"," + bloque
+                primero = False
+        if formato == "json":
+            yield b"]"
+
+    media_type = "application/x-ndjson" if formato == "ndjson" else "application/json"
+    return StreamingResponse(generar(), media_type=media_type)
+
+
+@app.get("/bolso/stats", response_model=BolsoStats)
+async def estadisticas_catalogo():
+    """
+    Agregados del catálogo en total y por categoría: número de bolsos,
+    activos, stock total y precio mínimo, medio y máximo.
+
+    - Se sirven desde memoria: cada alta, modificación o baja aplica un delta
+    - Cada STATS_RECONCILE_INTERVAL segundos se contrastan con un GROUP BY
+      en SQL y, si no coinciden, se reconstruyen
+    """
+    return await catalogo_stats.get()
+
+
+@app.get("/bolso/changes", response_model=BolsoCambios)
+async def cambios_catalogo(
+    since: str = Query("0", description="Token de la respuesta anterior (0 o sin indicar: todo el catálogo)"),
+    limit: int = Query(DEFAULT_CHANGES_LIMIT, ge=1, le=MAX_CHANGES_LIMIT),
+):
+    """
+    Sincronización por deltas: los bolsos creados o modificados y los IDs
+    borrados desde `since`, y el token para la siguiente petición.
+
+    - Cada escritura da a la fila una versión nueva y creciente (y cada
+      borrado deja su versión en bolso_borrado); el token es la versión del
+      último cambio devuelto
+    - Sin `since` (o 0) devuelve el catálogo completo, sin borrados
+    - En orden de versión y como mucho `limit` cambios: con hay_mas=true se
+      repite con el token devuelto hasta que sea false
+    - Un bolso modificado varias veces sale una sola vez, con sus datos actuales
+    """
+    try:
+        version = int(since)
+        if version < 0:
+            raise ValueError(since)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Token de since no válido")
+
+    cambios = await fetch_changes(version, limit)
+    body = b"".join((
+        b'{"token":"', str(cambios["version"]).encode(),
+        b'","hay_mas":', b"true" if cambios["hay_mas"] else b"false",
+        b',"cambiados":', rows_to_json(cambios["cambiados"]),
+        b',"borrados":[', ",".join(str(i) for i in cambios["borrados"]).encode(), b"]}",
+    ))
+    return json_response(body)
+
+
+@app.get(
+    "/bolso/stream",
+    response_class=StreamingResponse,
+    responses={200: {"content": {"text/event-stream": {}}}},
+)
+async def stream_cambios(
+    since: Optional[str] = Query(None, description="Versión desde la que empezar (como Last-Event-ID)"),
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID"),
+):
+    """
+    Cambios del catálogo en tiempo real (Server-Sent Events), en lugar de
+    consultar GET /bolso cada pocos segundos.
+
+    - `event: upsert` con el bolso creado o modificado y `event: delete`
+      con `{"id_bolso": N}`; el `id` de cada evento es su versión (como el
+      token de GET /bolso/changes)
+    - Al reconectar, EventSource envía Last-Event-ID y se reciben los
+      cambios perdidos; `since` hace lo mismo en la primera conexión. Si
+      faltan demasiados llega `event: reset` con la versión desde la que
+      ponerse al día con GET /bolso/changes
+    - Un cliente que no lee a tiempo se desconecta (y reanuda al volver)
+    """
+    cuerpo = catalogo_feed.suscribir(last_event_id or since)
+    if cuerpo is None:
+        raise HTTPException(status_code=503, detail="Demasiados suscriptores; reintentar más tarde",
+                            headers={"Retry-After": "5"})
+    return StreamingResponse(
+        cuerpo,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get(
+    "/bolso/search",
+    response_model=List[Bolso],
+    responses={200: {"headers": {
+        "X-Total-Count": {"description": "Número total de bolsos que encajan con la búsqueda"},
+    }}}
+)
+async def buscar_bolsos(
+    q: str = Query(..., min_length=1, max_length=200, description="Palabras a buscar en nombre y descripción"),
+    categoria: Optional[str] = None,
+    activo: Optional[bool] = None,
+    limit: int = Query(DEFAULT_SEARCH_LIMIT, ge=1, le=MAX_SEARCH_LIMIT),
+):
+    """
+    Búsqueda de texto en el nombre y la descripción de los bolsos.
+
+    - Sin distinguir mayúsculas ni acentos ("bandolera piel" encuentra "Bandolera de Piel")
+    - Cada palabra encaja también como prefijo ("moch" -> "mochila"); deben aparecer todas
+    - Ordenados por relevancia (más peso en el nombre); filtros por categoria y activo
+    - Se resuelve en un índice en memoria; MySQL solo se consulta para leer
+      los bolsos encontrados por su ID (a través de la caché)
+    """
+    ids, total = await catalogo_busqueda.search(q, categoria=categoria, activo=activo, limit=limit)
+    rows = await fetch_bolsos_by_ids(ids)
+    return json_response(dict_rows_to_json(rows), headers={"X-Total-Count": str(total)})
 
 
 @app.get("/bolso/{bolso_id}", response_model=Bolso)
-def obtener_bolso(bolso_id: int):
+async def obtener_bolso(
+    bolso_id: int,
+    fields: Optional[str] = Query(None, description="Campos a devolver separados por comas (p. ej. id_bolso,nombre,precio,stock)"),
+):
     """
     Devuelve un bolso especÃ­fico por su ID.
     
-    - Obtiene datos raw de MySQL
-    - Mapea a BolsoDB (convierte tipos incompatibles)
-    - Valida estructura con Pydantic
+    - Obtiene datos raw de MySQL (o de la caché)
+    - Serializa la fila directamente a JSON (sin modelo intermedio)
+    - `fields`: solo esos campos (la fila completa sigue saliendo de la
+      caché, compartida con el resto de lecturas por ID)
     - Retorna el Bolso o lanza HTTPException 404 si no existe
     """
+    campos = _campos(fields)
+
     # 1. Obtener datos desde MySQL
-    row = fetch_bolso_by_id(bolso_id)
+    row = await fetch_bolso_by_id(bolso_id)
     
     # 2. Validar que el bolso existe
     if not row:
@@ -162,47 +768,47 @@ def obtener_bolso(bolso_id: int):
             detail=f"Bolso con ID {bolso_id} no encontrado"
         )
     
-    # 3. Mapear a BolsoDB (conversiÃ³n de tipos)
-    bolsosapp = map_rows_to_bolsos([row])
-    
-    # 4. Retornar el primer (y Ãºnico) elemento
-    return bolsosapp[0]
+    # 3. Serializar y retornar
+    if campos is not None:
+        return json_response(partial_row_to_json(row, campos))
+    return json_response(row_to_json(row))
 
 
 @app.post("/bolso", response_model=Bolso, status_code=201)
-def crear_bolso(bolso: BolsoCreate):
+async def crear_bolso(bolso: BolsoCreate):
     """
     Crea un nuevo bolso en la base de datos.
     
     - Valida datos con Pydantic (BolsoCreate)
-    - Inserta en MySQL
+    - Inserta en MySQL y lee la fila creada en la misma transacción
     - Retorna el bolso creado con ID asignado
     """
-    # 1. Insertar el bolso en MySQL (retorna ID)
-    nuevo_id = insert_bolso(
-        nombre=bolso.nombre,
-        descripcion=bolso.descripcion,
-        precio=bolso.precio,
-        stock=bolso.stock,
-        categoria=bolso.categoria,
-        codigo_sku=bolso.codigo_sku,
-        activo=bolso.activo
-    )
-    
-    # 2. Validar que la inserciÃ³n fue exitosa
-    if not nuevo_id or nuevo_id == 0:
-        raise HTTPException(
-            status_code=500,
-            detail="Error al insertar el bolso en la base de datos"
+    async with transaction():
+        # 1. Insertar el bolso en MySQL (retorna ID)
+        nuevo_id = await insert_bolso(
+            nombre=bolso.nombre,
+            descripcion=bolso.descripcion,
+            precio=bolso.precio,
+            stock=bolso.stock,
+            categoria=bolso.categoria,
+            codigo_sku=bolso.codigo_sku,
+            activo=bolso.activo
         )
-    
-    # 3. Recuperar el bolso creado desde la BD
-    row = fetch_bolso_by_id(nuevo_id)
+        
+        # 2. Validar que la inserción fue exitosa
+        if not nuevo_id or nuevo_id == 0:
+            raise HTTPException(
+                status_code=500,
+                detail="Error al insertar el bolso en la base de datos"
+            )
+        
+        # 3. Recuperar el bolso creado (misma conexión, antes del commit)
+        row = await fetch_bolso_by_id(nuevo_id)
     
     if not row:
         raise HTTPException(
             status_code=500,
-            detail="Error al recuperar el bolso reciÃ©n creado"
+            detail="Error al recuperar el bolso recién creado"
         )
     
     # 4. Mapear y retornar
@@ -210,46 +816,283 @@ def crear_bolso(bolso: BolsoCreate):
     return bolsosapp[0]
 
 
-@app.put("/bolso/{bolso_id}", response_model=Bolso)
-def actualizar_bolso(bolso_id: int, bolso: BolsoUpdate):
+@app.post(
+    "/bolso/batch",
+    response_model=BolsoBatchResultado,
+    status_code=201,
+    openapi_extra={"requestBody": {"content": {"application/json": {"schema": {
+        "type": "array", "items": {"$ref": "#/components/schemas/BolsoCreate"}
+    }}}}}
+)
+async def crear_bolsos_batch(
+    items: List[Any] = Body(...),
+    atomico: bool = Query(True, description="Todo o nada: si algún bolso falla no se crea ninguno"),
+):
     """
-    Actualiza un bolso existente en la base de datos.
-    
-    - Valida que el bolso existe (404 si no)
-    - Valida datos con Pydantic (BolsoUpdate)
-    - Actualiza en MySQL
-    - Retorna el bolso actualizado
+    Alta masiva de bolsos (carga de una colección nueva).
+
+    - Valida cada elemento con BolsoCreate y detecta SKUs repetidos
+      (en la propia petición o ya existentes en MySQL)
+    - Inserta todos los válidos en una transacción con INSERTs multi-fila
+    - Devuelve el resultado de cada elemento (bolso creado o errores)
+    - `atomico=true` (por defecto): si hay algún error responde 422 y no crea nada;
+      `atomico=false`: crea los válidos e informa de los fallidos
     """
-    # 1. Validar que el bolso existe
-    row_existente = fetch_bolso_by_id(bolso_id)
-    
-    if not row_existente:
+    if len(items) > MAX_BATCH_ITEMS:
         raise HTTPException(
-            status_code=404,
-            detail=f"Bolso con ID {bolso_id} no encontrado"
+            status_code=413,
+            detail=f"Máximo {MAX_BATCH_ITEMS} bolsos por petición"
         )
-    
-    # 2. Actualizar el bolso en MySQL
-    actualizado = update_bolso(
-        bolso_id=bolso_id,
-        nombre=bolso.nombre,
-        descripcion=bolso.descripcion,
-        precio=bolso.precio,
-        stock=bolso.stock,
-        categoria=bolso.categoria,
-        codigo_sku=bolso.codigo_sku,
-        activo=bolso.activo
+
+    # 1. Validar cada elemento por separado para informar de todos los errores
+    resultados = [BolsoBatchItem(indice=i) for i in range(len(items))]
+    validos: Dict[int, BolsoCreate] = {}
+    # clave_sku() -> índice: dos SKUs que el índice único considera iguales
+    # (mayúsculas, acentos, espacios finales) son el mismo SKU
+    vistos: Dict[str, int] = {}
+    for i, item in enumerate(items):
+        try:
+            bolso = BolsoCreate.model_validate(item)
+        except ValidationError as e:
+            resultados[i].codigo_sku = item.get("codigo_sku") if isinstance(item, dict) else None
+            resultados[i].errores = [
+                f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors()
+            ]
+            continue
+        resultados[i].codigo_sku = bolso.codigo_sku
+        clave = clave_sku(bolso.codigo_sku)
+        if clave in vistos:
+            resultados[i].errores = [
+                f"codigo_sku repetido en la petición (elemento {vistos[clave]})"
+            ]
+            continue
+        vistos[clave] = i
+        validos[i] = bolso
+
+    try:
+        async with transaction():
+            # 2. SKUs que ya existen en MySQL (un único SELECT ... IN)
+            existentes = await fetch_skus_existentes([b.codigo_sku for b in validos.values()])
+            for sku in existentes:
+                # MySQL devuelve el SKU guardado, que puede diferir del enviado
+                i = vistos.get(clave_sku(sku))
+                if i is None:
+                    # La collation lo considera igual a alguno enviado pero
+                    # clave_sku() no: se informa como duplicado, sin saber cuál
+                    raise HTTPException(
+                        status_code=409,
+                        detail=f"Algún codigo_sku coincide con el ya existente {sku!r}"
+                    )
+                resultados[i].errores = ["codigo_sku ya existe"]
+                validos.pop(i, None)
+
+            hay_errores = len(validos) < len(items)
+            if atomico and hay_errores:
+                raise HTTPException(
+                    status_code=422,
+                    detail=[r.model_dump(exclude={"bolso"}) for r in resultados if r.errores]
+                )
+
+            # 3. Insertar los válidos en lotes y leerlos con un único IN (...)
+            rows = await insert_bolsos([b.model_dump() for b in validos.values()])
+    except DuplicateSkuError:
+        # Otro cliente ha insertado alguno de los SKUs entre la comprobación y el INSERT
+        raise HTTPException(
+            status_code=409,
+            detail="Algún codigo_sku se ha dado de alta a la vez por otra petición; reintenta"
+        )
+
+    # 4. Asociar cada bolso creado a su elemento de la petición
+    for bolso in map_rows_to_bolsos(rows):
+        resultados[vistos[clave_sku(bolso.codigo_sku)]].bolso = Bolso.model_validate(bolso.model_dump())
+
+    creados = sum(1 for r in resultados if r.bolso is not None)
+    if creados == 0 and items:
+        raise HTTPException(
+            status_code=422,
+            detail=[r.model_dump(exclude={"bolso"}) for r in resultados if r.errores]
+        )
+    return BolsoBatchResultado(
+        creados=creados,
+        fallidos=len(items) - creados,
+        resultados=resultados,
     )
-    
-    # 3. Validar que la actualizaciÃ³n fue exitosa
-    if not actualizado:
+
+
+@app.post(
+    "/bolso/upsert",
+    response_model=BolsoUpsertResultado,
+    openapi_extra={"requestBody": {"content": {"application/json": {"schema": {
+        "type": "array", "items": {"$ref": "#/components/schemas/BolsoUpsert"}
+    }}}}}
+)
+async def upsert_bolsos_por_sku(
+    items: List[Any] = Body(...),
+    atomico: bool = Query(True, description="Todo o nada: si algún elemento falla no se aplica ninguno"),
+):
+    """
+    Sincronización masiva de inventario por codigo_sku (ERP).
+
+    - Cada elemento lleva codigo_sku y solo los campos que cambian
+      (p. ej. `{"codigo_sku": "BAND-001", "stock": 12}`)
+    - SKUs existentes: se actualizan solo esos campos
+    - SKUs nuevos: se crean si traen nombre, precio, stock y categoria
+    - Todo en una transacción, con INSERT ... ON DUPLICATE KEY UPDATE y
+      UPDATE ... CASE en lotes (unas pocas sentencias para miles de SKUs)
+    """
+    if len(items) > MAX_BATCH_ITEMS:
         raise HTTPException(
-            status_code=500,
-            detail="Error al actualizar el bolso en la base de datos"
+            status_code=413,
+            detail=f"Máximo {MAX_BATCH_ITEMS} bolsos por petición"
+        )
+
+    # 1. Validar cada elemento y quedarnos solo con los campos enviados
+    errores: List[BolsoUpsertError] = []
+    validos: List[Dict[str, Any]] = []
+    # clave_sku() -> índice, como en crear_bolsos_batch
+    vistos: Dict[str, int] = {}
+    for i, item in enumerate(items):
+        try:
+            bolso = BolsoUpsert.model_validate(item)
+        except ValidationError as e:
+            errores.append(BolsoUpsertError(
+                indice=i,
+                codigo_sku=item.get("codigo_sku") if isinstance(item, dict) else None,
+                errores=[f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors()],
+            ))
+            continue
+        clave = clave_sku(bolso.codigo_sku)
+        if clave in vistos:
+            errores.append(BolsoUpsertError(
+                indice=i,
+                codigo_sku=bolso.codigo_sku,
+                errores=[f"codigo_sku repetido en la petición (elemento {vistos[clave]})"],
+            ))
+            continue
+        vistos[clave] = i
+        validos.append(bolso.model_dump(include=bolso.model_fields_set | {"codigo_sku"}))
+
+    if atomico and errores:
+        raise HTTPException(status_code=422, detail=[e.model_dump() for e in errores])
+
+    async with transaction():
+        # 2. Aplicar los cambios en lotes
+        resultado = await upsert_bolsos(validos)
+
+        # 3. SKUs parciales que no existen: no se pueden crear
+        for sku in resultado["no_encontrados"]:
+            errores.append(BolsoUpsertError(
+                indice=vistos[clave_sku(sku)],
+                codigo_sku=sku,
+                errores=["codigo_sku no existe y faltan campos para crearlo (nombre, precio, stock, categoria)"],
+            ))
+        if atomico and resultado["no_encontrados"]:
+            # Se lanza dentro de la transacción: ROLLBACK de todo
+            raise HTTPException(status_code=422, detail=[e.model_dump() for e in errores])
+
+    errores.sort(key=lambda e: e.indice)
+    return BolsoUpsertResultado(
+        creados=len(resultado["creados"]),
+        actualizados=len(resultado["actualizados"]),
+        fallidos=len(errores),
+        errores=errores,
+    )
+
+
+@app.post("/bolso/reservar", response_model=List[BolsoReserva])
+async def reservar_bolsos(reserva: BolsoReservaLote):
+    """
+    Reserva stock de varios bolsos a la vez (un carrito), todo o nada.
+
+    - Un UPDATE condicional por bolso (`stock = stock - n WHERE stock >= n`),
+      sin leer antes las filas: no hay carreras ni stock negativo
+    - Las cantidades de un mismo bolso repetido se suman
+    - Si alguno no existe o no tiene stock suficiente responde 409 con el
+      detalle y no se reserva ninguno
+    """
+    items: Dict[int, int] = {}
+    for item in reserva.items:
+        items[item.id_bolso] = items.get(item.id_bolso, 0) + item.cantidad
+
+    try:
+        await reservar_stock(items)
+    except StockInsuficienteError as e:
+        # Solo en el caso de error: leer el stock disponible para informar
+        disponibles = {row["id_bolso"]: row["stock"] for row in await fetch_bolsos_by_ids(e.ids)}
+        raise HTTPException(
+            status_code=409,
+            detail=[
+                {
+                    "id_bolso": bolso_id,
+                    "cantidad": items[bolso_id],
+                    "disponible": disponibles.get(bolso_id),
+                    "error": "stock insuficiente" if bolso_id in disponibles else "no existe",
+                }
+                for bolso_id in e.ids
+            ]
         )
+
+    return [BolsoReserva(id_bolso=bolso_id, cantidad=cantidad) for bolso_id, cantidad in items.items()]
+
+
+@app.post("/bolso/{bolso_id}/reservar", response_model=BolsoReserva)
+async def reservar_bolso_por_id(
+    bolso_id: int,
+    cantidad: int = Body(1, ge=1, le=MAX_RESERVA_CANTIDAD, embed=True),
+):
+    """
+    Reserva `cantidad` unidades de un bolso (cuerpo `{"cantidad": n}`, por defecto 1).
+
+    - Un único UPDATE condicional (`stock = stock - n WHERE stock >= n`):
+      atómico, sin leer la fila antes y solo toca la columna stock
+    - 404 si el bolso no existe; 409 si no hay stock suficiente
+    - Con RESERVA_BATCH=1 las reservas concurrentes se agrupan: las de un
+      mismo bolso se aplican con un solo UPDATE si hay stock para todas
+    """
+    if not await reservar_bolso(bolso_id, cantidad):
+        row = await fetch_bolso_by_id(bolso_id)
+        if not row:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Bolso con ID {bolso_id} no encontrado"
+            )
+        raise HTTPException(
+            status_code=409,
+            detail=f"Stock insuficiente para el bolso {bolso_id}: disponibles {row['stock']}, pedidos {cantidad}"
+        )
+    return BolsoReserva(id_bolso=bolso_id, cantidad=cantidad)
+
+
+@app.put("/bolso/{bolso_id}", response_model=Bolso)
+async def actualizar_bolso(bolso_id: int, bolso: BolsoUpdate):
+    """
+    Actualiza un bolso existente en la base de datos.
     
-    # 4. Recuperar el bolso actualizado desde la BD
-    row_actualizado = fetch_bolso_by_id(bolso_id)
+    - Valida datos con Pydantic (BolsoUpdate)
+    - Actualiza en MySQL (404 si el UPDATE no encuentra la fila)
+    - Lee la fila actualizada en la misma transacción y la retorna
+    """
+    async with transaction():
+        # 1. Actualizar el bolso en MySQL (False si no existe)
+        actualizado = await update_bolso(
+            bolso_id=bolso_id,
+            nombre=bolso.nombre,
+            descripcion=bolso.descripcion,
+            precio=bolso.precio,
+            stock=bolso.stock,
+            categoria=bolso.categoria,
+            codigo_sku=bolso.codigo_sku,
+            activo=bolso.activo
+        )
+        
+        if not actualizado:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Bolso con ID {bolso_id} no encontrado"
+            )
+        
+        # 2. Recuperar el bolso actualizado (misma conexión, antes del commit)
+        row_actualizado = await fetch_bolso_by_id(bolso_id)
     
     if not row_actualizado:
         raise HTTPException(
@@ -257,40 +1100,29 @@ def actualizar_bolso(bolso_id: int, bolso: BolsoUpdate):
             detail="Error al recuperar el bolso actualizado"
         )
     
-    # 5. Mapear y retornar
+    # 3. Mapear y retornar
     bolsosapp = map_rows_to_bolsos([row_actualizado])
     return bolsosapp[0]
 
 
 @app.delete("/bolso/{bolso_id}", status_code=200)
-def eliminar_bolso(bolso_id: int):
+async def eliminar_bolso(bolso_id: int):
     """
     Elimina un bolso existente de la base de datos.
     
-    - Valida que el bolso existe (404 si no)
-    - Elimina de MySQL
-    - Retorna mensaje de Ã©xito
+    - Elimina de MySQL con un único DELETE (404 si no existía)
+    - Retorna mensaje de éxito
     """
-    # 1. Validar que el bolso existe
-    row_existente = fetch_bolso_by_id(bolso_id)
+    # 1. Eliminar el bolso de MySQL (False si no existe)
+    eliminado = await delete_bolso(bolso_id)
     
-    if not row_existente:
+    if not eliminado:
         raise HTTPException(
             status_code=404,
             detail=f"Bolso con ID {bolso_id} no encontrado"
         )
     
-    # 2. Eliminar el bolso de MySQL
-    eliminado = delete_bolso(bolso_id)
-    
-    # 3. Validar que la eliminaciÃ³n fue exitosa
-    if not eliminado:
-        raise HTTPException(
-            status_code=500,
-            detail="Error al eliminar el bolso de la base de datos"
-        )
-    
-    # 4. Retornar mensaje de Ã©xito
+    # 2. Retornar mensaje de éxito
     return {
         "mensaje": "Bolso eliminado exitosamente",
         "id_bolso": bolso_id
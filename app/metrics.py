@@ -0,0 +1,341 @@
+"""
+Métricas de la aplicación en formato de texto de Prometheus (GET /metrics).
+
+Implementación mínima sin dependencias: contadores, gauges e histogramas con
+etiquetas, guardados en memoria del proceso (con varios workers de uvicorn,
+cada uno expone los suyos). Registrar un valor es un incremento bajo un
+lock, y el texto solo se genera al consultar /metrics.
+
+- bolsos_http_request_duration_seconds{method, route, status}: latencia
+  por plantilla de ruta ("/bolso/{bolso_id}", no cada ID) y código HTTP;
+  sin las respuestas en streaming (GET /bolso/stream, /bolso/export), cuya
+  duración es la de la conexión
+- bolsos_http_requests_in_flight{method}: peticiones en curso
+- method es el del estándar HTTP u "other": el cliente lo elige y cada
+  valor distinto sería una serie nueva
+- bolsos_db_query_duration_seconds{function}: duración de cada función
+  de app.database / app.database_async
+- bolsos_db_query_errors_total{function}: funciones que lanzaron excepción
+- bolsos_db_rows_returned_total{function}: filas devueltas
+- bolsos_db_connection_acquire_seconds: tiempo en obtener una conexión
+"""
+import functools
+import inspect
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, Tuple, TypeVar
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Límites (en segundos) de los buckets de los histogramas de latencia
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Métodos HTTP que se usan como etiqueta; el resto cuenta como METODO_OTRO
+METODOS_HTTP = frozenset(("GET", "HEAD", "POST", "PUT", "DELETE", "CONNECT", "OPTIONS", "TRACE", "PATCH"))
+METODO_OTRO = "other"
+
+# Etiqueta route de las peticiones que no coinciden con ninguna ruta (404)
+RUTA_DESCONOCIDA = "<unmatched>"
+
+
+def _escapar(valor: str) -> str:
+    return valor.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _etiquetas(nombres: Tuple[str, ...], valores: Tuple[str, ...], extra: str = "") -> str:
+    pares = [f'{n}="{_escapar(str(v))}"' for n, v in zip(nombres, valores)]
+    if extra:
+        pares.append(extra)
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+
+def _numero(valor: float) -> str:
+    if valor == float("inf"):
+        return "+Inf"
+    return repr(float(valor)) if not float(valor).is_integer() else str(int(valor))
+
+
+class _Metrica:
+    tipo = ""
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Tuple[str, ...] = ()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = etiquetas
+        self._lock = threading.Lock()
+
+    def _cabecera(self) -> List[str]:
+        return [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} {self.tipo}"]
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metrica):
+    """Contador que solo crece: inc(*valores_de_etiquetas, amount=1)."""
+
+    tipo = "counter"
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Tuple[str, ...] = ()):
+        super().__init__(nombre, ayuda, etiquetas)
+        self._valores: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *etiquetas: str, amount: float = 1) -> None:
+        with self._lock:
+            self._valores[etiquetas] = self._valores.get(etiquetas, 0) + amount
+
+    def get(self, *etiquetas: str) -> float:
+        return self._valores.get(etiquetas, 0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            valores = sorted(self._valores.items())
+        return self._cabecera() + [
+            f"{self.nombre}{_etiquetas(self.etiquetas, k)} {_numero(v)}" for k, v in valores
+        ]
+
+
+class Gauge(Counter):
+    """Valor que sube y baja (p. ej. peticiones en curso)."""
+
+    tipo = "gauge"
+
+    def dec(self, *etiquetas: str, amount: float = 1) -> None:
+        self.inc(*etiquetas, amount=-amount)
+
+    def set(self, *etiquetas: str, value: float) -> None:
+        with self._lock:
+            self._valores[etiquetas] = value
+
+
+class Histogram(_Metrica):
+    """
+    Histograma con buckets fijos: observe(valor, *valores_de_etiquetas).
+    Cada serie guarda la cuenta de cada bucket (sin acumular), la suma y
+    el total; los buckets acumulados ("le") se calculan al exportar.
+    """
+
+    tipo = "histogram"
+
+    def __init__(
+        self,
+        nombre: str,
+        ayuda: str,
+        etiquetas: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(nombre, ayuda, etiquetas)
+        self.buckets = tuple(sorted(buckets))
+        # serie -> [cuenta por bucket..., cuenta +Inf, suma]
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, valor: float, *etiquetas: str) -> None:
+        i = bisect_left(self.buckets, valor)
+        with self._lock:
+            serie = self._series.get(etiquetas)
+            if serie is None:
+                serie = self._series[etiquetas] = [0] * (len(self.buckets) + 2)
+            serie[i] += 1
+            serie[-1] += valor
+
+    def count(self, *etiquetas: str) -> int:
+        serie = self._series.get(etiquetas)
+        return int(sum(serie[:-1])) if serie else 0
+
+    def render(self) -> List[str]:
+        with self._lock:
+            series = sorted((k, list(v)) for k, v in self._series.items())
+        lineas = self._cabecera()
+        for etiquetas, serie in series:
+            acumulado = 0
+            for limite, cuenta in zip(self.buckets + (float("inf"),), serie[:-1]):
+                acumulado += cuenta
+                le = 'le="' + _numero(limite) + '"'
+                lineas.append(f"{self.nombre}_bucket{_etiquetas(self.etiquetas, etiquetas, le)} {int(acumulado)}")
+            sufijo = _etiquetas(self.etiquetas, etiquetas)
+            lineas.append(f"{self.nombre}_sum{sufijo} {_numero(serie[-1])}")
+            lineas.append(f"{self.nombre}_count{sufijo} {int(acumulado)}")
+        return lineas
+
+
+M = TypeVar("M", bound=_Metrica)
+
+
+class Registry:
+    """Conjunto de métricas que se exportan juntas."""
+
+    def __init__(self):
+        self._metricas: Dict[str, _Metrica] = {}
+
+    def register(self, metrica: M) -> M:
+        if metrica.nombre in self._metricas:
+            raise ValueError(f"Métrica duplicada: {metrica.nombre}")
+        self._metricas[metrica.nombre] = metrica
+        return metrica
+
+    def render(self) -> str:
+        lineas: List[str] = []
+        for metrica in self._metricas.values():
+            lineas.extend(metrica.render())
+        return "\n".join(lineas) + "\n"
+
+
+REGISTRY = Registry()
+
+http_request_duration = REGISTRY.register(Histogram(
+    "bolsos_http_request_duration_seconds",
+    "Latencia de las peticiones HTTP por ruta y código de estado.",
+    ("method", "route", "status"),
+))
+http_requests_in_flight = REGISTRY.register(Gauge(
+    "bolsos_http_requests_in_flight",
+    "Peticiones HTTP en curso.",
+    ("method",),
+))
+db_query_duration = REGISTRY.register(Histogram(
+    "bolsos_db_query_duration_seconds",
+    "Duración de las funciones de acceso a la base de datos.",
+    ("function",),
+))
+db_query_errors = REGISTRY.register(Counter(
+    "bolsos_db_query_errors_total",
+    "Funciones de acceso a la base de datos que terminaron con una excepción.",
+    ("function",),
+))
+db_rows_returned = REGISTRY.register(Counter(
+    "bolsos_db_rows_returned_total",
+    "Filas devueltas por las funciones de lectura.",
+    ("function",),
+))
+db_connection_acquire = REGISTRY.register(Histogram(
+    "bolsos_db_connection_acquire_seconds",
+    "Tiempo en obtener una conexión del backend (espera del pool incluida).",
+))
+
+
+def render() -> str:
+    """Texto de todas las métricas (formato de exposición de Prometheus 0.0.4)."""
+    return REGISTRY.render()
+
+
+# ========================
+# Instrumentación de las funciones de base de datos
+# ========================
+
+def una_fila(resultado: Any) -> int:
+    """Filas de una función que devuelve una fila o None."""
+    return 0 if resultado is None else 1
+
+
+def medir_consulta(filas: Callable[[Any], int] | None = None) -> Callable[[Callable], Callable]:
+    """
+    Decorador para las funciones de app.database y app.database_async:
+    registra su duración (y si lanzaron una excepción) con la etiqueta
+    function=<nombre>. Con `filas`, suma también las filas devueltas
+    (p. ej. filas=len para listas). Admite funciones normales, corrutinas
+    y generadores asíncronos (cada bloque cuenta len(bloque) filas).
+    """
+    def decorador(func: Callable) -> Callable:
+        nombre = func.__name__
+
+        if inspect.isasyncgenfunction(func):
+            @functools.wraps(func)
+            async def envoltura_gen(*args, **kwargs):
+                inicio = time.perf_counter()
+                total = 0
+                try:
+                    async for bloque in func(*args, **kwargs):
+                        total += len(bloque)
+                        yield bloque
+                except Exception:
+                    db_query_errors.inc(nombre)
+                    raise
+                finally:
+                    db_query_duration.observe(time.perf_counter() - inicio, nombre)
+                    db_rows_returned.inc(nombre, amount=total)
+            return envoltura_gen
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def envoltura_async(*args, **kwargs):
+                inicio = time.perf_counter()
+                try:
+                    resultado = await func(*args, **kwargs)
+                except Exception:
+                    db_query_errors.inc(nombre)
+                    raise
+                finally:
+                    db_query_duration.observe(time.perf_counter() - inicio, nombre)
+                if filas is not None:
+                    db_rows_returned.inc(nombre, amount=filas(resultado))
+                return resultado
+            return envoltura_async
+
+        @functools.wraps(func)
+        def envoltura(*args, **kwargs):
+            inicio = time.perf_counter()
+            try:
+                resultado = func(*args, **kwargs)
+            except Exception:
+                db_query_errors.inc(nombre)
+                raise
+            finally:
+                db_query_duration.observe(time.perf_counter() - inicio, nombre)
+            if filas is not None:
+                db_rows_returned.inc(nombre, amount=filas(resultado))
+            return resultado
+        return envoltura
+
+    return decorador
+
+
+# ========================
+# Middleware HTTP
+# ========================
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI puro (sin BaseHTTPMiddleware, que añade una tarea y
+    colas por petición): mide cada petición HTTP hasta el último byte de la
+    respuesta. La ruta es la plantilla que FastAPI deja en scope["route"]
+    al enrutar, así las etiquetas no crecen con cada ID.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        metodo = scope["method"] if scope["method"] in METODOS_HTTP else METODO_OTRO
+        estado = 500
+        streaming = False
+        primer_cuerpo = True
+        inicio = time.perf_counter()
+
+        async def send_con_estado(mensaje):
+            nonlocal estado, streaming, primer_cuerpo
+            if mensaje["type"] == "http.response.start":
+                estado = mensaje["status"]
+            elif mensaje["type"] == "http.response.body" and primer_cuerpo:
+                # Como en app.profiling: el cuerpo llega en varios trozos
+                primer_cuerpo = False
+                streaming = mensaje.get("more_body", False)
+            await send(mensaje)
+
+        http_requests_in_flight.inc(metodo)
+        try:
+            await self.app(scope, receive, send_con_estado)
+        finally:
+            http_requests_in_flight.dec(metodo)
+            ruta = scope.get("route")
+            if not streaming:
+                http_request_duration.observe(
+                    time.perf_counter() - inicio,
+                    metodo,
+                    getattr(ruta, "path", RUTA_DESCONOCIDA),
+                    str(estado),
+                )
@@ -0,0 +1,335 @@
+"""
+Migraciones del esquema de MySQL y comprobación de índices.
+
+Las migraciones son los ficheros app/migrations/NNNN_descripcion.sql, que
+se aplican en orden de versión; las aplicadas se registran en la tabla
+schema_migrations (versión, nombre, checksum y fecha). Una migración ya
+aplicada no se vuelve a ejecutar: los cambios van siempre en una nueva.
+
+    python -m app.migrate            # aplica las pendientes (= up)
+    python -m app.migrate status     # aplicadas, pendientes y modificadas
+    python -m app.migrate explain    # EXPLAIN de cada consulta de app.database
+
+- Cada fichero se divide en sentencias por ";" (sin ";" dentro de
+  literales). Los triggers cambian el separador con `DELIMITER $$` ...
+  `DELIMITER ;`, como en el cliente mysql. En MySQL el DDL hace COMMIT implícito: si una
+  sentencia falla, las anteriores del fichero quedan aplicadas y la
+  migración no se registra; se corrige y se vuelve a lanzar
+- Los objetos que ya existen (tabla o índice creados a mano con los
+  scripts de docs/) se dan por aplicados, así una base de datos existente
+  se puede adoptar sin borrar nada
+- Con DB_BACKEND=sqlite el esquema lo crea el propio backend (SCHEMA en
+  app.backends.sqlite); `explain` funciona también ahí con EXPLAIN QUERY PLAN
+"""
+import argparse
+import hashlib
+import re
+import sys
+from dataclasses import dataclass
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from app.backends import backend_name, get_backend
+from app.database import (
+    SQL_AGGREGATE_BOLSOS,
+    SQL_DELETE_BOLSO,
+    SQL_RESERVAR_STOCK,
+    SQL_SELECT_BOLSOS,
+    SQL_SELECT_BORRADOS,
+    SQL_SELECT_CAMBIOS,
+    SQL_UPDATE_BOLSO,
+    build_select_bolsos,
+    build_select_by_ids,
+    build_update_por_sku,
+    connection_params,
+    sql_in,
+)
+
+MIGRACIONES_DIR = Path(__file__).parent / "migrations"
+
+_FICHERO = re.compile(r"^(\d{4})_(\w+)\.sql$")
+
+SQL_CREATE_SCHEMA_MIGRATIONS = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INT PRIMARY KEY,
+        nombre VARCHAR(100) NOT NULL,
+        checksum CHAR(64) NOT NULL,
+        aplicada_en TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+    ) ENGINE=InnoDB
+"""
+
+# Errores de MySQL de "ya existe": tabla (1050), columna (1060), índice (1061),
+# trigger (1359)
+_YA_EXISTE = {1050, 1060, 1061, 1359}
+
+
+@dataclass(frozen=True)
+class Migracion:
+    version: int
+    nombre: str
+    sql: str
+
+    @property
+    def checksum(self) -> str:
+        return hashlib.sha256(self.sql.encode("utf-8")).hexdigest()
+
+
+def cargar_migraciones(directorio: Path = MIGRACIONES_DIR) -> List[Migracion]:
+    """Migraciones del directorio en orden de versión (ValueError si se repite una)."""
+    migraciones: Dict[int, Migracion] = {}
+    for ruta in sorted(directorio.glob("*.sql")):
+        m = _FICHERO.match(ruta.name)
+        if m is None:
+            raise ValueError(f"Nombre de migración no válido: {ruta.name} (NNNN_descripcion.sql)")
+        version = int(m.group(1))
+        if version in migraciones:
+            raise ValueError(f"Versión de migración repetida: {version}")
+        migraciones[version] = Migracion(version, m.group(2), ruta.read_text(encoding="utf-8"))
+    return [migraciones[v] for v in sorted(migraciones)]
+
+
+def sentencias(sql: str) -> List[str]:
+    """
+    Sentencias de un fichero de migración, sin comentarios de línea (--).
+    `DELIMITER xx` cambia el separador hasta el siguiente DELIMITER.
+    """
+    resultado: List[str] = []
+    separador = ";"
+    actual: List[str] = []
+    for linea in sql.splitlines():
+        limpia = linea.strip()
+        if limpia.startswith("--"):
+            continue
+        if limpia.upper().startswith("DELIMITER "):
+            separador = limpia.split(None, 1)[1]
+            continue
+        partes = linea.split(separador)
+        for parte in partes[:-1]:
+            actual.append(parte)
+            resultado.append("\n".join(actual))
+            actual = []
+        actual.append(partes[-1])
+    resultado.append("\n".join(actual))
+    return [s.strip() for s in resultado if s.strip()]
+
+
+# ========================
+# Aplicar migraciones (MySQL)
+# ========================
+
+def _conectar():
+    import mysql.connector
+    return mysql.connector.connect(**connection_params())
+
+
+def aplicadas(conn) -> Dict[int, str]:
+    """{versión: checksum} de las migraciones registradas en schema_migrations."""
+    cur = conn.cursor()
+    try:
+        cur.execute(SQL_CREATE_SCHEMA_MIGRATIONS)
+        cur.execute("SELECT version, checksum FROM schema_migrations")
+        return {version: checksum for version, checksum in cur.fetchall()}
+    finally:
+        cur.close()
+
+
+def aplicar(conn, migracion: Migracion) -> List[str]:
+    """
+    Ejecuta las sentencias de una migración y la registra. Retorna los
+    avisos de objetos que ya existían.
+    """
+    from mysql.connector.errors import DatabaseError
+
+    avisos: List[str] = []
+    cur = conn.cursor()
+    try:
+        for sentencia in sentencias(migracion.sql):
+            try:
+                cur.execute(sentencia)
+            except DatabaseError as e:
+                if e.errno not in _YA_EXISTE:
+                    raise
+                avisos.append(f"ya existe, se da por aplicado: {e.msg}")
+        cur.execute(
+            "INSERT INTO schema_migrations (version, nombre, checksum) VALUES (%s, %s, %s)",
+            (migracion.version, migracion.nombre, migracion.checksum),
+        )
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+    return avisos
+
+
+def migrar(conn, migraciones: List[Migracion]) -> List[Migracion]:
+    """Aplica en orden las migraciones pendientes. Retorna las aplicadas ahora."""
+    hechas = aplicadas(conn)
+    nuevas: List[Migracion] = []
+    for migracion in migraciones:
+        if migracion.version in hechas:
+            continue
+        print(f"→ {migracion.version:04d}_{migracion.nombre}")
+        for aviso in aplicar(conn, migracion):
+            print(f"   {aviso}")
+        nuevas.append(migracion)
+    return nuevas
+
+
+def estado(conn, migraciones: List[Migracion]) -> List[Tuple[Migracion, str]]:
+    """(migración, "aplicada" | "pendiente" | "modificada") de cada migración."""
+    hechas = aplicadas(conn)
+    resultado: List[Tuple[Migracion, str]] = []
+    for migracion in migraciones:
+        if migracion.version not in hechas:
+            resultado.append((migracion, "pendiente"))
+        elif hechas[migracion.version] != migracion.checksum:
+            # Se editó el fichero después de aplicarlo: el cambio no está en la base
+            resultado.append((migracion, "modificada"))
+        else:
+            resultado.append((migracion, "aplicada"))
+    return resultado
+
+
+# ========================
+# EXPLAIN de las consultas de app.database
+# ========================
+
+def consultas() -> List[Tuple[str, str, List[Any], bool]]:
+    """
+    Las consultas de app.database con parámetros de ejemplo:
+    (nombre, sql, params, recorre_la_tabla). Las de recorre_la_tabla=True
+    leen todas las filas a propósito (catálogo completo, agregados).
+    """
+    skus = ["BAND-001", "TOTE-002"]
+    return [
+        ("fetch_all", SQL_SELECT_BOLSOS, [], True),
+        ("aggregate", SQL_AGGREGATE_BOLSOS, [], True),
+        ("select_by_id", *build_select_by_ids([1]), False),
+        ("select_by_ids", *build_select_by_ids([1, 2, 3]), False),
+        ("select_by_skus", SQL_SELECT_BOLSOS + f" WHERE codigo_sku IN ({sql_in(len(skus))})", skus, False),
+        ("skus_existentes", f"SELECT codigo_sku, id_bolso FROM bolso WHERE codigo_sku IN ({sql_in(len(skus))})",
+         skus, False),
+        ("page", *build_select_bolsos(limit=101), False),
+        ("page cursor", *build_select_bolsos(after=(100,), limit=101), False),
+        ("page -id_bolso cursor", *build_select_bolsos(orden="-id_bolso", after=(100,), limit=101), False),
+        ("page categoria", *build_select_bolsos(categoria="Tote", limit=101), False),
+        ("page categoria cursor", *build_select_bolsos(categoria="Tote", after=(100,), limit=101), False),
+        ("page categoria orden=precio", *build_select_bolsos(categoria="Tote", orden="precio", limit=101), False),
+        ("page activo", *build_select_bolsos(activo=True, after=(100,), limit=101), False),
+        ("page rango de precio", *build_select_bolsos(precio_min=20, precio_max=60, orden="precio", limit=101), False),
+        ("page orden=precio cursor", *build_select_bolsos(orden="precio", after=(Decimal("45.50"), 100), limit=101),
+         False),
+        ("page orden=-precio", *build_select_bolsos(orden="-precio", limit=101), False),
+        ("changes", SQL_SELECT_CAMBIOS, [100, 200, 1001], False),
+        ("changes borrados", SQL_SELECT_BORRADOS, [100, 200, 1001], False),
+        ("update", SQL_UPDATE_BOLSO, ["Bolso", None, 10, 1, "Tote", "TOTE-002", 1, 1], False),
+        ("update_por_sku", *build_update_por_sku([{"codigo_sku": s, "stock": 1} for s in skus]), False),
+        ("reservar", SQL_RESERVAR_STOCK, [1, 1, 1], False),
+        ("delete", SQL_DELETE_BOLSO, [1], False),
+    ]
+
+
+def _explain_mysql(conn, sql: str, params: List[Any]) -> Tuple[bool, bool, str]:
+    """(usa un índice, recorre la tabla, resumen) según EXPLAIN de MySQL."""
+    cur = conn.cursor(dictionary=True)
+    try:
+        cur.execute("EXPLAIN " + sql, params)
+        filas = [f for f in cur.fetchall() if f.get("table") in ("bolso", "bolso_borrado")]
+    finally:
+        cur.close()
+    usa_indice = any(f.get("key") for f in filas)
+    recorre = any(f.get("type") == "ALL" for f in filas)
+    resumen = "; ".join(
+        f"type={f.get('type')} key={f.get('key')} possible_keys={f.get('possible_keys')} "
+        f"rows={f.get('rows')} {f.get('Extra') or ''}".strip()
+        for f in filas
+    )
+    return usa_indice, recorre, resumen
+
+
+def _explain_sqlite(db, sql: str, params: List[Any]) -> Tuple[bool, bool, str]:
+    """(usa un índice, recorre la tabla, resumen) según EXPLAIN QUERY PLAN de SQLite."""
+    from app.backends.sqlite import _params, _sql
+
+    detalles = [fila[3] for fila in db.execute("EXPLAIN QUERY PLAN " + _sql(sql), _params(params)).fetchall()]
+    usa_indice = any("USING" in d and ("INDEX" in d or "PRIMARY KEY" in d) for d in detalles)
+    recorre = any(d.startswith("SCAN") and "USING" not in d for d in detalles)
+    if recorre and "ORDER BY id_bolso" in sql and not any("TEMP B-TREE" in d for d in detalles):
+        # La tabla es el árbol de la clave primaria: "SCAN bolso" sin ordenar
+        # aparte es un recorrido en orden de id_bolso que se corta en el LIMIT
+        usa_indice = True
+        detalles.append("(en orden de la clave primaria)")
+    return usa_indice, recorre, "; ".join(detalles)
+
+
+def explain() -> int:
+    """
+    Ejecuta EXPLAIN de cada consulta y muestra el plan. Retorna el número
+    de consultas que deberían usar un índice y recorren la tabla.
+    """
+    nombre = backend_name()
+    if nombre == "memory":
+        raise SystemExit("explain necesita DB_BACKEND=mysql o sqlite")
+
+    if nombre == "mysql":
+        conn = _conectar()
+        ejecutar = lambda sql, params: _explain_mysql(conn, sql, params)
+    else:
+        db = get_backend().db  # type: ignore[attr-defined]
+        ejecutar = lambda sql, params: _explain_sqlite(db, sql, params)
+
+    problemas = 0
+    try:
+        for consulta, sql, params, recorre_esperado in consultas():
+            usa_indice, recorre, resumen = ejecutar(sql, params)
+            if recorre_esperado:
+                marca = "--"
+            elif recorre and not usa_indice:
+                marca = "!!"
+                problemas += 1
+            else:
+                marca = "ok"
+            print(f"[{marca}] {consulta:<30} {resumen}")
+    finally:
+        if nombre == "mysql":
+            conn.close()
+
+    if problemas:
+        # Con pocas filas MySQL puede preferir un recorrido completo aunque
+        # el índice exista (possible_keys): repetir con la tabla con datos
+        print(f"\n{problemas} consultas recorren la tabla sin usar un índice "
+              "(¿faltan migraciones? ¿tabla casi vacía?)")
+    return problemas
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.migrate", description="Migraciones del esquema de bolsos")
+    parser.add_argument("comando", nargs="?", default="up", choices=("up", "status", "explain"))
+    args = parser.parse_args(argv)
+
+    if args.comando == "explain":
+        return 1 if explain() else 0
+
+    if backend_name() != "mysql":
+        print(f"DB_BACKEND={backend_name()}: el esquema lo crea el backend, no hay migraciones que aplicar")
+        return 0
+
+    migraciones = cargar_migraciones()
+    conn = _conectar()
+    try:
+        if args.comando == "status":
+            for migracion, situacion in estado(conn, migraciones):
+                print(f"{migracion.version:04d}_{migracion.nombre:<40} {situacion}")
+            return 0
+        nuevas = migrar(conn, migraciones)
+        print(f"{len(nuevas)} migraciones aplicadas" if nuevas else "El esquema está al día")
+        return 0
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
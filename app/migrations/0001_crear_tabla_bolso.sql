@@ -0,0 +1,15 @@
+-- Tabla bolso con las columnas que usan app.database y la API.
+-- Los tipos siguen a los modelos de app.main (BolsoBase).
+
+CREATE TABLE IF NOT EXISTS bolso (
+    id_bolso INT AUTO_INCREMENT PRIMARY KEY,
+    nombre VARCHAR(80) NOT NULL,
+    descripcion VARCHAR(255) NULL,
+    precio DECIMAL(10, 2) NOT NULL,
+    stock INT NOT NULL DEFAULT 0,
+    categoria VARCHAR(50) NOT NULL,
+    codigo_sku VARCHAR(20) NOT NULL,
+    activo TINYINT(1) NOT NULL DEFAULT 1,
+    -- Red de seguridad de las reservas (UPDATE ... WHERE stock >= n)
+    CONSTRAINT chk_bolso_stock CHECK (stock >= 0)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
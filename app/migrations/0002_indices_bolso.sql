@@ -0,0 +1,20 @@
+-- Índices de las consultas de app.database (comprobar con
+-- `python -m app.migrate explain`).
+
+-- codigo_sku único: altas masivas (lectura por SKU), POST /bolso/upsert
+-- (INSERT ... ON DUPLICATE KEY UPDATE) y UPDATE ... CASE codigo_sku
+CREATE UNIQUE INDEX uq_bolso_codigo_sku ON bolso (codigo_sku);
+
+-- GET /bolso?categoria=...: el cursor (id_bolso > ?) continúa el range
+-- scan sin OFFSET; también agrupa el GROUP BY categoria de /bolso/stats
+CREATE INDEX idx_bolso_categoria_id ON bolso (categoria, id_bolso);
+
+-- GET /bolso?categoria=...&orden=precio (listado de una categoría por
+-- precio): filtro y orden con el mismo índice, sin filesort
+CREATE INDEX idx_bolso_categoria_precio_id ON bolso (categoria, precio, id_bolso);
+
+-- GET /bolso?activo=... (los listados públicos solo muestran activos)
+CREATE INDEX idx_bolso_activo_id ON bolso (activo, id_bolso);
+
+-- Rango de precio y orden=precio / -precio con cursor (precio, id_bolso)
+CREATE INDEX idx_bolso_precio_id ON bolso (precio, id_bolso);
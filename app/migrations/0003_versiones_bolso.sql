@@ -0,0 +1,58 @@
+-- Versión de cambios para GET /bolso/changes (sincronización por deltas).
+--
+-- bolso_version es una secuencia de una sola fila: cada alta, modificación
+-- o borrado de un bolso toma el siguiente número (triggers). La fila guarda
+-- en bolso.version el de su último cambio y los borrados quedan en
+-- bolso_borrado. La aplicación bloquea la secuencia al empezar cada
+-- escritura (SQL_BLOQUEAR_VERSION), así las escrituras confirman en orden
+-- de versión y un cliente que ha visto la N no se salta ninguna anterior.
+-- Requiere el privilegio TRIGGER.
+
+CREATE TABLE IF NOT EXISTS bolso_version (
+    id TINYINT PRIMARY KEY,
+    valor BIGINT NOT NULL
+) ENGINE=InnoDB;
+
+CREATE TABLE IF NOT EXISTS bolso_borrado (
+    id_bolso INT PRIMARY KEY,
+    version BIGINT NOT NULL,
+    INDEX idx_bolso_borrado_version (version)
+) ENGINE=InnoDB;
+
+ALTER TABLE bolso ADD COLUMN version BIGINT NOT NULL DEFAULT 0;
+
+-- GET /bolso/changes?since=...: WHERE version > ? ORDER BY version LIMIT ?
+CREATE INDEX idx_bolso_version ON bolso (version);
+
+-- Las filas que ya existen: versión = id_bolso (única) y la secuencia
+-- continúa desde la mayor
+UPDATE bolso SET version = id_bolso WHERE version = 0;
+INSERT IGNORE INTO bolso_version (id, valor)
+    SELECT 1, COALESCE(MAX(version), 0) FROM bolso;
+
+DELIMITER $$
+
+CREATE TRIGGER trg_bolso_version_insert BEFORE INSERT ON bolso
+FOR EACH ROW
+BEGIN
+    UPDATE bolso_version SET valor = valor + 1 WHERE id = 1;
+    SET NEW.version = (SELECT valor FROM bolso_version WHERE id = 1);
+END$$
+
+CREATE TRIGGER trg_bolso_version_update BEFORE UPDATE ON bolso
+FOR EACH ROW
+BEGIN
+    UPDATE bolso_version SET valor = valor + 1 WHERE id = 1;
+    SET NEW.version = (SELECT valor FROM bolso_version WHERE id = 1);
+END$$
+
+CREATE TRIGGER trg_bolso_borrado AFTER DELETE ON bolso
+FOR EACH ROW
+BEGIN
+    UPDATE bolso_version SET valor = valor + 1 WHERE id = 1;
+    INSERT INTO bolso_borrado (id_bolso, version)
+        VALUES (OLD.id_bolso, (SELECT valor FROM bolso_version WHERE id = 1))
+        ON DUPLICATE KEY UPDATE version = VALUES(version);
+END$$
+
+DELIMITER ;
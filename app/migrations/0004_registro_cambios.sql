@@ -0,0 +1,57 @@
+-- Versiones de GET /bolso/changes sin fila común entre escrituras.
+--
+-- Con la secuencia de una sola fila de la 0003 (bolso_version) todas las
+-- escrituras del catálogo, reservas incluidas, se serializaban en su
+-- bloqueo. Ahora cada alta, modificación o borrado inserta una fila en
+-- bolso_cambio y toma su AUTO_INCREMENT como versión: las inserciones al
+-- final del índice no se bloquean entre sí. Las versiones pueden
+-- confirmarse fuera de orden; las lecturas solo avanzan hasta la última sin
+-- huecos pendientes (ver SQL_SELECT_REGISTRO_CAMBIOS en app.database).
+--
+-- `creado` se toma con SYSDATE(6) (la hora real, no la del inicio de la
+-- sentencia): requiere binlog_format=ROW, el valor por defecto.
+-- Las filas antiguas de bolso_cambio se pueden purgar dejando la última.
+
+CREATE TABLE IF NOT EXISTS bolso_cambio (
+    version BIGINT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+    creado DATETIME(6) NOT NULL
+) ENGINE=InnoDB;
+
+-- La numeración sigue desde la última versión de la secuencia anterior
+INSERT INTO bolso_cambio (version, creado)
+    SELECT valor, SYSDATE(6) FROM bolso_version WHERE id = 1 AND valor > 0;
+
+DROP TRIGGER IF EXISTS trg_bolso_version_insert;
+DROP TRIGGER IF EXISTS trg_bolso_version_update;
+DROP TRIGGER IF EXISTS trg_bolso_borrado;
+
+-- LAST_INSERT_ID() dentro de un trigger no cambia el que ve la aplicación
+-- (el id_bolso del INSERT)
+DELIMITER $$
+
+CREATE TRIGGER trg_bolso_version_insert BEFORE INSERT ON bolso
+FOR EACH ROW
+BEGIN
+    INSERT INTO bolso_cambio (creado) VALUES (SYSDATE(6));
+    SET NEW.version = LAST_INSERT_ID();
+END$$
+
+CREATE TRIGGER trg_bolso_version_update BEFORE UPDATE ON bolso
+FOR EACH ROW
+BEGIN
+    INSERT INTO bolso_cambio (creado) VALUES (SYSDATE(6));
+    SET NEW.version = LAST_INSERT_ID();
+END$$
+
+CREATE TRIGGER trg_bolso_borrado AFTER DELETE ON bolso
+FOR EACH ROW
+BEGIN
+    INSERT INTO bolso_cambio (creado) VALUES (SYSDATE(6));
+    INSERT INTO bolso_borrado (id_bolso, version)
+        VALUES (OLD.id_bolso, LAST_INSERT_ID())
+        ON DUPLICATE KEY UPDATE version = VALUES(version);
+END$$
+
+DELIMITER ;
+
+DROP TABLE IF EXISTS bolso_version;
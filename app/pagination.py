@@ -0,0 +1,63 @@
+import base64
+import json
+from decimal import Decimal
+from typing import Any, Dict, Tuple
+
+# Ordenaciones soportadas en GET /bolso: nombre -> columnas de la clave keyset.
+# La última columna siempre es id_bolso para que la clave sea única.
+ORDENES: Dict[str, Tuple[str, ...]] = {
+    "id_bolso": ("id_bolso",),
+    "-id_bolso": ("id_bolso",),
+    "precio": ("precio", "id_bolso"),
+    "-precio": ("precio", "id_bolso"),
+}
+
+
+class InvalidCursorError(ValueError):
+    """El cursor recibido no es válido o no corresponde a la ordenación pedida."""
+
+
+def encode_cursor(orden: str, row: Dict[str, Any]) -> str:
+    """
+    Construye el cursor opaco que apunta a la fila siguiente a `row`.
+    Es un JSON en base64url con la ordenación y los valores de la clave.
+    """
+    keys = []
+    for col in ORDENES[orden]:
+        value = row[col]
+        # Decimal se guarda como texto para no perder precisión
+        keys.append(str(value) if isinstance(value, (Decimal, float)) else value)
+    raw = json.dumps({"o": orden, "k": keys}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, orden: str) -> Tuple[Any, ...]:
+    """
+    Decodifica un cursor y devuelve los valores de la clave keyset.
+    Lanza InvalidCursorError si está mal formado o es de otra ordenación.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        keys = tuple(data["k"])
+        cursor_orden = data["o"]
+    except Exception:
+        raise InvalidCursorError("Cursor de paginación no válido")
+
+    if cursor_orden != orden:
+        raise InvalidCursorError(
+            f"El cursor corresponde a la ordenación '{cursor_orden}', no a '{orden}'"
+        )
+    # bool es subclase de int: true/false no son un id_bolso
+    if (len(keys) != len(ORDENES[orden]) or not isinstance(keys[-1], int)
+            or any(isinstance(k, bool) for k in keys)):
+        raise InvalidCursorError("Cursor de paginación no válido")
+    try:
+        # Las columnas distintas de id_bolso (precio) son numéricas
+        valores = tuple(Decimal(str(k)) for k in keys[:-1])
+    except Exception:
+        raise InvalidCursorError("Cursor de paginación no válido")
+    # NaN o Infinity (válidos en Decimal y en el JSON de Python) no son un precio
+    if not all(v.is_finite() for v in valores):
+        raise InvalidCursorError("Cursor de paginación no válido")
+    return valores + (keys[-1],)
@@ -0,0 +1,491 @@
+import asyncio
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+
+class PoolTimeoutError(Exception):
+    """Se lanza cuando no hay conexiones libres en el pool dentro del timeout."""
+
+
+class PooledConnection:
+    """
+    Envoltorio de una conexión real que pertenece a un pool.
+
+    Delega todos los atributos en la conexión real (cursor, commit, rollback...)
+    pero close() no cierra el socket: devuelve la conexión al pool.
+    """
+
+    def __init__(self, pool: "ConnectionPool", raw: Any, created_at: float):
+        self._pool = pool
+        self._raw = raw
+        self._created_at = created_at
+        self._released = False
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._raw, name)
+
+    def close(self) -> None:
+        """Devuelve la conexión al pool (idempotente)."""
+        if self._released:
+            return
+        self._released = True
+        self._pool._release(self._raw, self._created_at)
+
+    def invalidate(self) -> None:
+        """Cierra la conexión real y libera su hueco en el pool (p. ej. tras un error a mitad de lectura)."""
+        if self._released:
+            return
+        self._released = True
+        self._pool._discard(self._raw)
+
+
+class _PoolBase:
+    """Configuración y contadores comunes a los pools síncrono y asíncrono."""
+
+    def __init__(self, size: int, timeout: float, recycle: float, validate_idle: float):
+        if size < 1:
+            raise ValueError("El tamaño del pool debe ser >= 1")
+        self.size = size
+        self.timeout = timeout
+        self.recycle = recycle
+        self.validate_idle = validate_idle
+
+        # Pila LIFO de (conexion, creada_en, devuelta_en): se reutiliza
+        # primero la conexión más reciente, que es la que seguro sigue viva.
+        self._idle: List[tuple] = []
+        self._opened = 0
+        self._in_use = 0
+        # Instante del último dispose(): las conexiones abiertas antes que
+        # estaban en uso se cierran al devolverse en lugar de volver a _idle
+        self._disposed_at: float | None = None
+
+        # Contadores para estadísticas
+        self._created = 0
+        self._recycled = 0
+        self._invalidated = 0
+        self._waits = 0
+        self._timeouts = 0
+        self._checkouts = 0
+        self._checkout_time_total = 0.0
+        self._checkout_time_max = 0.0
+
+    def _snapshot(self) -> Dict[str, Any]:
+        checkouts = self._checkouts
+        return {
+            "size": self.size,
+            "open": self._opened,
+            "in_use": self._in_use,
+            "idle": len(self._idle),
+            "created": self._created,
+            "recycled": self._recycled,
+            "invalidated": self._invalidated,
+            "waits": self._waits,
+            "timeouts": self._timeouts,
+            "checkouts": checkouts,
+            "checkout_ms_avg": (
+                round(self._checkout_time_total / checkouts * 1000, 3)
+                if checkouts else 0.0
+            ),
+            "checkout_ms_max": round(self._checkout_time_max * 1000, 3),
+        }
+
+    def _count_checkout(self, elapsed: float) -> None:
+        self._checkouts += 1
+        self._checkout_time_total += elapsed
+        if elapsed > self._checkout_time_max:
+            self._checkout_time_max = elapsed
+
+    def _retirada(self, created_at: float) -> bool:
+        """True si la conexión es anterior al último dispose()."""
+        return self._disposed_at is not None and created_at <= self._disposed_at
+
+    def _timeout_error(self) -> "PoolTimeoutError":
+        self._timeouts += 1
+        return PoolTimeoutError(
+            f"No hay conexiones libres en el pool tras {self.timeout}s "
+            f"(size={self.size})"
+        )
+
+
+class ConnectionPool(_PoolBase):
+    """
+    Pool de conexiones thread-safe con tamaño máximo, timeout de espera,
+    validación de conexiones ociosas y reciclado por antigüedad.
+
+    - size: número máximo de conexiones abiertas (en uso + ociosas)
+    - timeout: segundos que acquire() espera una conexión libre
+    - recycle: segundos de vida máxima de una conexión (0 = sin límite)
+    - validate_idle: segundos de inactividad a partir de los cuales una
+      conexión se valida con `validator` antes de entregarla
+    """
+
+    def __init__(
+        self,
+        creator: Callable[[], Any],
+        size: int = 5,
+        timeout: float = 10.0,
+        recycle: float = 3600.0,
+        validate_idle: float = 30.0,
+        validator: Optional[Callable[[Any], bool]] = None,
+    ):
+        super().__init__(size, timeout, recycle, validate_idle)
+        self._creator = creator
+        self._validator = validator
+        self._cond = threading.Condition()
+
+    # ------------------------
+    # API pública
+    # ------------------------
+
+    def acquire(self) -> PooledConnection:
+        """
+        Obtiene una conexión del pool.
+        Lanza PoolTimeoutError si no hay ninguna libre dentro de `timeout`.
+        """
+        start = time.perf_counter()
+        deadline = start + self.timeout
+        waited = False
+
+        while True:
+            candidate = None
+            create = False
+
+            with self._cond:
+                while not self._idle and self._opened >= self.size:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        raise self._timeout_error()
+                    if not waited:
+                        waited = True
+                        self._waits += 1
+                    self._cond.wait(remaining)
+
+                if self._idle:
+                    candidate = self._idle.pop()
+                else:
+                    # Reservamos el hueco antes de salir del lock
+                    create = True
+                    self._opened += 1
+                self._in_use += 1
+
+            if create:
+                raw, created_at = self._open()
+            else:
+                raw, created_at = self._check(candidate)
+                if raw is None:
+                    # La conexión no era válida: se descartó, reintentamos
+                    continue
+
+            self._record_checkout(time.perf_counter() - start)
+            return PooledConnection(self, raw, created_at)
+
+    def stats(self) -> Dict[str, Any]:
+        """Devuelve un snapshot de las métricas del pool."""
+        with self._cond:
+            return self._snapshot()
+
+    def dispose(self) -> None:
+        """Cierra todas las conexiones ociosas (las que están en uso se cierran al devolverse)."""
+        with self._cond:
+            self._disposed_at = time.monotonic()
+            idle, self._idle = self._idle, []
+            self._opened -= len(idle)
+            self._cond.notify_all()
+        for raw, _, _ in idle:
+            self._close_quietly(raw)
+
+    # ------------------------
+    # Internos
+    # ------------------------
+
+    def _open(self) -> tuple:
+        """Abre una conexión nueva. El hueco ya está reservado en _opened."""
+        try:
+            raw = self._creator()
+        except Exception:
+            with self._cond:
+                self._opened -= 1
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._created += 1
+        return raw, time.monotonic()
+
+    def _check(self, candidate: tuple) -> tuple:
+        """
+        Comprueba una conexión ociosa antes de entregarla.
+        Retorna (conexion, creada_en) o (None, None) si se ha descartado.
+        """
+        raw, created_at, released_at = candidate
+        now = time.monotonic()
+
+        if self.recycle and now - created_at > self.recycle:
+            # Sustituimos la conexión vieja por una nueva en el mismo hueco
+            self._close_quietly(raw)
+            with self._cond:
+                self._recycled += 1
+            return self._open()
+
+        if self._validator and now - released_at > self.validate_idle:
+            try:
+                valid = self._validator(raw)
+            except Exception:
+                valid = False
+            if not valid:
+                self._close_quietly(raw)
+                with self._cond:
+                    self._invalidated += 1
+                    self._opened -= 1
+                    self._in_use -= 1
+                    self._cond.notify()
+                return None, None
+
+        return raw, created_at
+
+    def _release(self, raw: Any, created_at: float) -> None:
+        """Devuelve una conexión al pool, deshaciendo transacciones abiertas."""
+        healthy = True
+        try:
+            if getattr(raw, "in_transaction", False):
+                raw.rollback()
+        except Exception:
+            healthy = False
+
+        with self._cond:
+            self._in_use -= 1
+            retirada = self._retirada(created_at)
+            if healthy and not retirada:
+                self._idle.append((raw, created_at, time.monotonic()))
+            else:
+                self._opened -= 1
+                if not healthy:
+                    self._invalidated += 1
+            self._cond.notify()
+
+        if not healthy or retirada:
+            self._close_quietly(raw)
+
+    def _discard(self, raw: Any) -> None:
+        """Cierra una conexión prestada en lugar de devolverla al pool."""
+        with self._cond:
+            self._in_use -= 1
+            self._opened -= 1
+            self._invalidated += 1
+            self._cond.notify()
+        self._close_quietly(raw)
+
+    def _record_checkout(self, elapsed: float) -> None:
+        with self._cond:
+            self._count_checkout(elapsed)
+
+    @staticmethod
+    def _close_quietly(raw: Any) -> None:
+        try:
+            raw.close()
+        except Exception:
+            pass
+
+
+class AsyncPooledConnection:
+    """
+    Equivalente asíncrono de PooledConnection (mysql.connector.aio).
+    `await conn.close()` devuelve la conexión al pool.
+    """
+
+    def __init__(self, pool: "AsyncConnectionPool", raw: Any, created_at: float):
+        self._pool = pool
+        self._raw = raw
+        self._created_at = created_at
+        self._released = False
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._raw, name)
+
+    async def close(self) -> None:
+        """Devuelve la conexión al pool (idempotente)."""
+        if self._released:
+            return
+        self._released = True
+        await self._pool._release(self._raw, self._created_at)
+
+    async def invalidate(self) -> None:
+        """Cierra la conexión real y libera su hueco en el pool (p. ej. tras un error a mitad de lectura)."""
+        if self._released:
+            return
+        self._released = True
+        await self._pool._discard(self._raw)
+
+
+class AsyncConnectionPool(_PoolBase):
+    """
+    Pool de conexiones para asyncio con la misma configuración que
+    ConnectionPool. Las corrutinas que esperan una conexión libre no
+    ocupan ningún hilo: se suspenden hasta que otra la devuelve.
+
+    Debe usarse siempre desde el mismo event loop (el de la aplicación).
+    """
+
+    def __init__(
+        self,
+        creator: Callable[[], Awaitable[Any]],
+        size: int = 5,
+        timeout: float = 10.0,
+        recycle: float = 3600.0,
+        validate_idle: float = 30.0,
+        validator: Optional[Callable[[Any], Awaitable[bool]]] = None,
+    ):
+        super().__init__(size, timeout, recycle, validate_idle)
+        self._creator = creator
+        self._validator = validator
+        self._cond = asyncio.Condition()
+
+    # ------------------------
+    # API pública
+    # ------------------------
+
+    async def acquire(self) -> AsyncPooledConnection:
+        """
+        Obtiene una conexión del pool.
+        Lanza PoolTimeoutError si no hay ninguna libre dentro de `timeout`.
+        """
+        start = time.perf_counter()
+        deadline = start + self.timeout
+        waited = False
+
+        while True:
+            candidate = None
+            create = False
+
+            async with self._cond:
+                while not self._idle and self._opened >= self.size:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        raise self._timeout_error()
+                    if not waited:
+                        waited = True
+                        self._waits += 1
+                    try:
+                        await asyncio.wait_for(self._cond.wait(), remaining)
+                    except asyncio.TimeoutError:
+                        raise self._timeout_error()
+
+                if self._idle:
+                    candidate = self._idle.pop()
+                else:
+                    # Reservamos el hueco antes de soltar el lock
+                    create = True
+                    self._opened += 1
+                self._in_use += 1
+
+            if create:
+                raw, created_at = await self._open()
+            else:
+                raw, created_at = await self._check(candidate)
+                if raw is None:
+                    # La conexión no era válida: se descartó, reintentamos
+                    continue
+
+            self._count_checkout(time.perf_counter() - start)
+            return AsyncPooledConnection(self, raw, created_at)
+
+    def stats(self) -> Dict[str, Any]:
+        """Devuelve un snapshot de las métricas del pool."""
+        return self._snapshot()
+
+    async def dispose(self) -> None:
+        """Cierra todas las conexiones ociosas (las que están en uso se cierran al devolverse)."""
+        async with self._cond:
+            self._disposed_at = time.monotonic()
+            idle, self._idle = self._idle, []
+            self._opened -= len(idle)
+            self._cond.notify_all()
+        for raw, _, _ in idle:
+            await self._close_quietly(raw)
+
+    # ------------------------
+    # Internos
+    # ------------------------
+
+    async def _open(self) -> tuple:
+        """Abre una conexión nueva. El hueco ya está reservado en _opened."""
+        try:
+            raw = await self._creator()
+        except BaseException:
+            async with self._cond:
+                self._opened -= 1
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+        self._created += 1
+        return raw, time.monotonic()
+
+    async def _check(self, candidate: tuple) -> tuple:
+        """
+        Comprueba una conexión ociosa antes de entregarla.
+        Retorna (conexion, creada_en) o (None, None) si se ha descartado.
+        """
+        raw, created_at, released_at = candidate
+        now = time.monotonic()
+
+        if self.recycle and now - created_at > self.recycle:
+            # Sustituimos la conexión vieja por una nueva en el mismo hueco
+            await self._close_quietly(raw)
+            self._recycled += 1
+            return await self._open()
+
+        if self._validator and now - released_at > self.validate_idle:
+            try:
+                valid = await self._validator(raw)
+            except Exception:
+                valid = False
+            if not valid:
+                await self._close_quietly(raw)
+                async with self._cond:
+                    self._invalidated += 1
+                    self._opened -= 1
+                    self._in_use -= 1
+                    self._cond.notify()
+                return None, None
+
+        return raw, created_at
+
+    async def _release(self, raw: Any, created_at: float) -> None:
+        """Devuelve una conexión al pool, deshaciendo transacciones abiertas."""
+        healthy = True
+        try:
+            if getattr(raw, "in_transaction", False):
+                await raw.rollback()
+        except Exception:
+            healthy = False
+
+        async with self._cond:
+            self._in_use -= 1
+            retirada = self._retirada(created_at)
+            if healthy and not retirada:
+                self._idle.append((raw, created_at, time.monotonic()))
+            else:
+                self._opened -= 1
+                if not healthy:
+                    self._invalidated += 1
+            self._cond.notify()
+
+        if not healthy or retirada:
+            await self._close_quietly(raw)
+
+    async def _discard(self, raw: Any) -> None:
+        """Cierra una conexión prestada en lugar de devolverla al pool."""
+        async with self._cond:
+            self._in_use -= 1
+            self._opened -= 1
+            self._invalidated += 1
+            self._cond.notify()
+        await self._close_quietly(raw)
+
+    @staticmethod
+    async def _close_quietly(raw: Any) -> None:
+        try:
+            await raw.close()
+        except Exception:
+            pass
@@ -0,0 +1,171 @@
+"""
+Perfilado opcional de peticiones con cProfile, para ver en qué se va el
+tiempo de una ruta lenta (obtener la conexión, la consulta, mapear las filas,
+validar la respuesta...).
+
+Se activa con variables de entorno; sin ninguna de ellas el middleware ni
+siquiera se instala (coste cero):
+
+- PROFILE_TOKEN: perfila las peticiones que traigan la cabecera
+  X-Profile: <token> (secreto; para usarlo en producción)
+- PROFILE_ALL: "1" para perfilar todas las peticiones (solo en desarrollo)
+- PROFILE_DIR: si se indica, guarda un .prof por petición perfilada en ese
+  directorio (se abre con `python -m pstats fichero.prof` o snakeviz)
+- PROFILE_TOP: funciones del resumen (por defecto 15)
+- PROFILE_SORT: "tottime" (tiempo propio, por defecto) o "cumulative"
+
+El resumen se devuelve en la cabecera Server-Timing (la muestran las
+herramientas de desarrollo del navegador) y el fichero, si se guarda, en
+X-Profile-File. cProfile mide el hilo del event loop: si otras peticiones
+se ejecutan a la vez, sus funciones también aparecen. Solo se perfila una
+petición a la vez; las demás responden con X-Profile: busy. Las respuestas
+en streaming (GET /bolso/stream, /bolso/export) no se perfilan: responden
+con X-Profile: streaming.
+"""
+import cProfile
+import hmac
+import os
+import pstats
+import re
+import time
+from typing import Any, Dict, List, Tuple
+
+from app.logs import get_request_id
+
+HEADER = b"x-profile"
+
+
+def profiling_enabled() -> bool:
+    """True si PROFILE_TOKEN o PROFILE_ALL activan el perfilado."""
+    return bool(os.getenv("PROFILE_TOKEN")) or os.getenv("PROFILE_ALL", "0") == "1"
+
+
+def resumen(profiler: cProfile.Profile, top: int, orden: str = "tottime") -> List[Tuple[str, float, int]]:
+    """Las `top` funciones con más tiempo: [(función, ms, llamadas)]."""
+    indice = 3 if orden == "cumulative" else 2
+    filas: List[Tuple[str, float, int]] = []
+    stats: Dict[Tuple[str, int, str], Tuple[Any, ...]] = pstats.Stats(profiler).stats  # type: ignore[attr-defined]
+    for (fichero, linea, funcion), datos in sorted(stats.items(), key=lambda item: item[1][indice], reverse=True)[:top]:
+        if fichero == "~":
+            nombre = funcion
+        else:
+            nombre = f"{os.path.basename(fichero)}:{linea}({funcion})"
+        filas.append((nombre, datos[indice] * 1000, datos[1]))
+    return filas
+
+
+def server_timing(filas: List[Tuple[str, float, int]], total_ms: float) -> str:
+    """Cabecera Server-Timing: el total y una entrada por función."""
+    partes = [f'total;dur={total_ms:.3f};desc="profiled request"']
+    for i, (nombre, ms, llamadas) in enumerate(filas, start=1):
+        desc = f"{nombre} x{llamadas}".replace("\\", "/").replace('"', "'")
+        partes.append(f'p{i};dur={ms:.3f};desc="{desc}"')
+    return ", ".join(partes)
+
+
+class ProfileMiddleware:
+    """
+    Middleware ASGI que perfila con cProfile las peticiones marcadas
+    (cabecera X-Profile con PROFILE_TOKEN, o todas con PROFILE_ALL=1).
+
+    La respuesta se retiene hasta el último bloque para poder añadir el
+    resumen en las cabeceras. Si el primer bloque no es el último (una
+    StreamingResponse), se deja de perfilar y se reenvía tal cual: el
+    stream SSE no termina nunca y el export no debe quedarse en memoria.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.token = os.getenv("PROFILE_TOKEN", "").encode("latin-1")
+        self.todas = os.getenv("PROFILE_ALL", "0") == "1"
+        self.directorio = os.getenv("PROFILE_DIR") or None
+        self.top = int(os.getenv("PROFILE_TOP", "15"))
+        self.orden = os.getenv("PROFILE_SORT", "tottime")
+        self._ocupado = False
+        if self.directorio:
+            os.makedirs(self.directorio, exist_ok=True)
+
+    def _marcada(self, scope) -> bool:
+        if self.todas:
+            return True
+        if not self.token:
+            return False
+        for nombre, valor in scope["headers"]:
+            if nombre == HEADER:
+                return hmac.compare_digest(valor, self.token)
+        return False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._marcada(scope):
+            await self.app(scope, receive, send)
+            return
+
+        if self._ocupado:
+            async def send_ocupado(mensaje):
+                if mensaje["type"] == "http.response.start":
+                    mensaje["headers"] = list(mensaje.get("headers", [])) + [(b"x-profile", b"busy")]
+                await send(mensaje)
+            await self.app(scope, receive, send_ocupado)
+            return
+
+        retenidos: List[Dict[str, Any]] = []
+        profiler = cProfile.Profile()
+        self._ocupado = True
+        inicio = time.perf_counter()
+        profiler.enable()
+        streaming = False
+        terminado = False
+
+        def terminar() -> None:
+            # Una sola vez: tras un streaming, otra petición puede estar perfilándose ya
+            nonlocal terminado
+            if not terminado:
+                terminado = True
+                profiler.disable()
+                self._ocupado = False
+
+        try:
+            async def send_retenido(mensaje):
+                nonlocal streaming
+                if streaming:
+                    await send(mensaje)
+                    return
+                retenidos.append(mensaje)
+                if mensaje["type"] != "http.response.body":
+                    return
+                terminar()
+                if mensaje.get("more_body", False):
+                    # Respuesta en streaming: sin perfil, se reenvía según llega
+                    streaming = True
+                    for retenido in retenidos:
+                        if retenido["type"] == "http.response.start":
+                            retenido["headers"] = list(retenido.get("headers", [])) + [(b"x-profile", b"streaming")]
+                        await send(retenido)
+                    retenidos.clear()
+                else:
+                    await self._enviar(scope, send, retenidos, profiler, time.perf_counter() - inicio)
+
+            await self.app(scope, receive, send_retenido)
+        finally:
+            terminar()
+
+    async def _enviar(self, scope, send, mensajes, profiler: cProfile.Profile, segundos: float) -> None:
+        cabeceras = [(b"server-timing", server_timing(
+            resumen(profiler, self.top, self.orden), segundos * 1000
+        ).encode("latin-1", "replace"))]
+
+        if self.directorio:
+            ruta = getattr(scope.get("route"), "path", scope["path"])
+            nombre = "_".join([
+                time.strftime("%Y%m%d-%H%M%S"),
+                scope["method"],
+                re.sub(r"[^A-Za-z0-9]+", "_", ruta).strip("_") or "root",
+                get_request_id() or os.urandom(4).hex(),
+            ]) + ".prof"
+            profiler.dump_stats(os.path.join(self.directorio, nombre))
+            cabeceras.append((b"x-profile-file", nombre.encode("latin-1")))
+
+        for mensaje in mensajes:
+            if mensaje["type"] == "http.response.start":
+                mensaje["headers"] = list(mensaje.get("headers", [])) + cabeceras
+            await send(mensaje)
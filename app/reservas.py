@@ -0,0 +1,120 @@
+"""
+Agrupación de reservas de stock concurrentes (ventas flash).
+
+Cuando muchas peticiones reservan el mismo bolso a la vez, cada una con su
+UPDATE haría cola en el bloqueo de la fila. ReservaBatcher junta las que
+llegan en la misma ventana y las aplica en una transacción con
+`lote_fn({id_bolso: [cantidades]}) -> {id_bolso: [concedida]}` (ver
+app.database_async.reservar_stock_lote): si hay stock para todas, un solo
+UPDATE con la suma; si no, una a una en orden de llegada. El UPDATE es
+siempre condicional, así que agrupar nunca deja el stock en negativo.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+from app.metrics import Counter, REGISTRY
+
+reservas_total = REGISTRY.register(Counter(
+    "bolsos_stock_reservations_total",
+    "Reservas de stock por resultado (granted, rejected).",
+    ("result",),
+))
+
+
+def contar_reservas(concedidas: int, rechazadas: int = 0) -> None:
+    if concedidas:
+        reservas_total.inc("granted", amount=concedidas)
+    if rechazadas:
+        reservas_total.inc("rejected", amount=rechazadas)
+
+
+class ReservaBatcher:
+    """
+    Junta las reservas de la misma ventana (`window` segundos; 0 = misma
+    vuelta del event loop) en un lote de hasta `max_batch` reservas.
+    Con enabled=False cada reserva se aplica sola, sin esperar a nadie.
+    """
+
+    def __init__(
+        self,
+        lote_fn: Callable[[Dict[int, List[int]]], Awaitable[Dict[int, List[bool]]]],
+        enabled: bool = True,
+        window: float = 0.0,
+        max_batch: int = 100,
+    ):
+        self._lote_fn = lote_fn
+        self.enabled = enabled
+        self.window = window
+        self.max_batch = max_batch
+        self._pending: Dict[int, List[Tuple[int, asyncio.Future]]] = {}
+        self._pending_count = 0
+        self._handle: asyncio.Handle | None = None
+
+        # Contadores
+        self.requests = 0
+        self.batches = 0
+
+    async def reservar(self, bolso_id: int, cantidad: int) -> bool:
+        """Reserva `cantidad` unidades; False si no hay stock suficiente o no existe."""
+        self.requests += 1
+        if not self.enabled:
+            self.batches += 1
+            concedida = (await self._lote_fn({bolso_id: [cantidad]}))[bolso_id][0]
+            contar_reservas(int(concedida), int(not concedida))
+            return concedida
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.setdefault(bolso_id, []).append((cantidad, future))
+        self._pending_count += 1
+        if self._pending_count >= self.max_batch:
+            self._dispatch()
+        elif self._handle is None:
+            if self.window > 0:
+                self._handle = loop.call_later(self.window, self._dispatch)
+            else:
+                self._handle = loop.call_soon(self._dispatch)
+        # shield: si el cliente se desconecta, el lote se aplica igualmente
+        return await asyncio.shield(future)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "requests": self.requests,
+            "batches": self.batches,
+            "avg_batch_size": round(self.requests / self.batches, 2) if self.batches else 0.0,
+        }
+
+    def _dispatch(self) -> None:
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        lote, self._pending = self._pending, {}
+        self._pending_count = 0
+        if not lote:
+            return
+        self.batches += 1
+        asyncio.get_running_loop().create_task(self._run(lote))
+
+    async def _run(self, lote: Dict[int, List[Tuple[int, asyncio.Future]]]) -> None:
+        try:
+            resultado = await self._lote_fn({
+                bolso_id: [cantidad for cantidad, _ in pedidos] for bolso_id, pedidos in lote.items()
+            })
+        except BaseException as e:
+            for pedidos in lote.values():
+                for _, future in pedidos:
+                    if not future.done():
+                        future.set_exception(e)
+            if not isinstance(e, Exception):
+                raise
+            return
+
+        concedidas = rechazadas = 0
+        for bolso_id, pedidos in lote.items():
+            for (_, future), concedida in zip(pedidos, resultado[bolso_id]):
+                concedidas += concedida
+                rechazadas += not concedida
+                if not future.done():
+                    future.set_result(concedida)
+        contar_reservas(concedidas, rechazadas)
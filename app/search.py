@@ -0,0 +1,226 @@
+"""
+Índice invertido en memoria para la búsqueda de texto de GET /bolso/search.
+
+Indexa las palabras de `nombre` y `descripcion` de cada bolso:
+
+- Tokens sin acentos ni mayúsculas ("Piel Ñapa" -> "piel", "napa"), sin
+  las palabras vacías más comunes del español ("de", "con"...)
+- Cada término de la consulta encaja con los tokens que empiezan por él
+  ("moch" -> "mochila", "mochilas"); la coincidencia exacta puntúa más
+- Todos los términos deben aparecer (AND); el orden es por puntuación
+  (TF-IDF, con más peso en el nombre) y después por id_bolso
+- Filtros opcionales por categoria (sin distinguir mayúsculas) y activo
+
+SearchIndex no accede a la base de datos y las búsquedas solo recorren
+diccionarios y una lista ordenada de términos. CatalogSearch lo mantiene al
+día con el catálogo (ver app.views.CatalogView).
+"""
+import heapq
+import math
+import re
+import unicodedata
+from bisect import bisect_left, insort
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Tuple
+
+from app.views import CatalogView
+
+# Peso de un token según el campo en el que aparece
+PESO_NOMBRE = 3.0
+PESO_DESCRIPCION = 1.0
+# Factor de una coincidencia por prefijo frente a una exacta
+FACTOR_PREFIJO = 0.5
+# Longitud mínima de un término para buscarlo por prefijo
+MIN_PREFIJO = 2
+
+STOPWORDS = frozenset((
+    "a", "al", "con", "de", "del", "e", "el", "en", "la", "las", "lo", "los",
+    "o", "para", "por", "sin", "su", "sus", "u", "un", "una", "y",
+))
+
+_PALABRA = re.compile(r"[a-z0-9]+")
+
+
+def normalizar(texto: str) -> str:
+    """Minúsculas y sin acentos ni diéresis ("Ñandú" -> "nandu")."""
+    descompuesto = unicodedata.normalize("NFKD", texto.lower())
+    return "".join(c for c in descompuesto if not unicodedata.combining(c))
+
+
+def tokenizar(texto: str | None) -> List[str]:
+    """Palabras normalizadas de `texto`, sin palabras vacías."""
+    if not texto:
+        return []
+    return [t for t in _PALABRA.findall(normalizar(texto)) if t not in STOPWORDS]
+
+
+class SearchIndex:
+    """
+    Índice invertido token -> {id_bolso: peso}, con los datos de cada bolso
+    necesarios para filtrar (categoria, activo) y para poder quitarlo.
+    No es seguro entre hilos: se usa desde el event loop.
+    """
+
+    def __init__(self):
+        self._postings: Dict[str, Dict[int, float]] = {}
+        self._terminos: List[str] = []
+        self._docs: Dict[int, Tuple[str, bool, Tuple[str, ...]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def clear(self) -> None:
+        self._postings.clear()
+        self._terminos.clear()
+        self._docs.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"documents": len(self._docs), "terms": len(self._terminos)}
+
+    # ---- Mantenimiento ----
+
+    def add(self, row: Dict[str, Any]) -> None:
+        """Indexa (o reindexa) un bolso a partir de su fila."""
+        bolso_id = int(row["id_bolso"])
+        if bolso_id in self._docs:
+            self.remove(bolso_id)
+
+        pesos: Dict[str, float] = {}
+        for token in tokenizar(row.get("nombre")):
+            pesos[token] = pesos.get(token, 0.0) + PESO_NOMBRE
+        for token in tokenizar(row.get("descripcion")):
+            pesos[token] = pesos.get(token, 0.0) + PESO_DESCRIPCION
+
+        for token, peso in pesos.items():
+            posting = self._postings.get(token)
+            if posting is None:
+                posting = self._postings[token] = {}
+                insort(self._terminos, token)
+            # Saturación logarítmica: repetir una palabra no dispara la puntuación
+            posting[bolso_id] = 1.0 + math.log(peso)
+        self._docs[bolso_id] = (
+            str(row.get("categoria") or "").lower(),
+            bool(row.get("activo", True)),
+            tuple(pesos),
+        )
+
+    def add_many(self, rows: Iterable[Dict[str, Any]]) -> None:
+        for row in rows:
+            self.add(row)
+
+    def remove(self, bolso_id: int) -> None:
+        """Quita un bolso del índice (si estaba)."""
+        doc = self._docs.pop(bolso_id, None)
+        if doc is None:
+            return
+        for token in doc[2]:
+            posting = self._postings[token]
+            posting.pop(bolso_id, None)
+            if not posting:
+                del self._postings[token]
+                del self._terminos[bisect_left(self._terminos, token)]
+
+    # ---- Búsqueda ----
+
+    def _expandir(self, termino: str) -> List[str]:
+        """Tokens del índice que encajan con `termino` (él mismo y sus prefijados)."""
+        if len(termino) < MIN_PREFIJO:
+            return [termino] if termino in self._postings else []
+        encontrados: List[str] = []
+        for i in range(bisect_left(self._terminos, termino), len(self._terminos)):
+            if not self._terminos[i].startswith(termino):
+                break
+            encontrados.append(self._terminos[i])
+        return encontrados
+
+    def search(
+        self,
+        q: str,
+        categoria: str | None = None,
+        activo: bool | None = None,
+        limit: int = 20,
+    ) -> Tuple[List[int], int]:
+        """
+        Busca `q` y devuelve (IDs de los `limit` mejores resultados, total de
+        resultados). Sin términos válidos en `q` no devuelve nada.
+        """
+        terminos = list(dict.fromkeys(tokenizar(q)))
+        if not terminos or not self._docs:
+            return [], 0
+
+        total_docs = len(self._docs)
+        exactos = set(terminos)
+        # Los términos con menos candidatos primero: la intersección se reduce antes
+        expansiones = sorted(
+            (self._expandir(t) for t in terminos),
+            key=lambda tokens: sum(len(self._postings[tok]) for tok in tokens),
+        )
+        puntos: Dict[int, float] | None = None
+        for tokens in expansiones:
+            # Puntuación del término en cada bolso: la de su mejor token
+            del_termino: Dict[int, float] = {}
+            for token in tokens:
+                posting = self._postings[token]
+                idf = math.log(1.0 + total_docs / len(posting))
+                factor = idf if token in exactos else idf * FACTOR_PREFIJO
+                if puntos is None and len(tokens) == 1:
+                    del_termino = {i: peso * factor for i, peso in posting.items()}
+                    continue
+                if puntos is None:
+                    candidatos = posting.items()
+                else:
+                    # Solo los bolsos que encajan con los términos anteriores
+                    candidatos = ((i, posting[i]) for i in puntos if i in posting)
+                for bolso_id, peso in candidatos:
+                    valor = peso * factor
+                    if valor > del_termino.get(bolso_id, 0.0):
+                        del_termino[bolso_id] = valor
+            if puntos is None:
+                puntos = del_termino
+            else:
+                puntos = {i: puntos[i] + v for i, v in del_termino.items()}
+            if not puntos:
+                return [], 0
+
+        assert puntos is not None
+        if categoria is not None or activo is not None:
+            categoria = categoria.lower() if categoria is not None else None
+            puntos = {
+                i: p for i, p in puntos.items()
+                if (categoria is None or self._docs[i][0] == categoria)
+                and (activo is None or self._docs[i][1] == activo)
+            }
+            if not puntos:
+                return [], 0
+
+        # Los `limit` mejores sin ordenar todos: la puntuación de corte sale
+        # de los valores y solo se ordenan (puntuación, ID) los que la superan
+        corte = heapq.nlargest(limit, puntos.values())[-1]
+        mejores = sorted((-p, i) for i, p in puntos.items() if p >= corte)[:limit]
+        return [bolso_id for _, bolso_id in mejores], len(puntos)
+
+
+class CatalogSearch(CatalogView[SearchIndex]):
+    """
+    SearchIndex sincronizado con la tabla bolso (ver CatalogView): se
+    construye entero una vez y después solo se reindexan los bolsos que
+    cambian. Una búsqueda nunca recorre la tabla.
+    """
+
+    def __init__(
+        self,
+        cargar_todo: Callable[[], AsyncIterator[List[Dict[str, Any]]]],
+        cargar_ids: Callable[[List[int]], Awaitable[List[Dict[str, Any]]]],
+        max_age: float = 0,
+    ):
+        super().__init__(SearchIndex, cargar_todo, cargar_ids, max_age)
+
+    @property
+    def index(self) -> SearchIndex:
+        return self.state
+
+    async def search(self, q: str, **filtros: Any) -> Tuple[List[int], int]:
+        await self.ensure_ready()
+        return self.state.search(q, **filtros)
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.state.stats(), **super().stats()}
@@ -0,0 +1,158 @@
+"""
+Serialización rápida de bolsos a JSON para los endpoints de lectura.
+
+Las filas vienen de nuestra propia tabla (ya validadas al escribirlas), así
+que no se construye un modelo Pydantic por fila ni se vuelven a ejecutar los
+validadores de BolsoBase: cada fila se convierte en un dict con los campos
+de Bolso (en el mismo orden) y la lista completa se serializa de una vez con
+un TypeAdapter compilado (serializador en Rust de pydantic-core).
+
+Los endpoints siguen declarando response_model=Bolso / List[Bolso], así que
+el esquema OpenAPI no cambia; devuelven directamente un Response con estos
+bytes y FastAPI no repite la validación.
+
+Con `fields=` (parse_fields) solo se envían los campos pedidos: las filas
+traen solo esas columnas (más las de la clave del cursor) y se serializan
+con partial_rows_to_json / partial_row_to_json.
+"""
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from pydantic import TypeAdapter
+from typing_extensions import TypedDict
+
+# Orden de las columnas de app.database.SQL_SELECT_BOLSOS (cursor de tuplas)
+COLUMNAS_BOLSO = (
+    "id_bolso",
+    "nombre",
+    "descripcion",
+    "precio",
+    "stock",
+    "categoria",
+    "codigo_sku",
+    "activo",
+)
+
+
+class BolsoJSON(TypedDict):
+    """Bolso tal como se envía al cliente (mismo orden de campos que el modelo Bolso)."""
+    nombre: str
+    descripcion: Optional[str]
+    precio: float
+    stock: int
+    categoria: str
+    codigo_sku: str
+    activo: bool
+    id_bolso: int
+
+
+_bolsos_adapter = TypeAdapter(List[BolsoJSON])
+_bolso_adapter = TypeAdapter(BolsoJSON)
+_parciales_adapter = TypeAdapter(List[Dict[str, Any]])
+_parcial_adapter = TypeAdapter(Dict[str, Any])
+
+# Campos de salida en el orden de Bolso (el de BolsoJSON)
+CAMPOS_BOLSO: Tuple[str, ...] = tuple(BolsoJSON.__annotations__)
+
+# Conversión de los tipos de columna a los de salida (el resto se envía tal cual)
+_CONVERSIONES: Dict[str, Callable[[Any], Any]] = {"precio": float, "activo": bool}
+
+
+def _desde_tupla(row: Sequence[Any]) -> BolsoJSON:
+    """Fila (tupla en el orden de COLUMNAS_BOLSO) -> dict de salida (Decimal -> float, 0/1 -> bool)."""
+    id_bolso, nombre, descripcion, precio, stock, categoria, codigo_sku, activo = row
+    return {
+        "nombre": nombre,
+        "descripcion": descripcion,
+        "precio": float(precio),
+        "stock": stock,
+        "categoria": categoria,
+        "codigo_sku": codigo_sku,
+        "activo": bool(activo),
+        "id_bolso": id_bolso,
+    }
+
+
+def _desde_dict(row: Mapping[str, Any]) -> BolsoJSON:
+    """Fila de un cursor dictionary=True (o de la caché) -> dict de salida."""
+    return {
+        "nombre": row["nombre"],
+        "descripcion": row["descripcion"],
+        "precio": float(row["precio"]),
+        "stock": row["stock"],
+        "categoria": row["categoria"],
+        "codigo_sku": row["codigo_sku"],
+        "activo": bool(row["activo"]),
+        "id_bolso": row["id_bolso"],
+    }
+
+
+def rows_to_json(rows: Iterable[Sequence[Any]]) -> bytes:
+    """Array JSON de bolsos a partir de filas en tupla (cursor sin dictionary)."""
+    return _bolsos_adapter.dump_json([_desde_tupla(row) for row in rows])
+
+
+def dict_rows_to_json(rows: Iterable[Mapping[str, Any]]) -> bytes:
+    """Array JSON de bolsos a partir de filas en dict."""
+    return _bolsos_adapter.dump_json([_desde_dict(row) for row in rows])
+
+
+def row_to_json(row: Mapping[str, Any]) -> bytes:
+    """Un bolso (fila en dict) como objeto JSON."""
+    return _bolso_adapter.dump_json(_desde_dict(row))
+
+
+def rows_to_ndjson(rows: Iterable[Sequence[Any]]) -> bytes:
+    """Un bolso JSON por línea a partir de filas en tupla (GET /bolso/export)."""
+    return b"".join(_bolso_adapter.dump_json(_desde_tupla(row)) + b"\n" for row in rows)
+
+
+def cursor_row(row: Sequence[Any], columnas: Sequence[str] | None = None) -> Dict[str, Any]:
+    """Fila en tupla (con esas `columnas`, por defecto todas) -> dict por nombre de columna (para encode_cursor)."""
+    return dict(zip(columnas or COLUMNAS_BOLSO, row))
+
+
+def parse_fields(fields: str) -> Tuple[str, ...]:
+    """
+    Campos de `fields=` ("id_bolso,nombre,precio") validados contra los de
+    Bolso, sin repetir y en el orden de salida. ValueError si alguno no existe.
+    """
+    pedidos = {f.strip() for f in fields.split(",") if f.strip()}
+    desconocidos = sorted(pedidos - set(CAMPOS_BOLSO))
+    if desconocidos:
+        raise ValueError(
+            f"Campos no válidos en fields: {', '.join(desconocidos)} "
+            f"(disponibles: {', '.join(COLUMNAS_BOLSO)})"
+        )
+    if not pedidos:
+        raise ValueError("fields no puede estar vacío")
+    return tuple(c for c in CAMPOS_BOLSO if c in pedidos)
+
+
+def columnas_select(campos: Sequence[str], extra: Sequence[str] = ()) -> Tuple[str, ...]:
+    """Columnas del SELECT para esos campos (más `extra`, p. ej. la clave del cursor)."""
+    return tuple(c for c in COLUMNAS_BOLSO if c in campos or c in extra)
+
+
+def partial_rows_to_json(rows: Iterable[Sequence[Any]], columnas: Sequence[str], campos: Sequence[str]) -> bytes:
+    """Array JSON con solo `campos` a partir de filas en tupla con esas `columnas`."""
+    posiciones = [(campo, columnas.index(campo), _CONVERSIONES.get(campo)) for campo in campos]
+    return _parciales_adapter.dump_json([
+        {campo: row[i] if conv is None else conv(row[i]) for campo, i, conv in posiciones}
+        for row in rows
+    ])
+
+
+def partial_row_to_json(row: Mapping[str, Any], campos: Sequence[str]) -> bytes:
+    """Un bolso (fila en dict) como objeto JSON con solo `campos`."""
+    return _parcial_adapter.dump_json({
+        campo: _CONVERSIONES[campo](row[campo]) if campo in _CONVERSIONES else row[campo]
+        for campo in campos
+    })
+
+
+def partial_dict_rows_to_json(rows: Iterable[Mapping[str, Any]], campos: Sequence[str]) -> bytes:
+    """Array JSON con solo `campos` a partir de filas en dict."""
+    return _parciales_adapter.dump_json([
+        {campo: _CONVERSIONES[campo](row[campo]) if campo in _CONVERSIONES else row[campo] for campo in campos}
+        for row in rows
+    ])
@@ -0,0 +1,126 @@
+import asyncio
+import gzip
+import hashlib
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+from fastapi import Request, Response
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    """Una versión del catálogo ya serializada (JSON y JSON+gzip)."""
+    version: int
+    body: bytes
+    body_gzip: bytes
+    etag: str
+    built_at: float
+
+
+class CatalogSnapshot:
+    """
+    Respuesta precalculada de GET /bolso (catálogo completo).
+
+    El cuerpo JSON y su versión gzip se generan una vez y se sirven tal cual
+    hasta que invalidate() marca una nueva versión (tras una escritura). Si
+    se pasa `max_age`, también se regenera pasado ese tiempo, para recoger
+    cambios hechos fuera de la API (scripts, consola de MySQL...).
+    """
+
+    def __init__(self, builder: Callable[[], Awaitable[bytes]], max_age: float = 0):
+        self._builder = builder
+        self.max_age = max_age
+        self._version = 0
+        self._current: Snapshot | None = None
+        self._lock = asyncio.Lock()
+        self.builds = 0
+
+    def invalidate(self) -> None:
+        """Marca el snapshot actual como obsoleto; se regenera en la siguiente petición."""
+        self._version += 1
+
+    def _is_fresh(self, snap: Snapshot | None) -> bool:
+        if snap is None or snap.version != self._version:
+            return False
+        return not self.max_age or time.monotonic() - snap.built_at < self.max_age
+
+    async def get(self) -> Snapshot:
+        """Devuelve el snapshot vigente, regenerándolo (una sola vez) si hace falta."""
+        snap = self._current
+        if self._is_fresh(snap):
+            return snap  # type: ignore[return-value]
+
+        # Solo una corrutina reconstruye; las demás esperan y reutilizan el resultado
+        async with self._lock:
+            snap = self._current
+            if self._is_fresh(snap):
+                return snap  # type: ignore[return-value]
+
+            version = self._version
+            body = await self._builder()
+            digest = hashlib.blake2b(body, digest_size=16).hexdigest()
+            snap = Snapshot(
+                version=version,
+                body=body,
+                body_gzip=gzip.compress(body, compresslevel=6),
+                etag=digest,
+                built_at=time.monotonic(),
+            )
+            # Si hubo una escritura durante la reconstrucción, snap.version
+            # ya no coincide y la siguiente petición vuelve a reconstruir
+            self._current = snap
+            self.builds += 1
+            return snap
+
+    async def respond(self, request: Request) -> Response:
+        """
+        Sirve el snapshot con ETag fuerte y GET condicional:
+        - If-None-Match coincidente -> 304 sin cuerpo
+        - Accept-Encoding: gzip -> cuerpo comprimido precalculado
+        """
+        snap = await self.get()
+        use_gzip = _accepts_gzip(request.headers.get("accept-encoding", ""))
+        # Cada codificación es una representación distinta: ETag distinto
+        etag = f'"{snap.etag}-gzip"' if use_gzip else f'"{snap.etag}"'
+        headers = {
+            "ETag": etag,
+            "Cache-Control": "no-cache",
+            "Vary": "Accept-Encoding",
+        }
+
+        if _etag_matches(request.headers.get("if-none-match"), snap.etag):
+            return Response(status_code=304, headers=headers)
+
+        if use_gzip:
+            headers["Content-Encoding"] = "gzip"
+            return Response(snap.body_gzip, media_type="application/json", headers=headers)
+        return Response(snap.body, media_type="application/json", headers=headers)
+
+
+def _accepts_gzip(accept_encoding: str) -> bool:
+    """True si Accept-Encoding admite gzip (y no con q=0)."""
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        if coding.strip().lower() in ("gzip", "*"):
+            q = params.strip().replace(" ", "")
+            return q not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
+
+
+def _etag_matches(if_none_match: str | None, digest: str) -> bool:
+    """
+    Comparación débil de If-None-Match (RFC 9110): acepta W/"..." y
+    cualquiera de las dos variantes (identity o gzip) del mismo contenido.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag.strip('"') in (digest, f"{digest}-gzip"):
+            return True
+    return False
@@ -0,0 +1,210 @@
+"""
+Agregados del catálogo por categoría para GET /bolso/stats: número de
+bolsos, activos, stock total y precio mínimo, medio y máximo.
+
+CatalogAggregates guarda la aportación de cada bolso, así una escritura se
+aplica como un delta (se resta la fila anterior y se suma la nueva) sin
+recorrer el catálogo. Los precios de cada categoría se guardan en una lista
+ordenada para que el mínimo y el máximo sigan siendo correctos tras un
+borrado. CatalogStats lo mantiene al día con las escrituras (ver
+app.views.CatalogView) y lo contrasta periódicamente con un GROUP BY en SQL.
+"""
+import asyncio
+import logging
+from bisect import bisect_left, insort
+from decimal import Decimal
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Tuple
+
+from app.views import CatalogView
+
+logger = logging.getLogger("bolsos.stats")
+
+_CENTIMOS = Decimal("0.01")
+
+
+def _decimal(valor: Any) -> Decimal:
+    """Precio como DECIMAL(10,2) (SQLite devuelve float)."""
+    return Decimal(str(valor)).quantize(_CENTIMOS)
+
+
+class _Grupo:
+    __slots__ = ("nombre", "bolsos", "activos", "stock", "precio_sum", "precios")
+
+    def __init__(self, nombre: str = ""):
+        # Categoría tal como se escribió en el primer bolso del grupo
+        self.nombre = nombre
+        self.bolsos = 0
+        self.activos = 0
+        self.stock = 0
+        self.precio_sum = Decimal(0)
+        self.precios: List[Decimal] = []
+
+    def sumar(self, precio: Decimal, stock: int, activo: bool, signo: int) -> None:
+        self.bolsos += signo
+        self.activos += signo if activo else 0
+        self.stock += signo * stock
+        self.precio_sum += signo * precio
+        if signo > 0:
+            insort(self.precios, precio)
+        else:
+            del self.precios[bisect_left(self.precios, precio)]
+
+    def resumen(self) -> Dict[str, Any]:
+        return {
+            "bolsos": self.bolsos,
+            "activos": self.activos,
+            "stock": self.stock,
+            "precio_min": float(self.precios[0]) if self.precios else None,
+            "precio_avg": float((self.precio_sum / self.bolsos).quantize(_CENTIMOS)) if self.bolsos else None,
+            "precio_max": float(self.precios[-1]) if self.precios else None,
+        }
+
+
+class CatalogAggregates:
+    """
+    Agregados por categoría (sin distinguir mayúsculas, como la collation de
+    MySQL) y del total. Cada categoría se devuelve con el nombre del primer
+    bolso visto, como MemoryBackend.aggregate.
+    """
+
+    def __init__(self):
+        # id_bolso -> (clave en minúsculas, categoría, precio, stock, activo)
+        self._filas: Dict[int, Tuple[str, str, Decimal, int, bool]] = {}
+        self._grupos: Dict[str, _Grupo] = {}
+        self._total = _Grupo()
+
+    def __len__(self) -> int:
+        return len(self._filas)
+
+    def _aplicar(self, fila: Tuple[str, str, Decimal, int, bool], signo: int) -> None:
+        categoria, nombre, precio, stock, activo = fila
+        grupo = self._grupos.get(categoria)
+        if grupo is None:
+            grupo = self._grupos[categoria] = _Grupo(nombre)
+        grupo.sumar(precio, stock, activo, signo)
+        self._total.sumar(precio, stock, activo, signo)
+        if not grupo.bolsos:
+            del self._grupos[categoria]
+
+    def add(self, row: Dict[str, Any]) -> None:
+        """Suma (o sustituye) la aportación de un bolso."""
+        self.remove(int(row["id_bolso"]))
+        fila = (
+            str(row["categoria"]).lower(),
+            str(row["categoria"]),
+            _decimal(row["precio"]),
+            int(row["stock"]),
+            bool(row.get("activo", True)),
+        )
+        self._filas[int(row["id_bolso"])] = fila
+        self._aplicar(fila, 1)
+
+    def remove(self, bolso_id: int) -> None:
+        """Resta la aportación de un bolso (si estaba)."""
+        fila = self._filas.pop(bolso_id, None)
+        if fila is not None:
+            self._aplicar(fila, -1)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "total": self._total.resumen(),
+            "categorias": [
+                {"categoria": self._grupos[categoria].nombre, **self._grupos[categoria].resumen()}
+                for categoria in sorted(self._grupos)
+            ],
+        }
+
+    def diferencias(self, rows: List[Dict[str, Any]]) -> List[str]:
+        """
+        Compara con el resultado de SQL_AGGREGATE_BOLSOS y describe cada
+        diferencia ("mochila.stock: 12 != 10"); lista vacía si coinciden.
+        """
+        esperado: Dict[str, Dict[str, Any]] = {}
+        for row in rows:
+            esperado[str(row["categoria"]).lower()] = {
+                "bolsos": int(row["bolsos"]),
+                "activos": int(row["activos"] or 0),
+                "stock": int(row["stock"] or 0),
+                "precio_sum": _decimal(row["precio_sum"] or 0),
+                "precio_min": _decimal(row["precio_min"]),
+                "precio_max": _decimal(row["precio_max"]),
+            }
+
+        diferencias: List[str] = []
+        for categoria in sorted(set(esperado) | set(self._grupos)):
+            grupo = self._grupos.get(categoria)
+            actual = {
+                "bolsos": grupo.bolsos,
+                "activos": grupo.activos,
+                "stock": grupo.stock,
+                "precio_sum": grupo.precio_sum,
+                "precio_min": grupo.precios[0],
+                "precio_max": grupo.precios[-1],
+            } if grupo else {}
+            for campo, valor in esperado.get(categoria, {}).items():
+                if actual.get(campo) != valor:
+                    diferencias.append(f"{categoria}.{campo}: {actual.get(campo)} != {valor}")
+            if grupo and categoria not in esperado:
+                diferencias.append(f"{categoria}: {grupo.bolsos} bolsos que no están en la tabla")
+        return diferencias
+
+
+class CatalogStats(CatalogView[CatalogAggregates]):
+    """
+    CatalogAggregates sincronizado con la tabla bolso. `cargar_sql()`
+    devuelve los agregados calculados en SQL para reconcile().
+    """
+
+    def __init__(
+        self,
+        cargar_todo: Callable[[], AsyncIterator[List[Dict[str, Any]]]],
+        cargar_ids: Callable[[List[int]], Awaitable[List[Dict[str, Any]]]],
+        cargar_sql: Callable[[], Awaitable[List[Dict[str, Any]]]],
+    ):
+        super().__init__(CatalogAggregates, cargar_todo, cargar_ids)
+        self._cargar_sql = cargar_sql
+        self.reconciles = 0
+        self.drifts = 0
+
+    async def get(self) -> Dict[str, Any]:
+        await self.ensure_ready()
+        return self.state.snapshot()
+
+    async def reconcile(self) -> bool | None:
+        """
+        Contrasta los agregados con el GROUP BY en SQL. Si no coinciden
+        (cambios hechos fuera de la API, una notificación perdida...) lo
+        registra y los reconstruye. Retorna True si coincidían, False si se
+        han corregido y None si hubo escrituras durante la comprobación (se
+        deja para la siguiente).
+        """
+        await self.ensure_ready()
+        escrituras = self.writes
+        rows = await self._cargar_sql()
+        if self.writes != escrituras or self._pendientes:
+            return None
+
+        self.reconciles += 1
+        diferencias = self.state.diferencias(rows)
+        if not diferencias:
+            return True
+
+        self.drifts += 1
+        logger.warning("Agregados del catálogo desincronizados; se reconstruyen",
+                       extra={"diferencias": diferencias[:20]})
+        self.invalidate()
+        await self.ensure_ready()
+        return False
+
+    async def run_reconcile(self, interval: float) -> None:
+        """Bucle de reconcile() cada `interval` segundos (tarea en segundo plano)."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.reconcile()
+            except Exception as e:
+                logger.warning("Error al contrastar los agregados del catálogo", extra={"error": str(e)})
+
+    def stats(self) -> Dict[str, Any]:
+        return {"bolsos": len(self.state), **super().stats(),
+                "reconciles": self.reconciles, "drifts": self.drifts}
@@ -0,0 +1,304 @@
+"""
+Feed de cambios del catálogo para GET /bolso/stream (Server-Sent Events).
+
+CatalogFeed reparte los cambios confirmados a todos los suscriptores desde
+el propio proceso: una sola tarea lee los cambios nuevos (las versiones de
+GET /bolso/changes, ver app.database_async.fetch_change_log) y cada evento
+se serializa una vez y se encola a cada suscriptor, así el coste en la base
+de datos no depende del número de suscriptores. El id de cada evento es la
+versión del cambio: Last-Event-ID sirve para reanudar tras una reconexión,
+un reinicio o en otro worker.
+
+- on_write() (listener de escrituras) despierta la tarea en cuanto una
+  escritura hace COMMIT; además se consulta cada `poll_interval` segundos
+  para recoger las escrituras de otros workers o hechas fuera de la API.
+  Sin suscriptores no se consulta nada
+- Cada suscriptor tiene una cola de `queue_size` eventos: si se llena (el
+  cliente no lee), se le desconecta en lugar de retener memoria; al
+  reconectar con Last-Event-ID recupera lo que le falta
+- Los últimos `buffer_size` eventos se guardan para reanudar sin ir a la
+  base de datos; si Last-Event-ID es anterior se leen de la base de datos.
+  En los dos casos, si faltan más de `queue_size`, se envía un evento reset
+  para que el cliente se ponga al día con GET /bolso/changes?since=<since del evento>
+"""
+import asyncio
+import logging
+import weakref
+from collections import deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, List, Set, Tuple
+
+from app.metrics import Counter, Gauge, REGISTRY
+from app.serialization import rows_to_json
+
+logger = logging.getLogger("bolsos.stream")
+
+stream_subscribers = REGISTRY.register(Gauge(
+    "bolsos_stream_subscribers",
+    "Suscriptores conectados a GET /bolso/stream.",
+))
+stream_events_total = REGISTRY.register(Counter(
+    "bolsos_stream_events_total",
+    "Eventos publicados en GET /bolso/stream por tipo (upsert, delete).",
+    ("event",),
+))
+stream_evictions_total = REGISTRY.register(Counter(
+    "bolsos_stream_evictions_total",
+    "Suscriptores de GET /bolso/stream desconectados por no leer a tiempo.",
+))
+
+# (version, borrado, fila en tupla o id_bolso si borrado), como fetch_change_log
+Cambio = Tuple[int, bool, Any]
+
+
+def _evento(version: int, borrado: bool, valor: Any) -> bytes:
+    """Evento SSE de un cambio: upsert con el bolso o delete con su ID."""
+    if borrado:
+        return b'id: %d\nevent: delete\ndata: {"id_bolso":%d}\n\n' % (version, valor)
+    return b"id: %d\nevent: upsert\ndata: %s\n\n" % (version, rows_to_json([valor])[1:-1])
+
+
+def _reset(since: int) -> bytes:
+    """El cliente debe ponerse al día con GET /bolso/changes?since=<since>."""
+    return b'event: reset\ndata: {"since":"%d"}\n\n' % since
+
+
+class _Suscriptor:
+    __slots__ = ("eventos", "aviso", "expulsado", "max_eventos")
+
+    def __init__(self, max_eventos: int):
+        self.eventos: Deque[bytes] = deque()
+        self.aviso = asyncio.Event()
+        self.expulsado = False
+        self.max_eventos = max_eventos
+
+    def enviar(self, evento: bytes) -> bool:
+        """Encola un evento; False (y queda expulsado) si la cola está llena."""
+        if len(self.eventos) >= self.max_eventos:
+            self.expulsado = True
+            self.eventos.clear()
+        else:
+            self.eventos.append(evento)
+        self.aviso.set()
+        return not self.expulsado
+
+
+class CatalogFeed:
+    """
+    - `cargar_cambios(since, limit)`: ([Cambio], hay_mas) en orden de versión
+    - `cargar_version()`: versión del último cambio confirmado
+    """
+
+    def __init__(
+        self,
+        cargar_cambios: Callable[[int, int], Awaitable[Tuple[List[Cambio], bool]]],
+        cargar_version: Callable[[], Awaitable[int]],
+        max_subscribers: int = 10000,
+        queue_size: int = 256,
+        buffer_size: int = 1000,
+        poll_interval: float = 1.0,
+        heartbeat: float = 15.0,
+        batch: int = 500,
+    ):
+        self._cargar_cambios = cargar_cambios
+        self._cargar_version = cargar_version
+        self.max_subscribers = max_subscribers
+        self.queue_size = queue_size
+        self.buffer_size = buffer_size
+        self.poll_interval = poll_interval
+        self.heartbeat = heartbeat
+        self.batch = batch
+
+        # Última versión publicada; el buffer tiene todos los cambios
+        # posteriores a _buffer_desde (solo vale con _al_dia)
+        self.version = 0
+        self._al_dia = False
+        self._buffer: Deque[Tuple[int, bytes]] = deque()
+        self._buffer_desde = 0
+        self._suscriptores: Set[_Suscriptor] = set()
+        # Huecos reservados por suscribir() cuyo cuerpo aún no ha empezado
+        self._reservados: Set[_Suscriptor] = set()
+        self._lock = asyncio.Lock()
+        self._despertar = asyncio.Event()
+        self._tarea: asyncio.Task | None = None
+
+        # Contadores
+        self.polls = 0
+        self.events = 0
+        self.evictions = 0
+
+    def on_write(self, accion: str, bolso_id: int) -> None:
+        self._despertar.set()
+
+    def lleno(self) -> bool:
+        return len(self._suscriptores) + len(self._reservados) >= self.max_subscribers
+
+    def start(self) -> None:
+        if self._tarea is None:
+            self._tarea = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._tarea is not None:
+            self._tarea.cancel()
+            try:
+                await self._tarea
+            except asyncio.CancelledError:
+                pass
+            self._tarea = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._despertar.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._despertar.clear()
+            if not self._suscriptores:
+                # Sin nadie escuchando no se lee nada; al volver a haber
+                # suscriptores se parte de la versión de ese momento
+                self._al_dia = False
+                continue
+            try:
+                await self.sincronizar()
+            except Exception as e:
+                logger.warning("Error al leer los cambios del catálogo", extra={"error": str(e)})
+
+    async def _poner_al_dia(self) -> None:
+        if not self._al_dia:
+            self.version = await self._cargar_version()
+            self._buffer.clear()
+            self._buffer_desde = self.version
+            self._al_dia = True
+
+    async def sincronizar(self) -> None:
+        """Publica los cambios posteriores a la última versión publicada."""
+        async with self._lock:
+            if not self._al_dia:
+                await self._poner_al_dia()
+                return
+            self.polls += 1
+            # Una ráfaga grande (p. ej. un upsert masivo) se reparte en tramos
+            # de media cola, cediendo el event loop entre tramos para que los
+            # suscriptores que leen a tiempo vacíen la suya y no se expulsen
+            paso = max(1, self.queue_size // 2)
+            while True:
+                cambios, hay_mas = await self._cargar_cambios(self.version, self.batch)
+                for i, cambio in enumerate(cambios, 1):
+                    self._publicar(cambio)
+                    if i % paso == 0:
+                        await asyncio.sleep(0)
+                if not hay_mas:
+                    break
+
+    def _publicar(self, cambio: Cambio) -> None:
+        version, borrado = cambio[0], cambio[1]
+        evento = _evento(*cambio)
+        self.version = version
+        self._buffer.append((version, evento))
+        if len(self._buffer) > self.buffer_size:
+            self._buffer_desde = self._buffer.popleft()[0]
+        self.events += 1
+        stream_events_total.inc("delete" if borrado else "upsert")
+
+        for suscriptor in list(self._suscriptores):
+            if not suscriptor.enviar(evento):
+                self._suscriptores.discard(suscriptor)
+                self.evictions += 1
+                stream_evictions_total.inc()
+
+    async def _reanudar(self, suscriptor: _Suscriptor, last_event_id: str) -> None:
+        """Encola lo publicado después de `last_event_id` (o un reset)."""
+        try:
+            desde = int(last_event_id)
+        except ValueError:
+            desde = -1
+        if desde < 0:
+            # No es una versión de este catálogo: descarga completa
+            suscriptor.eventos.append(_reset(0))
+            return
+        if desde > self.version:
+            # Versión aún no publicada aquí (p. ej. la vio en otro worker más
+            # adelantado): se pone al día desde la nuestra, no desde cero
+            suscriptor.eventos.append(_reset(self.version))
+            return
+        if desde >= self._buffer_desde:
+            pendientes = [evento for version, evento in self._buffer if version > desde]
+            if len(pendientes) > self.queue_size:
+                # No caben en la cola: se le expulsaría con el siguiente evento
+                suscriptor.eventos.append(_reset(desde))
+            else:
+                suscriptor.eventos.extend(pendientes)
+            return
+
+        cambios, hay_mas = await self._cargar_cambios(desde, self.queue_size)
+        if hay_mas and cambios[-1][0] < self.version:
+            suscriptor.eventos.append(_reset(desde))
+            return
+        # Los posteriores a self.version aún no se han publicado: llegarán en vivo
+        suscriptor.eventos.extend(_evento(*cambio) for cambio in cambios if cambio[0] <= self.version)
+
+    def suscribir(self, last_event_id: str | None = None) -> AsyncIterator[bytes] | None:
+        """
+        Reserva el hueco de un suscriptor y devuelve el cuerpo de su respuesta
+        text/event-stream (None si ya hay `max_subscribers`). El hueco se
+        toma aquí y no al empezar el cuerpo: si no, varias peticiones a la
+        vez pasarían el límite.
+        """
+        if self.lleno():
+            return None
+        suscriptor = _Suscriptor(self.queue_size)
+        self._reservados.add(suscriptor)
+        cuerpo = self._stream(suscriptor, last_event_id)
+        # Si el cliente se va antes de empezar la respuesta, el generador no
+        # llega a ejecutar su finally: el hueco se libera al recogerlo
+        weakref.finalize(cuerpo, self._reservados.discard, suscriptor)
+        return cuerpo
+
+    async def _stream(self, suscriptor: _Suscriptor, last_event_id: str | None) -> AsyncIterator[bytes]:
+        stream_subscribers.inc()
+        try:
+            async with self._lock:
+                await self._poner_al_dia()
+                if last_event_id is not None:
+                    await self._reanudar(suscriptor, last_event_id)
+                self._reservados.discard(suscriptor)
+                self._suscriptores.add(suscriptor)
+            self.start()
+
+            # Un comentario para que el cliente reciba las cabeceras ya
+            yield b": ok\n\n"
+            loop = asyncio.get_running_loop()
+            while True:
+                if not suscriptor.eventos and not suscriptor.expulsado:
+                    # El latido despierta con el mismo Event (sin wait_for, que
+                    # crea una tarea por espera y tarda más en despertar)
+                    latido = loop.call_later(self.heartbeat, suscriptor.aviso.set)
+                    await suscriptor.aviso.wait()
+                    latido.cancel()
+                    if not suscriptor.eventos and not suscriptor.expulsado:
+                        # Mantiene viva la conexión en los proxies y detecta
+                        # los clientes que se han ido
+                        suscriptor.aviso.clear()
+                        yield b": ping\n\n"
+                        continue
+                suscriptor.aviso.clear()
+                if suscriptor.expulsado:
+                    return
+                bloque = b"".join(suscriptor.eventos)
+                suscriptor.eventos.clear()
+                if bloque:
+                    yield bloque
+        finally:
+            self._reservados.discard(suscriptor)
+            self._suscriptores.discard(suscriptor)
+            stream_subscribers.dec()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "subscribers": len(self._suscriptores),
+            "reserved": len(self._reservados),
+            "version": self.version,
+            "buffer": len(self._buffer),
+            "polls": self.polls,
+            "events": self.events,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,108 @@
+"""
+Vistas derivadas del catálogo que se mantienen en memoria (índice de
+búsqueda, agregados por categoría...) y se actualizan de forma incremental
+con las escrituras confirmadas, sin volver a leer la tabla completa.
+"""
+import asyncio
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Generic, List, Protocol, Set, TypeVar
+
+
+class Estado(Protocol):
+    """Lo que necesita CatalogView del estado que mantiene."""
+
+    def add(self, row: Dict[str, Any]) -> None: ...
+
+    def remove(self, bolso_id: int) -> None: ...
+
+
+E = TypeVar("E", bound=Estado)
+
+
+class CatalogView(Generic[E]):
+    """
+    Mantiene un estado derivado de la tabla bolso (`crear()` lo crea vacío).
+
+    - `cargar_todo()`: recorre el catálogo en bloques de filas (construcción
+      completa, la primera vez y cada `max_age` segundos si se indica)
+    - `cargar_ids(ids)`: filas de esos IDs (las que existan)
+
+    on_write() se registra como listener de escrituras: el bolso se quita
+    del estado si se borra y queda pendiente; antes de la siguiente consulta
+    (ensure_ready) los pendientes se releen con una sola consulta por clave
+    primaria y se vuelven a añadir. La construcción completa crea un estado
+    nuevo y lo sustituye al terminar, así las consultas no ven uno a medias.
+    """
+
+    def __init__(
+        self,
+        crear: Callable[[], E],
+        cargar_todo: Callable[[], AsyncIterator[List[Dict[str, Any]]]],
+        cargar_ids: Callable[[List[int]], Awaitable[List[Dict[str, Any]]]],
+        max_age: float = 0,
+    ):
+        self._crear = crear
+        self._cargar_todo = cargar_todo
+        self._cargar_ids = cargar_ids
+        self.max_age = max_age
+        self.state: E = crear()
+        self._pendientes: Set[int] = set()
+        self._built_at: float | None = None
+        self._lock = asyncio.Lock()
+        self.builds = 0
+        self.refreshes = 0
+        self.writes = 0
+
+    def on_write(self, accion: str, bolso_id: int) -> None:
+        self.writes += 1
+        if accion == "delete":
+            self.state.remove(bolso_id)
+        self._pendientes.add(bolso_id)
+
+    def invalidate(self) -> None:
+        """Fuerza una construcción completa antes de la siguiente consulta."""
+        self._built_at = None
+
+    def _obsoleto(self) -> bool:
+        if self._built_at is None:
+            return True
+        return bool(self.max_age) and time.monotonic() - self._built_at >= self.max_age
+
+    async def rebuild(self) -> None:
+        """Construye un estado nuevo con todo el catálogo y lo sustituye."""
+        nuevo = self._crear()
+        async for rows in self._cargar_todo():
+            for row in rows:
+                nuevo.add(row)
+        self.state = nuevo
+        self._built_at = time.monotonic()
+        self.builds += 1
+
+    async def ensure_ready(self) -> None:
+        """Construye el estado si hace falta y aplica las escrituras pendientes."""
+        if not self._obsoleto() and not self._pendientes:
+            return
+        async with self._lock:
+            if self._obsoleto():
+                await self.rebuild()
+            if self._pendientes:
+                # Las escrituras que lleguen mientras tanto quedan para la siguiente
+                ids = sorted(self._pendientes)
+                self._pendientes.clear()
+                try:
+                    rows = await self._cargar_ids(ids)
+                except Exception:
+                    self._pendientes.update(ids)
+                    raise
+                encontrados = set()
+                for row in rows:
+                    self.state.add(row)
+                    encontrados.add(row["id_bolso"])
+                for bolso_id in ids:
+                    if bolso_id not in encontrados:
+                        self.state.remove(bolso_id)
+                self.refreshes += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {"builds": self.builds, "refreshes": self.refreshes,
+                "writes": self.writes, "pending": len(self._pendientes)}
@@ -0,0 +1,16 @@
+-- Datos de ejemplo de la tabla bolso (después de python -m app.migrate)
+-- Proyecto: BolsosApp
+
+USE yasbel;
+
+INSERT IGNORE INTO bolso (nombre, descripcion, precio, stock, categoria, codigo_sku, activo) VALUES
+('Bolso a Eliminar', 'Delete Test, gris', 25.00, 3, 'bandolera', 'BAND-DEL-001', 1),
+('Mochila Urban', 'UrbanStyle, negro', 79.99, 15, 'mochila', 'MOCH-URB-001', 1),
+('Tote Elegante', 'LuxBrand, beige', 45.50, 8, 'tote', 'TOTE-ELE-001', 1),
+('Bandolera Casual', 'CasualWear, azul', 35.00, 12, 'bandolera', 'BAND-CAS-001', 1),
+('Mochila Deportiva', 'SportMax, rojo', 65.00, 20, 'mochila', 'MOCH-DEP-001', 1),
+('Tote Minimalista', 'SimpleStyle, blanco', 40.00, 10, 'tote', 'TOTE-MIN-001', 1),
+('Bandolera Vintage', 'RetroChic, marrón', 55.00, 5, 'bandolera', 'BAND-VIN-001', 1),
+('Mochila Escolar', 'StudyPro, verde', 50.00, 25, 'mochila', 'MOCH-ESC-001', 1),
+('Tote Shopping', 'ShopEasy, rosa', 30.00, 18, 'tote', 'TOTE-SHO-001', 1),
+('Bandolera Compacta', 'MiniStyle, negro', 28.00, 14, 'bandolera', 'BAND-COM-001', 1);
@@ -0,0 +1,556 @@
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+# Agregar la raíz del proyecto al path para los imports
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+# Benchmark de carga de la API: RPS, latencias p50/p95/p99 y llamadas a la
+# base de datos por petición, con una mezcla configurable de lecturas y
+# escrituras. Guarda los resultados en JSON para comparar ejecuciones.
+#
+# - En proceso (por defecto): llama a la app ASGI directamente, sin red
+# - --uvicorn: arranca la app con uvicorn en un subproceso y usa HTTP real
+# - --url: contra un servidor ya arrancado (sin contador de llamadas a la BD)
+#
+# El backend se elige con DB_BACKEND (por defecto aquí: memory); la tabla se
+# rellena con --rows bolsos mediante POST /bolso/batch antes de medir.
+
+# Mezcla por defecto: operación -> peso
+MEZCLA_POR_DEFECTO = "get_id=50,list_page=15,list_all=5,lookup=10,create=8,update=8,upsert=2,delete=2"
+CATEGORIAS = ("bandolera", "mochila", "tote", "clutch", "shopper")
+RUTA_STATS = "/_bench/stats"
+
+
+# ========================
+# Contador de llamadas a la base de datos
+# ========================
+
+class ContadorBD:
+    """
+    Cuenta las llamadas al backend de almacenamiento: una por operación
+    (SELECT, INSERT...) más una por unidad de trabajo (COMMIT/ROLLBACK al
+    devolver la conexión). Con MySQL, las operaciones masivas pueden enviar
+    varias sentencias por llamada (una por lote).
+    """
+
+    def __init__(self):
+        self.llamadas = 0
+        self.por_operacion: Dict[str, int] = {}
+
+    def instrumentar(self, backend: Any) -> None:
+        for nombre in ("connect", "fetch_all", "fetch_page", "iter_all", "select_by_ids",
+                       "select_by_skus", "skus_existentes", "insert", "insert_many",
+                       "upsert", "update_por_sku", "update", "delete"):
+            original = getattr(backend, nombre, None)
+            if original is not None:
+                setattr(backend, nombre, self._envolver(nombre, original))
+
+    def _envolver(self, nombre: str, original: Callable) -> Callable:
+        def contar(*args, **kwargs):
+            self.llamadas += 1
+            self.por_operacion[nombre] = self.por_operacion.get(nombre, 0) + 1
+            return original(*args, **kwargs)
+        return contar
+
+    def stats(self) -> Dict[str, Any]:
+        return {"llamadas": self.llamadas, "por_operacion": dict(self.por_operacion)}
+
+
+def preparar_app(contador: ContadorBD):
+    """Importa la app, instrumenta el backend y añade la ruta de estadísticas del benchmark."""
+    from app.backends import get_async_backend
+    from app.main import app
+
+    contador.instrumentar(get_async_backend())
+
+    @app.get(RUTA_STATS, include_in_schema=False)
+    async def estadisticas_bench():
+        return contador.stats()
+
+    return app
+
+
+# ========================
+# Clientes: ASGI en proceso y HTTP/1.1 con keep-alive
+# ========================
+
+class ClienteASGI:
+    """Llama a la aplicación ASGI directamente (sin sockets)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def request(self, metodo: str, ruta: str, cuerpo: bytes | None = None) -> Tuple[int, bytes]:
+        path, _, query = ruta.partition("?")
+        body = cuerpo or b""
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+            "method": metodo, "scheme": "http", "path": path, "raw_path": path.encode(),
+            "query_string": query.encode(), "root_path": "",
+            "headers": [(b"host", b"bench"), (b"content-type", b"application/json"),
+                        (b"content-length", str(len(body)).encode())],
+            "client": ("127.0.0.1", 0), "server": ("bench", 80),
+        }
+        enviado = False
+        terminado = asyncio.Event()
+        estado = 0
+        partes: List[bytes] = []
+
+        async def receive():
+            nonlocal enviado
+            if not enviado:
+                enviado = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            await terminado.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(mensaje):
+            nonlocal estado
+            if mensaje["type"] == "http.response.start":
+                estado = mensaje["status"]
+            elif mensaje["type"] == "http.response.body":
+                partes.append(mensaje.get("body", b""))
+                if not mensaje.get("more_body", False):
+                    terminado.set()
+
+        await self.app(scope, receive, send)
+        return estado, b"".join(partes)
+
+    async def close(self) -> None:
+        pass
+
+
+class ClienteHTTP:
+    """Cliente HTTP/1.1 mínimo (una conexión keep-alive por worker)."""
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self._conexion: Tuple[asyncio.StreamReader, asyncio.StreamWriter] | None = None
+
+    async def request(self, metodo: str, ruta: str, cuerpo: bytes | None = None) -> Tuple[int, bytes]:
+        if self._conexion is None:
+            self._conexion = await asyncio.open_connection(self.host, self.port)
+        reader, writer = self._conexion
+        body = cuerpo or b""
+        writer.write(
+            f"{metodo} {ruta} HTTP/1.1\r\nHost: {self.host}\r\n"
+            f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body
+        )
+        await writer.drain()
+
+        linea = await reader.readline()
+        if not linea:
+            self._conexion = None
+            raise ConnectionError("El servidor cerró la conexión")
+        estado = int(linea.split()[1])
+        cabeceras: Dict[str, str] = {}
+        while True:
+            linea = await reader.readline()
+            if linea in (b"\r\n", b"\n", b""):
+                break
+            nombre, _, valor = linea.decode("latin-1").partition(":")
+            cabeceras[nombre.strip().lower()] = valor.strip()
+
+        if cabeceras.get("transfer-encoding", "").lower() == "chunked":
+            partes = []
+            while True:
+                tam = int((await reader.readline()).split(b";")[0], 16)
+                if tam == 0:
+                    await reader.readline()
+                    break
+                partes.append(await reader.readexactly(tam))
+                await reader.readline()
+            datos = b"".join(partes)
+        else:
+            datos = await reader.readexactly(int(cabeceras.get("content-length", "0")))
+        if cabeceras.get("connection", "").lower() == "close":
+            await self.close()
+        return estado, datos
+
+    async def close(self) -> None:
+        if self._conexion is not None:
+            self._conexion[1].close()
+            self._conexion = None
+
+
+# ========================
+# Carga de trabajo
+# ========================
+
+class Carga:
+    """Genera las peticiones de cada operación de la mezcla."""
+
+    def __init__(self, rng: random.Random, ids: List[int], skus: List[str], prefijo: str):
+        self.rng = rng
+        self.ids = ids
+        self.skus = skus
+        self.prefijo = prefijo
+        self.creados: List[int] = []
+        self._n = 0
+
+    def _bolso(self, sku: str) -> Dict[str, Any]:
+        return {
+            "nombre": f"Bolso {sku}",
+            "descripcion": "Bolso del benchmark",
+            "precio": round(self.rng.uniform(10, 300), 2),
+            "stock": self.rng.randint(0, 50),
+            "categoria": self.rng.choice(CATEGORIAS),
+            "codigo_sku": sku,
+            "activo": True,
+        }
+
+    def _nuevo_sku(self) -> str:
+        self._n += 1
+        return f"{self.prefijo}N{self._n}"
+
+    def peticion(self, operacion: str) -> Tuple[str, str, bytes | None]:
+        rng = self.rng
+        if operacion == "get_id":
+            return "GET", f"/bolso/{rng.choice(self.ids)}", None
+        if operacion == "list_page":
+            orden = rng.choice(("id_bolso", "precio", "-precio"))
+            return "GET", f"/bolso?categoria={rng.choice(CATEGORIAS)}&orden={orden}&limit=50", None
+        if operacion == "list_all":
+            return "GET", "/bolso", None
+        if operacion == "lookup":
+            ids = ",".join(str(i) for i in rng.sample(self.ids, min(10, len(self.ids))))
+            return "GET", f"/bolso?ids={ids}", None
+        if operacion == "create":
+            return "POST", "/bolso", json.dumps(self._bolso(self._nuevo_sku())).encode()
+        if operacion == "update":
+            i = rng.randrange(len(self.ids))
+            return "PUT", f"/bolso/{self.ids[i]}", json.dumps(self._bolso(self.skus[i])).encode()
+        if operacion == "upsert":
+            muestra = rng.sample(self.skus, min(20, len(self.skus)))
+            cuerpo = [{"codigo_sku": sku, "stock": rng.randint(0, 50)} for sku in muestra]
+            return "POST", "/bolso/upsert", json.dumps(cuerpo).encode()
+        if operacion == "delete":
+            # Solo se borran bolsos creados por el propio benchmark
+            return "DELETE", f"/bolso/{self.creados.pop()}", None
+        raise ValueError(f"Operación desconocida: {operacion}")
+
+    def registrar(self, operacion: str, estado: int, datos: bytes) -> None:
+        if operacion == "create" and estado == 201:
+            self.creados.append(json.loads(datos)["id_bolso"])
+
+
+def parsear_mezcla(texto: str) -> Dict[str, int]:
+    mezcla = {}
+    for parte in texto.split(","):
+        nombre, _, peso = parte.partition("=")
+        if nombre.strip():
+            mezcla[nombre.strip()] = int(peso or 1)
+    return {k: v for k, v in mezcla.items() if v > 0}
+
+
+async def sembrar(cliente, filas: int, prefijo: str, rng: random.Random) -> Tuple[List[int], List[str]]:
+    """Crea `filas` bolsos con POST /bolso/batch y devuelve sus IDs y SKUs."""
+    carga = Carga(rng, [], [], prefijo)
+    ids: List[int] = []
+    skus: List[str] = []
+    for inicio in range(0, filas, 1000):
+        lote = [carga._bolso(f"{prefijo}S{i}") for i in range(inicio, min(filas, inicio + 1000))]
+        estado, datos = await cliente.request("POST", "/bolso/batch", json.dumps(lote).encode())
+        if estado != 201:
+            raise RuntimeError(f"No se pudo sembrar la tabla: HTTP {estado} {datos[:200]!r}")
+        for r in json.loads(datos)["resultados"]:
+            ids.append(r["bolso"]["id_bolso"])
+            skus.append(r["bolso"]["codigo_sku"])
+    return ids, skus
+
+
+def percentil(valores: List[float], p: float) -> float:
+    """Percentil por rango más cercano (valores ordenados)."""
+    if not valores:
+        return 0.0
+    k = math.ceil(p / 100 * len(valores)) - 1
+    return valores[max(0, min(len(valores) - 1, k))]
+
+
+def resumen_latencias(latencias: List[float], duracion: float) -> Dict[str, Any]:
+    ordenadas = sorted(latencias)
+    return {
+        "requests": len(ordenadas),
+        "rps": round(len(ordenadas) / duracion, 1) if duracion else 0.0,
+        "p50_ms": round(percentil(ordenadas, 50) * 1000, 3),
+        "p95_ms": round(percentil(ordenadas, 95) * 1000, 3),
+        "p99_ms": round(percentil(ordenadas, 99) * 1000, 3),
+        "max_ms": round(ordenadas[-1] * 1000, 3) if ordenadas else 0.0,
+        "mean_ms": round(sum(ordenadas) / len(ordenadas) * 1000, 3) if ordenadas else 0.0,
+    }
+
+
+async def ejecutar(args, crear_cliente, tiene_stats: bool) -> Dict[str, Any]:
+    rng = random.Random(args.seed)
+    prefijo = f"B{int(time.time()) % 100000}-"
+    mezcla = parsear_mezcla(args.mix)
+    operaciones = list(mezcla)
+    pesos = [mezcla[o] for o in operaciones]
+
+    cliente_control = crear_cliente()
+    ids, skus = await sembrar(cliente_control, args.rows, prefijo, rng)
+    carga = Carga(rng, ids, skus, prefijo)
+
+    async def leer_json(ruta: str) -> Any:
+        estado, datos = await cliente_control.request("GET", ruta)
+        return json.loads(datos) if estado == 200 else None
+
+    latencias: Dict[str, List[float]] = {o: [] for o in operaciones}
+    errores: Dict[str, int] = {o: 0 for o in operaciones}
+    midiendo = False
+    fin = 0.0
+
+    async def worker():
+        cliente = crear_cliente()
+        try:
+            while time.perf_counter() < fin:
+                operacion = rng.choices(operaciones, pesos)[0]
+                if operacion == "delete" and not carga.creados:
+                    operacion = "create" if "create" in latencias else "get_id"
+                metodo, ruta, cuerpo = carga.peticion(operacion)
+                inicio = time.perf_counter()
+                try:
+                    estado, datos = await cliente.request(metodo, ruta, cuerpo)
+                except Exception:
+                    estado, datos = 0, b""
+                    await cliente.close()
+                transcurrido = time.perf_counter() - inicio
+                carga.registrar(operacion, estado, datos)
+                if midiendo:
+                    latencias[operacion].append(transcurrido)
+                    if estado >= 400 or estado == 0:
+                        errores[operacion] += 1
+        finally:
+            await cliente.close()
+
+    # Calentamiento (no se mide)
+    if args.warmup > 0:
+        fin = time.perf_counter() + args.warmup
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+
+    bd_antes = await leer_json(RUTA_STATS) if tiene_stats else None
+    midiendo = True
+    inicio = time.perf_counter()
+    fin = inicio + args.duration
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    duracion = time.perf_counter() - inicio
+    bd_despues = await leer_json(RUTA_STATS) if tiene_stats else None
+
+    todas = [lat for valores in latencias.values() for lat in valores]
+    resumen = resumen_latencias(todas, duracion)
+    resumen["errors"] = sum(errores.values())
+    if bd_antes is not None and bd_despues is not None and todas:
+        llamadas = bd_despues["llamadas"] - bd_antes["llamadas"]
+        resumen["db_calls"] = llamadas
+        resumen["db_calls_per_request"] = round(llamadas / len(todas), 3)
+        resumen["db_calls_by_operation"] = {
+            op: n - bd_antes["por_operacion"].get(op, 0) for op, n in bd_despues["por_operacion"].items()
+        }
+    else:
+        resumen["db_calls_per_request"] = None
+
+    servidor = {"pool": await leer_json("/db/pool"), "cache": await leer_json("/db/cache")}
+    await cliente_control.close()
+
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "git_commit": _git_commit(),
+            "backend": os.getenv("DB_BACKEND"),
+            "mode": args.modo,
+            "concurrency": args.concurrency,
+            "duration_s": args.duration,
+            "warmup_s": args.warmup,
+            "rows": args.rows,
+            "mix": mezcla,
+            "seed": args.seed,
+            "python": platform.python_version(),
+        },
+        "summary": resumen,
+        "operations": {
+            op: {**resumen_latencias(sorted(latencias[op]), duracion), "errors": errores[op]}
+            for op in operaciones
+        },
+        "server": servidor,
+    }
+
+
+# ========================
+# Modos de ejecución
+# ========================
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=project_root,
+                              capture_output=True, text=True, timeout=5).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def _puerto_libre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def en_proceso(args) -> Dict[str, Any]:
+    app = preparar_app(ContadorBD())
+    async with app.router.lifespan_context(app):
+        return await ejecutar(args, lambda: ClienteASGI(app), tiene_stats=True)
+
+
+async def contra_servidor(args, host: str, port: int, tiene_stats: bool) -> Dict[str, Any]:
+    return await ejecutar(args, lambda: ClienteHTTP(host, port), tiene_stats)
+
+
+def con_uvicorn(args) -> Dict[str, Any]:
+    """Arranca `bench_api.py --serve` en un subproceso y mide por HTTP."""
+    port = _puerto_libre()
+    proceso = subprocess.Popen(
+        [sys.executable, __file__, "--serve", "--port", str(port)],
+        env=os.environ.copy(), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        limite = time.time() + 30
+        while True:
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=1).close()
+                break
+            except OSError:
+                if proceso.poll() is not None or time.time() > limite:
+                    raise RuntimeError("uvicorn no arrancó")
+                time.sleep(0.1)
+        return asyncio.run(contra_servidor(args, "127.0.0.1", port, tiene_stats=True))
+    finally:
+        proceso.terminate()
+        proceso.wait(timeout=10)
+
+
+def servir(port: int) -> None:
+    """Modo --serve: la app instrumentada bajo uvicorn (lo usa con_uvicorn)."""
+    import uvicorn
+
+    # Los print de depuración de las escrituras falsearían la medida
+    sys.stdout = open(os.devnull, "w")
+    app = preparar_app(ContadorBD())
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning", access_log=False)
+
+
+# ========================
+# Comparación de resultados
+# ========================
+
+def comparar(actual: Dict[str, Any], base: Dict[str, Any], umbral: float) -> bool:
+    """Imprime las diferencias con una ejecución anterior; False si hay regresión."""
+    ok = True
+    print(f"\nComparación con {base['meta'].get('timestamp')} ({base['meta'].get('git_commit')}):")
+    filas = [("TOTAL", actual["summary"], base["summary"])]
+    filas += [(op, datos, base["operations"][op])
+              for op, datos in actual["operations"].items() if op in base["operations"]]
+    for nombre, a, b in filas:
+        cambios = []
+        for clave, mayor_es_mejor in (("rps", True), ("p95_ms", False), ("p99_ms", False)):
+            if not b.get(clave):
+                continue
+            delta = (a[clave] - b[clave]) / b[clave]
+            peor = -delta if mayor_es_mejor else delta
+            marca = ""
+            if peor > umbral:
+                marca = " ⚠️"
+                ok = False
+            cambios.append(f"{clave} {b[clave]} → {a[clave]} ({delta:+.1%}){marca}")
+        print(f"  • {nombre:<10} " + " | ".join(cambios))
+    return ok
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark de carga de la API de bolsos")
+    parser.add_argument("--uvicorn", action="store_true", help="Arrancar la app con uvicorn (HTTP real)")
+    parser.add_argument("--url", help="Servidor ya arrancado, p. ej. http://127.0.0.1:8000")
+    parser.add_argument("--backend", help="DB_BACKEND a usar (por defecto memory en proceso/uvicorn)")
+    parser.add_argument("-c", "--concurrency", type=int, default=32)
+    parser.add_argument("-d", "--duration", type=float, default=10.0, help="Segundos de medida")
+    parser.add_argument("--warmup", type=float, default=2.0, help="Segundos de calentamiento")
+    parser.add_argument("--rows", type=int, default=5000, help="Bolsos a crear antes de medir")
+    parser.add_argument("--mix", default=MEZCLA_POR_DEFECTO, help="operacion=peso,... (get_id, list_page, "
+                        "list_all, lookup, create, update, upsert, delete)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("-o", "--output", help="Fichero JSON de resultados (por defecto bench_results/...)")
+    parser.add_argument("--compare", help="JSON de una ejecución anterior para comparar")
+    parser.add_argument("--max-regression", type=float, default=0.10,
+                        help="Empeoramiento máximo de rps/p95/p99 antes de fallar (0.10 = 10%%)")
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, default=8000, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.backend:
+        os.environ["DB_BACKEND"] = args.backend
+    elif not args.url:
+        os.environ.setdefault("DB_BACKEND", "memory")
+
+    if args.serve:
+        servir(args.port)
+        return
+
+    if args.url:
+        args.modo = "url"
+        destino = args.url.split("://", 1)[-1].rstrip("/")
+        host, _, port = destino.partition(":")
+        resultado = asyncio.run(contra_servidor(args, host, int(port or 80), tiene_stats=False))
+    elif args.uvicorn:
+        args.modo = "uvicorn"
+        resultado = con_uvicorn(args)
+    else:
+        args.modo = "in-process"
+        stdout = sys.stdout
+        sys.stdout = open(os.devnull, "w")  # print de depuración de las escrituras
+        try:
+            resultado = asyncio.run(en_proceso(args))
+        finally:
+            sys.stdout.close()
+            sys.stdout = stdout
+
+    s = resultado["summary"]
+    print(f"✅ {args.modo} · backend={resultado['meta']['backend']} · concurrencia={args.concurrency}")
+    print(f"  • {s['requests']} peticiones en {args.duration}s → {s['rps']} req/s, errores: {s['errors']}")
+    print(f"  • Latencia p50 {s['p50_ms']} ms · p95 {s['p95_ms']} ms · p99 {s['p99_ms']} ms · máx {s['max_ms']} ms")
+    print(f"  • Llamadas a la BD por petición: {s['db_calls_per_request']}")
+    for op, datos in resultado["operations"].items():
+        print(f"    - {op:<10} {datos['requests']:>7} req · p50 {datos['p50_ms']:>8} ms · "
+              f"p99 {datos['p99_ms']:>8} ms · errores {datos['errors']}")
+
+    salida = Path(args.output) if args.output else (
+        project_root / "bench_results" /
+        f"{datetime.now():%Y%m%d-%H%M%S}_{resultado['meta']['backend'] or 'remoto'}_{args.modo}.json"
+    )
+    salida.parent.mkdir(parents=True, exist_ok=True)
+    salida.write_text(json.dumps(resultado, indent=2, ensure_ascii=False))
+    print(f"  • Resultados → {salida}")
+
+    if args.compare:
+        base = json.loads(Path(args.compare).read_text())
+        if not comparar(resultado, base, args.max_regression):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
+
+# ===== EJECUCIÓN DESDE CMD =====
+# python tests/bench_api.py                          (en proceso, backend memory)
+# python tests/bench_api.py --backend sqlite -c 64 -d 30
+# python tests/bench_api.py --uvicorn --compare bench_results/anterior.json
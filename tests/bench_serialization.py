@@ -0,0 +1,65 @@
+import json
+import sys
+import time
+from decimal import Decimal
+from pathlib import Path
+from typing import List
+
+# Agregar la raíz del proyecto al path para los imports
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from pydantic import TypeAdapter
+
+from app.main import Bolso, map_rows_to_bolsos
+from app.serialization import COLUMNAS_BOLSO, rows_to_json
+
+# Compara el coste por fila de serializar GET /bolso:
+# - antes: dict por fila -> BolsoDB -> validación response_model=List[Bolso] -> json.dumps
+#   (lo que hace FastAPI al devolver una lista de modelos)
+# - ahora: tupla del cursor -> dict -> TypeAdapter.dump_json (app.serialization)
+# No necesita MySQL: las filas se generan con los mismos tipos que devuelve el conector.
+
+_lista_bolsos_adapter = TypeAdapter(List[Bolso])
+
+
+def generar_filas(n: int):
+    return [
+        (i, f"Bolso {i}", f"Descripción del bolso {i}", Decimal("49.90"), i % 20,
+         "bandolera", f"SKU-{i:06d}", 1)
+        for i in range(1, n + 1)
+    ]
+
+
+def antes(tuplas) -> bytes:
+    rows = [dict(zip(COLUMNAS_BOLSO, t)) for t in tuplas]  # cursor dictionary=True
+    bolsos = _lista_bolsos_adapter.validate_python([b.model_dump() for b in map_rows_to_bolsos(rows)])
+    contenido = _lista_bolsos_adapter.dump_python(bolsos, mode="json")
+    return json.dumps(contenido, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def ahora(tuplas) -> bytes:
+    return rows_to_json(tuplas)
+
+
+def medir(fn, tuplas, repeticiones: int = 3) -> float:
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        fn(tuplas)
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor
+
+
+if __name__ == "__main__":
+    for n in (10_000, 100_000):
+        tuplas = generar_filas(n)
+        assert json.loads(antes(tuplas)) == json.loads(ahora(tuplas))
+        t_antes = medir(antes, tuplas)
+        t_ahora = medir(ahora, tuplas)
+        print(f"✅ {n:>7} filas → antes: {t_antes * 1e6 / n:6.2f} µs/fila ({t_antes * 1000:7.1f} ms)"
+              f" | ahora: {t_ahora * 1e6 / n:6.2f} µs/fila ({t_ahora * 1000:7.1f} ms)"
+              f" | x{t_antes / t_ahora:.1f}")
+
+# ===== EJECUCIÓN DESDE CMD =====
+# python tests/bench_serialization.py
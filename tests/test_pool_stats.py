@@ -0,0 +1,33 @@
+import sys
+from pathlib import Path
+
+# Agregar la raíz del proyecto al path para los imports
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.backends import backend_name
+from app.database import get_connection, get_pool_stats
+
+if __name__ == "__main__":
+    if backend_name() != "mysql":
+        # Con sqlite y memory no hay pool: sus estadísticas son otras
+        print(f'⏭️  Sin pool de conexiones con DB_BACKEND={backend_name()} (solo MySQL)')
+        sys.exit(0)
+    try:
+        # Pedimos varias conexiones seguidas: solo la primera debe abrir socket
+        for _ in range(5):
+            conn = get_connection()
+            cur = conn.cursor()
+            cur.execute('SELECT 1')
+            cur.fetchone()
+            cur.close()
+            conn.close()
+
+        stats = get_pool_stats()
+        print('✅ Estadísticas del pool →', stats)
+        print(f"  • Conexiones creadas: {stats['created']} (checkouts: {stats['checkouts']})")
+    except Exception as e:
+        print('❌ Error con el pool de conexiones →', e)
+
+# ===== EJECUCIÓN DESDE CMD =====
+# python tests/test_pool_stats.py
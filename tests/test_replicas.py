@@ -0,0 +1,72 @@
+import asyncio
+import os
+import sqlite3
+import sys
+import tempfile
+from pathlib import Path
+
+# Agregar la raíz del proyecto al path para los imports
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+# Primario y dos réplicas en ficheros SQLite (las réplicas con otros datos,
+# para ver de dónde sale cada lectura)
+carpeta = tempfile.mkdtemp()
+os.environ["DB_BACKEND"] = "sqlite"
+os.environ["DB_SQLITE_PATH"] = os.path.join(carpeta, "primario.db")
+os.environ["DB_REPLICAS"] = (
+    f"sqlite:///{os.path.join(carpeta, 'replica1.db')}?weight=2,"
+    f"sqlite:///{os.path.join(carpeta, 'replica2.db')}"
+)
+
+from app.backends.sqlite import SQLiteBackend
+from app import database_async
+
+
+def crear_bolso(backend, nombre):
+    conn = backend.connect()
+    backend.insert(conn, dict(nombre=nombre, descripcion=None, precio=10, stock=1,
+                              categoria='Mochila', codigo_sku=f'SKU-{nombre}', activo=True))
+    conn.commit()
+    conn.close()
+
+
+async def leer_nombre():
+    rows = await database_async.fetch_bolsos_page(limit=1)
+    return rows[0]['nombre'] if rows else None
+
+
+async def main():
+    replicas = database_async.replicas
+    crear_bolso(SQLiteBackend(os.path.join(carpeta, 'replica1.db')), 'replica1')
+    crear_bolso(SQLiteBackend(os.path.join(carpeta, 'replica2.db')), 'replica2')
+    await database_async.insert_bolso('primario', None, 10, 1, 'Mochila', 'SKU-primario')
+
+    # Pesos 2 y 1: replica1, replica2, replica1...
+    print('Reparto:', [await leer_nombre() for _ in range(6)])
+
+    # El bolso recién escrito se lee por ID del primario
+    bolso = await database_async.fetch_bolso_by_id(1)
+    print('Por ID tras escribir:', bolso['nombre'] if bolso else None)
+
+    # Réplica caída (sin tabla): se retira y la lectura se repite en el primario
+    conn = sqlite3.connect(os.path.join(carpeta, 'replica1.db'))
+    conn.executescript('DROP TABLE bolso; DROP TABLE bolso_version;')
+    conn.close()
+    print('Con replica1 caída:', [await leer_nombre() for _ in range(3)])
+    await replicas.comprobar()
+    print('Tras comprobar:', [(r.nombre, r.sana) for r in replicas.replicas])
+    print('Estadísticas:', database_async.get_pool_stats()['replicas'])
+
+    await database_async.close_pool()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+        print('✅ Reparto de lecturas entre réplicas correcto')
+    except Exception as e:
+        print('❌ Error al probar las réplicas →', e)
+
+# ===== EJECUCIÓN DESDE CMD =====
+# python tests/test_replicas.py
@@ -0,0 +1,37 @@
+import sys
+from pathlib import Path
+
+# Agregar la raíz del proyecto al path para los imports
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.search import SearchIndex
+
+# Índice en memoria: no necesita base de datos
+BOLSOS = [
+    dict(id_bolso=1, nombre='Bandolera de piel', descripcion='Piel natural', categoria='Bandolera', activo=True),
+    dict(id_bolso=2, nombre='Mochila urbana', descripcion='Bolsillo de piel', categoria='Mochila', activo=True),
+    dict(id_bolso=3, nombre='Mochila de lona', descripcion=None, categoria='Mochila', activo=True),
+]
+
+if __name__ == "__main__":
+    try:
+        indice = SearchIndex()
+        indice.add_many(BOLSOS)
+
+        ids, total = indice.search('piel')
+        print(f'✅ "piel" → {total} resultados: {ids}')
+        ids, total = indice.search('moch', categoria='mochila')
+        print(f'✅ "moch" en Mochila → {total} resultados: {ids}')
+
+        # Los filtros descartan todas las coincidencias: sin resultados, sin error
+        for filtros in (dict(categoria='tote'), dict(activo=False)):
+            ids, total = indice.search('piel', **filtros)
+            if (ids, total) != ([], 0):
+                raise AssertionError(f'se esperaba ([], 0) con {filtros} y se obtuvo {(ids, total)}')
+            print(f'✅ "piel" con {filtros} → sin resultados')
+    except Exception as e:
+        print('❌ Error al buscar en el índice →', e)
+
+# ===== EJECUCIÓN DESDE CMD =====
+# python tests/test_search.py